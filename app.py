@@ -1,11 +1,36 @@
 """
 Inicializa la aplicación FastAPI y monta el router que expone los endpoints para la comparación de datos JSON contra PDFs.
 """
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from routes.compare_routes import router as compare_router
 from routes.entity_extraction_routes import router as entity_extraction_router
+from funcs.nlp_extractors.extraer_entidades_especificas_spacy import precargar_pipeline_spacy
 
-app = FastAPI(title="API: Detección de Personas en PDF y Comparador con JSON/TXT")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cargar el modelo de spaCy una sola vez al arrancar (en un thread, para no
+    # bloquear el loop). Si falla, la app arranca igual: el error se reporta en el
+    # primer pedido que necesite el modelo, como antes
+    try:
+        await asyncio.to_thread(precargar_pipeline_spacy)
+    except Exception as e:
+        logger.warning("No se pudo precargar el modelo de spaCy: %s", e)
+    yield
+
+
+# ORJSONResponse también por defecto para las rutas que no lo declaran (como "/")
+app = FastAPI(
+    title="API: Detección de Personas en PDF y Comparador con JSON/TXT",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Router de nuestro endpoint
 app.include_router(compare_router, prefix="/api")
@@ -5,6 +5,7 @@ etiqueta por umbrales (sin lógica difusa) y agrupa en exacta, alta, media y baj
 """
 import re
 import os
+from typing import Union
 from rapidfuzz import fuzz
 from funcs.extraer_datos_json import extraer_valores_txt
 from funcs.normalizacion.normalizar_y_extraer_texto_pdf import normalizacion_simple_pdf
@@ -16,28 +17,38 @@ from funcs.normalizacion.normalizacion_txt_json import normalizar_para_comparaci
 # Acepta números de 1+ dígitos, opcionalmente con separadores de miles/puntos/guiones
 NUM_REGEX = re.compile(r"\b\d+(?:[.\-]\d+)*\b")
 
-def comparar_valores_json_pdf(json_path: str, source_path: str):
+def comparar_valores_json_pdf(json_path: Union[str, dict], source_path: Union[str, bytes] = None, texto_fuente: str = None):
     """
     Compara valores de un archivo JSON con el contenido de un PDF o TXT.
     
     Args:
-        json_path: Ruta al archivo JSON o TXT con datos de referencia
-        source_path: Ruta al archivo PDF o TXT a comparar
+        json_path: Ruta al archivo JSON o TXT con datos de referencia, o esos datos ya
+            cargados y normalizados (ver cargar_valores_desde_bytes)
+        source_path: Ruta al archivo PDF o TXT a comparar, o el contenido del PDF en bytes
+        texto_fuente: Contenido de un TXT ya leído (alternativa a source_path, sin archivo en disco)
     
     Returns:
         Diccionario con las comparaciones agrupadas por nivel de similitud
     """
-    json_data = extraer_valores_txt(json_path)
+    json_data = json_path if isinstance(json_path, dict) else extraer_valores_txt(json_path)
     if not json_data:
         return {"exacta": [], "alta": [], "media": [], "baja": []}
 
-    # Detectar si el archivo fuente es TXT o PDF por su extensión
-    ext = os.path.splitext(source_path)[1].lower()
+    # Detectar si el archivo fuente es TXT o PDF por su extensión (los bytes son siempre un PDF)
+    if texto_fuente is not None:
+        ext = '.txt'
+    elif isinstance(source_path, (bytes, bytearray)):
+        ext = '.pdf'
+    else:
+        ext = os.path.splitext(source_path)[1].lower()
     
     if ext == '.txt':
-        # Leer el contenido del archivo TXT directamente
-        with open(source_path, 'r', encoding='utf-8') as f:
-            texto_pdf_original = f.read()
+        if texto_fuente is not None:
+            texto_pdf_original = texto_fuente
+        else:
+            # Leer el contenido del archivo TXT directamente
+            with open(source_path, 'r', encoding='utf-8') as f:
+                texto_pdf_original = f.read()
         # Aplicar normalización simple al texto
         texto_pdf_original = texto_pdf_original.replace('\n', ' ').replace('\r', ' ')
         texto_pdf_original = re.sub(r'\s+', ' ', texto_pdf_original).strip()
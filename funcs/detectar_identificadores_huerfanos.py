@@ -3,8 +3,14 @@ Módulo para detectar identificadores (DNI, CUIL, CUIT) que no están asociados
 También valida si CUIL/CUIT tienen dígito verificador correcto.
 """
 import re
-from typing import Dict, List, Any, Set
-from funcs.nlp_extractors.validadores_entidades import validar_dni, validar_cuil, validar_cuit
+from typing import Dict, List, Any, Set, Tuple
+from funcs.nlp_extractors.validadores_entidades import validar_dni, validar_cuil, validar_cuit, solo_digitos
+
+# Patrones de búsqueda de identificadores (compilados una sola vez al importar).
+# CUIL/CUIT son flexibles: aceptan con o sin separadores, con o sin espacios
+# Ejemplos: "CUIT 30-12345678-9", "CUIT 30123456789", "CUIT 30 12345678 9"
+_PATRON_DNI = re.compile(r'\bDNI\s+(\d{7,8})\b', flags=re.IGNORECASE)
+_PATRON_CUIL_CUIT = re.compile(r'\bCUI([LT])\s+(\d{2}[-\s]?\d{8}[-\s]?\d{1})\b', flags=re.IGNORECASE)
 
 
 def extraer_identificadores_huerfanos(
@@ -37,8 +43,7 @@ def extraer_identificadores_huerfanos(
     
     # 2. Buscar todos los DNI, CUIL, CUIT en el texto
     todos_dni = _buscar_dni_en_texto(texto)
-    todos_cuil = _buscar_cuil_en_texto(texto)
-    todos_cuit = _buscar_cuit_en_texto(texto)
+    todos_cuil, todos_cuit = _buscar_cuil_cuit_en_texto(texto)
     
     # 3. Filtrar huérfanos (que NO están en identificadores_con_persona)
     dni_huerfanos = [
@@ -118,8 +123,7 @@ def validar_cuil_cuit_en_texto(texto: str) -> Dict[str, List[Dict[str, Any]]]:
         - razon: "Dígito verificador incorrecto"
     """
     # Buscar todos los CUIL y CUIT en el texto
-    todos_cuil = _buscar_cuil_en_texto(texto)
-    todos_cuit = _buscar_cuit_en_texto(texto)
+    todos_cuil, todos_cuit = _buscar_cuil_cuit_en_texto(texto)
     
     # Filtrar solo los inválidos
     cuil_invalidos = [
@@ -229,13 +233,10 @@ def _buscar_dni_en_texto(texto: str) -> List[Dict[str, Any]]:
     Returns:
         Lista de DNI encontrados con contexto y validez
     """
-    patron = r'\bDNI\s+(\d{7,8})\b'
-    regex = re.compile(patron, flags=re.IGNORECASE)
-    
     resultados = []
     numeros_vistos = set()
     
-    for match in regex.finditer(texto):
+    for match in _PATRON_DNI.finditer(texto):
         numero = match.group(1)
         
         # Evitar duplicados
@@ -258,97 +259,53 @@ def _buscar_dni_en_texto(texto: str) -> List[Dict[str, Any]]:
     return resultados
 
 
-def _buscar_cuil_en_texto(texto: str) -> List[Dict[str, Any]]:
+def _buscar_cuil_cuit_en_texto(texto: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    Busca todos los CUIL en el texto y los valida (incluido dígito verificador).
-    
-    Args:
-        texto: Texto normalizado
-        
-    Returns:
-        Lista de CUIL encontrados con contexto y validez
-    """
-    # Patrón flexible: acepta con o sin separadores, con o sin espacios
-    patron = r'\bCUIL\s+(\d{2}[-\s]?\d{8}[-\s]?\d{1})\b'
-    regex = re.compile(patron, flags=re.IGNORECASE)
-    
-    resultados = []
-    numeros_vistos = set()
-    
-    for match in regex.finditer(texto):
-        numero_raw = match.group(1)
-        # Limpiar separadores
-        numero = re.sub(r'[^\d]', '', numero_raw)
-        
-        # Validar que tenga 11 dígitos
-        if len(numero) != 11:
-            continue
-        
-        # Evitar duplicados
-        if numero in numeros_vistos:
-            continue
-        numeros_vistos.add(numero)
-        
-        # Validar CUIL (incluye validación de dígito verificador)
-        valido = validar_cuil(numero)
-        
-        # Extraer contexto
-        contexto = _extraer_contexto(texto, match.start(), match.end())
-        
-        resultados.append({
-            'numero': numero,
-            'contexto': contexto,
-            'valido': valido
-        })
+    Busca todos los CUIL y CUIT en el texto y los valida (incluido dígito verificador).
     
-    return resultados
-
-
-def _buscar_cuit_en_texto(texto: str) -> List[Dict[str, Any]]:
-    """
-    Busca todos los CUIT en el texto y los valida (incluido dígito verificador).
+    Un solo recorrido del texto con _PATRON_CUIL_CUIT (antes eran dos, uno por
+    etiqueta): cada match se clasifica por su etiqueta. Los matches de una y otra
+    etiqueta nunca se solapan, así que el resultado es el mismo que buscarlas por
+    separado.
     
     Args:
         texto: Texto normalizado
         
     Returns:
-        Lista de CUIT encontrados con contexto y validez
+        Tupla (CUIL encontrados, CUIT encontrados), cada uno con contexto y validez
     """
-    # Patrón flexible: acepta con o sin separadores, con o sin espacios
-    # Ejemplos: "CUIT 30-12345678-9", "CUIT 30123456789", "CUIT 30 12345678 9"
-    patron = r'\bCUIT\s+(\d{2}[-\s]?\d{8}[-\s]?\d{1})\b'
-    regex = re.compile(patron, flags=re.IGNORECASE)
-    
-    resultados = []
-    numeros_vistos = set()
-    
-    for match in regex.finditer(texto):
-        numero_raw = match.group(1)
-        # Limpiar separadores
-        numero = re.sub(r'[^\d]', '', numero_raw)
+    resultados = {'L': [], 'T': []}
+    numeros_vistos = {'L': set(), 'T': set()}
+    # Validar CUIL / CUIT (incluye validación de dígito verificador)
+    validadores = {'L': validar_cuil, 'T': validar_cuit}
+    
+    for match in _PATRON_CUIL_CUIT.finditer(texto):
+        tipo = match.group(1).upper()
+        numero_raw = match.group(2)
+        # Limpiar separadores (traducción en C, sin regex por match)
+        numero = solo_digitos(numero_raw)
         
         # Validar que tenga 11 dígitos
         if len(numero) != 11:
             continue
         
-        # Evitar duplicados
-        if numero in numeros_vistos:
+        # Evitar duplicados (por tipo de identificador)
+        if numero in numeros_vistos[tipo]:
             continue
-        numeros_vistos.add(numero)
+        numeros_vistos[tipo].add(numero)
         
-        # Validar CUIT (incluye validación de dígito verificador)
-        valido = validar_cuit(numero)
+        valido = validadores[tipo](numero)
         
         # Extraer contexto
         contexto = _extraer_contexto(texto, match.start(), match.end())
         
-        resultados.append({
+        resultados[tipo].append({
             'numero': numero,
             'contexto': contexto,
             'valido': valido
         })
     
-    return resultados
+    return resultados['L'], resultados['T']
 
 
 def _extraer_contexto(texto: str, start: int, end: int, window: int = 60) -> str:
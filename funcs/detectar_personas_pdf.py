@@ -1,47 +1,104 @@
 import re
+from bisect import bisect_left
 from collections import defaultdict
+from typing import Union
 from funcs.normalizacion.normalizar_y_extraer_texto_pdf import normalizacion_avanzada_pdf
 
-def detectar_personas_dni_matricula(path_pdf: str = None, raw_text: str = None):
+# Etiqueta de documento → regex de número (compilados una sola vez al importar)
+_PATRONES_ETIQUETAS = {
+    etiqueta: re.compile(patron, flags=re.IGNORECASE)
+    for etiqueta, patron in {
+        "DNI":      r'\bDNI\s+(\d+)\b',
+        "MATRICULA":r'\bMATRICULA\s+(\d+)\b',
+        "CUIF":     r'\bCUIF\s+(\d+)\b',
+        "CUIT":     r'\bCUIT\s+(\d+)\b',
+        "CUIL":     r'\bCUIL\s+(\d+)\b',
+    }.items()
+}
+
+# Posible nombre entre dos documentos (si aparece, no se asocian)
+_PATRON_NOMBRE_ENTRE_DOCUMENTOS = re.compile(
+    r'\b[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+(?:\s+[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+){1,3}\b'
+)
+_PATRON_NO_DIGITO = re.compile(r'\D')
+
+# Nombre "natural": mínimo 1 palabra que empiece en mayúscula, máximo 6 (la palabra inicial (1) + 5 más que cumplan los requisitos)
+_PATRON_NOMBRE_NATURAL = re.compile(
+    r'\b([A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+'
+    r'(?:\s+[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+){1,5})\b'
+)
+
+# Nombre “jurídico”: hasta 7 palabras, admitiendo puntos y & en cada token
+_PATRON_NOMBRE_JURIDICO = re.compile(
+    r'\b('
+    r'[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\.\&]+'              # primera “palabra” con letras, puntos o &
+    r'(?:\s+[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\.\&]+){1,7}'  # de 1 a 7 palabras adicionales iguales
+    r')\b'
+)
+
+# Documentos dentro de las etiquetas ya formateadas ("DNI N° 123")
+_PATRON_DOCUMENTO_EN_ETIQUETA = re.compile(r'(DNI|MATRICULA|CUIT|CUIL|CUIF)\s+N°\s*(\d+)', re.IGNORECASE)
+
+# Stop-words que no pueden formar parte de un nombre asociado a un documento
+_STOP_WORDS_NOMBRES = frozenset({
+    # Documentos / etiquetas
+    "dni", "matricula", "mp", "cuif", "cuit", "cuil",
+    
+    # Tratamientos y títulos
+    "señor", "señora", "sr", "sra", "srta", "juez", "jueza",
+    "ciudadano", "ciudadana",
+    "doctor", "doctora", "dr", "dra", "drs", "dras", "dr.", "dra.", "drs.", "dras.",
+    "abogado", "abogada", "letrado", "letrada",
+    
+    # Palabras comunes que no deben formar parte del nombre
+    "que", "heredero", "heredera", "nacimiento", "partida"
+})
+
+def detectar_personas_dni_matricula(
+    path_pdf: Union[str, bytes] = None,
+    raw_text: str = None,
+    texto_normalizado: str = None
+):
     """
     Extrae y normaliza el texto de un PDF (normalizacion_avanzada_pdf), luego detecta pares
     Nombre + DNI y Nombre + Matrícula (ambos casos pueden tener CUIF, CUIT e CUIL) usando patrones adaptados
     al texto preprocesado.
+    
+    Si quien llama ya tiene el texto de normalizacion_avanzada_pdf (p. ej. porque también
+    lo usa para buscar identificadores huérfanos) puede pasarlo en texto_normalizado y no
+    se vuelve a normalizar.
     """
     # 1) Obtener texto normalizado
-    if raw_text is not None:
+    if texto_normalizado is not None:
+        texto = texto_normalizado
+    elif raw_text is not None:
         texto = normalizacion_avanzada_pdf(raw_text=raw_text)
     elif path_pdf:
         texto = normalizacion_avanzada_pdf(path_pdf=path_pdf)
     else:
-        raise ValueError("Se debe pasar path_pdf o raw_text")
+        raise ValueError("Se debe pasar path_pdf, raw_text o texto_normalizado")
     
     #print("texto pdf: ", texto)
 
-    # 2) Mapear cada etiqueta a su regex de número
-    doc_patterns = {
-        "DNI":      r'\bDNI\s+(\d+)\b',
-        "MATRICULA":r'\bMATRICULA\s+(\d+)\b',
-        "CUIF":     r'\bCUIF\s+(\d+)\b',
-        "CUIT":     r'\bCUIT\s+(\d+)\b',
-        "CUIL":     r'\bCUIL\s+(\d+)\b',
+    # 2) Buscar cada etiqueta (ver _PATRONES_ETIQUETAS) UNA sola vez en todo el texto.
+    # Las búsquedas "hacia adelante" del paso 6 se resuelven con bisect sobre estas
+    # posiciones en lugar de copiar y volver a escanear el resto del texto por match
+    matches_por_etiqueta = {
+        etiqueta: list(regex.finditer(texto))
+        for etiqueta, regex in _PATRONES_ETIQUETAS.items()
+    }
+    inicios_por_etiqueta = {
+        etiqueta: [m.start() for m in matches]
+        for etiqueta, matches in matches_por_etiqueta.items()
     }
 
-    # 3) Patrón de nombre: mínimo 1 palabra que empiecen en mayúscula, máximo 6 (la palabra iniclal (1) + 5 más que cumplan los requisitos)
-    name_pat_natural = re.compile(
-        r'\b([A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+'
-        r'(?:\s+[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+){1,5})\b'
-    )
+    # 3) Patrón de nombre "natural": ver _PATRON_NOMBRE_NATURAL
+    name_pat_natural = _PATRON_NOMBRE_NATURAL
 
     window_natural  = 100  # caracteres hacia atrás desde el inicio del match
 
-    # 4) Patrón de nombre “jurídico”: hasta 7 palabras, admitiendo puntos y & en cada token
-    name_pat_juridico = re.compile(
-        r'\b('
-        r'[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\.\&]+'              # primera “palabra” con letras, puntos o &
-        r'(?:\s+[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ\.\&]+){1,7}'  # de 1 a 7 palabras adicionales iguales
-        r')\b'
-    )
+    # 4) Patrón de nombre “jurídico”: ver _PATRON_NOMBRE_JURIDICO
+    name_pat_juridico = _PATRON_NOMBRE_JURIDICO
     window_juridico = 70
 
     # Extrae el último nombre que coincide con name_pattern dentro de los window_size caracteres anteriores a idx
@@ -51,33 +108,19 @@ def detectar_personas_dni_matricula(path_pdf: str = None, raw_text: str = None):
         matches = name_pattern.findall(segmento)
         return matches[-1] if matches else ""
 
-    # 5) Stop-words
-    STOP_WORDS = {
-        # Documentos / etiquetas
-        "dni", "matricula", "mp", "cuif", "cuit", "cuil",
-        
-        # Tratamientos y títulos
-        "señor", "señora", "sr", "sra", "srta", "juez", "jueza",
-        "ciudadano", "ciudadana",
-        "doctor", "doctora", "dr", "dra", "drs", "dras", "dr.", "dra.", "drs.", "dras.",
-        "abogado", "abogada", "letrado", "letrada",
-        
-        # Palabras comunes que no deben formar parte del nombre
-        "que", "heredero", "heredera", "nacimiento", "partida"
-    }
+    # 5) Stop-words: ver _STOP_WORDS_NOMBRES
 
     # 6) Primer pase: detección “natural” para todas las etiquetas
     raw_grouped = defaultdict(list)  # raw_name -> [ "DNI N° xxx", ... ]
-    for etiqueta, pat in doc_patterns.items():
-        regex = re.compile(pat, flags=re.IGNORECASE)
-        for m in regex.finditer(texto):
+    for etiqueta, matches in matches_por_etiqueta.items():
+        for m in matches:
             num = m.group(1)
             # usar patrón natural
             raw_name = extraer_nombre(m.start(), name_pat_natural, window_natural)
             if not raw_name:
                 continue
             # filtrar stop-words
-            tokens = [t for t in raw_name.split() if t.lower() not in STOP_WORDS]
+            tokens = [t for t in raw_name.split() if t.lower() not in _STOP_WORDS_NOMBRES]
             if len(tokens) < 2:
                 continue
             clean_name = " ".join(tokens)
@@ -90,29 +133,31 @@ def detectar_personas_dni_matricula(path_pdf: str = None, raw_text: str = None):
                     raw_grouped[clean_name].append(clave)
 
                 # --- Buscar documentos extra hacia adelante (sin truncar, con límite de distancia) ---
-                tail = texto[m.end():]  # NO recortamos a 70 para no truncar números. Si llega a 70 caracteres y detectó un número, este lo obtendrá entero a pesar de que supere el límite establecido
-                for other_label, other_pat in doc_patterns.items():
+                # Primer match de cada otra etiqueta que empiece después del actual. El límite
+                # se aplica al inicio del match, así que el número se obtiene entero aunque
+                # termine más allá de los 70 caracteres
+                for other_label, inicios in inicios_por_etiqueta.items():
                     if other_label == etiqueta:
                         continue  # evitar duplicar el mismo tipo
 
-                    regex2 = re.compile(other_pat, flags=re.IGNORECASE)
-                    m2 = regex2.search(tail)
-                    if not m2:
+                    idx = bisect_left(inicios, m.end())
+                    if idx == len(inicios):
                         continue
+                    m2 = matches_por_etiqueta[other_label][idx]
+                    distancia = m2.start() - m.end()
 
                     # 1) Respetar tu ventana de 70: solo aceptar si el doc está a <= 70 chars
-                    if m2.start() > 70:
+                    if distancia > 70:
                         continue
 
                     # 2) Si entre el doc actual y el próximo aparece un posible nombre, no asociar
-                    segmento_entre = tail[:m2.start()]
-                    if re.search(r'\b[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+(?:\s+[A-ZÁÉÍÓÚÑ][A-Za-zÁÉÍÓÚÑáéíóúñ]+){1,3}\b', segmento_entre):
+                    if _PATRON_NOMBRE_ENTRE_DOCUMENTOS.search(texto, m.end(), m2.start()):
                         continue
 
                     # 3) Extraer número (y limpiar separadores si es CUIT/CUIL)
                     num2 = m2.group(1)
                     if other_label in ("CUIT", "CUIL"):
-                        num2 = re.sub(r'\D', '', num2)
+                        num2 = _PATRON_NO_DIGITO.sub('', num2)
 
                     clave2 = f"{other_label} N° {num2}"
 
@@ -135,7 +180,7 @@ def detectar_personas_dni_matricula(path_pdf: str = None, raw_text: str = None):
                 # extraer nombre con ventana reducida y patrón jurídico
                 new_raw = extraer_nombre(m.start(), name_pat_juridico, window_juridico)
                 if new_raw:
-                    tokens = [t for t in new_raw.split() if t.lower() not in STOP_WORDS]
+                    tokens = [t for t in new_raw.split() if t.lower() not in _STOP_WORDS_NOMBRES]
                     if len(tokens) >= 2:
                         new_clean = " ".join(tokens)
                         # reasignar tags al nuevo nombre
@@ -181,11 +226,7 @@ def detectar_personas_dni_matricula(path_pdf: str = None, raw_text: str = None):
     for e in merged:
         name = e['name'].strip()
         # Buscar todos los documentos en las etiquetas
-        doc_keys = set(re.findall(
-            r'(DNI|MATRICULA|CUIT|CUIL|CUIF)\s+N°\s*(\d+)',
-            " ".join(e['tags']),
-            flags=re.IGNORECASE
-        ))
+        doc_keys = set(_PATRON_DOCUMENTO_EN_ETIQUETA.findall(" ".join(e['tags'])))
 
         duplicate_of = None
         for doc_type, num in doc_keys:
@@ -9,6 +9,23 @@ def extraer_valores_txt(path_txt='datos.txt'):
     with open(path_txt, 'r', encoding='utf-8-sig') as file: # Se usa utf-8-sig para evitar problemas con BOM
         datos = json.load(file)
 
+    return normalizar_valores_datos(datos)
+
+
+def cargar_valores_desde_bytes(contenido: bytes):
+    """
+    Igual que extraer_valores_txt, pero sobre el contenido ya leído del archivo
+    (p. ej. un upload ya validado), sin pasar por disco.
+    """
+    datos = json.loads(contenido.decode('utf-8-sig')) # utf-8-sig: igual que al leer el archivo, ignora el BOM
+    return normalizar_valores_datos(datos)
+
+
+def normalizar_valores_datos(datos):
+    """
+    Normaliza en el lugar los valores string de los datos ya cargados (raíz, listas
+    y diccionarios) y los devuelve.
+    """
     # Normalizar los valores eliminando espacios múltiples y aplicando strip
     def normalizar_valor(val):
         if isinstance(val, str):
@@ -16,8 +16,8 @@ PATRONES_DOCUMENTOS = {
     "CBU": r'\bCBU\b',
 }
 
-# Stop-words para filtrar nombres
-STOP_WORDS = {
+# Stop-words para filtrar nombres (frozenset: se consulta token a token y nunca se modifica)
+STOP_WORDS = frozenset({
     # Documentos / etiquetas
     "dni", "matricula", "mp", "cuif", "cuit", "cuil", "cbu",
     
@@ -26,7 +26,7 @@ STOP_WORDS = {
     "ciudadano", "ciudadana",
     "doctor", "doctora", "dr", "dra", "drs", "dras", "dr.", "dra.", "drs.", "dras.",
     "abogado", "abogada", "letrado", "letrada",
-}
+})
 
 # Anclas contextuales - Nombres a la DERECHA del ancla
 ANCLAS_CONTEXTUALES_DERECHA = [
@@ -52,7 +52,7 @@ ANCLAS_CONTEXTUALES_IZQUIERDA = [
 ANCLAS_CONTEXTUALES = ANCLAS_CONTEXTUALES_DERECHA + ANCLAS_CONTEXTUALES_IZQUIERDA
 
 # Palabras a eliminar del inicio/final de nombres (preposiciones, conjunciones)
-PALABRAS_LIMPIEZA_BORDES = {"del", "de", "y", "e", "la", "el", "los", "las", "en"}
+PALABRAS_LIMPIEZA_BORDES = frozenset({"del", "de", "y", "e", "la", "el", "los", "las", "en"})
 
 
 def limpiar_bordes_nombre(nombre: str) -> str:
@@ -165,4 +165,4 @@ _PALABRAS_FILTRO_BASE = {
 }
 
 # Expandir automáticamente las palabras con sus variantes (género, número)
-PALABRAS_FILTRO_NOMBRES = _expandir_lemas(_PALABRAS_FILTRO_BASE)
\ No newline at end of file
+PALABRAS_FILTRO_NOMBRES = frozenset(_expandir_lemas(_PALABRAS_FILTRO_BASE))
\ No newline at end of file
@@ -3,8 +3,10 @@ Sistema de Reglas de Anclaje Contextual para detectar nombres en documentos judi
 Implementa 6 reglas contextuales usando spaCy Matcher.
 """
 
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Sequence
 import re
+import threading
+from bisect import bisect_left
 import spacy
 from spacy.matcher import Matcher
 from funcs.nlp_extractors.constantes import (
@@ -18,6 +20,41 @@ _PATRON_NOMBRE_COMA = re.compile(
     r'\b([A-ZÁÉÍÓÚÑ]{2,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,2}),\s+([A-ZÁÉÍÓÚÑ]{2,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,2})\b'
 )
 
+# Chequeo rápido: todas las reglas necesitan al menos dos tokens alfabéticos
+# consecutivos que empiecen en mayúscula (min 2 caracteres), separados por
+# espacios (o por ", " en la regla 6). Si no aparece ninguno, no hay nada que buscar.
+# Inicial: cualquier letra que no sea minúscula española (conservador: ante la duda, pasa)
+_PATRON_CHEQUEO_RAPIDO = re.compile(
+    r'[^\W\d_a-záéíóúñü][^\W\d_]+,?\s+[^\W\d_a-záéíóúñü][^\W\d_]+'
+)
+
+
+# Marcadores de expediente (reglas 3 y 5). Ningún token puede ser un marcador "C/"
+# si el texto no contiene "C/", "C.", "c/" o "c.": en ese caso ambas reglas, que
+# recorren todos los tokens en Python, se saltean con una búsqueda en C
+_MARCADORES_C = frozenset({"C/", "C.", "c/", "c."})
+_MARCADORES_S = frozenset({"S/", "S.", "s/", "s."})
+_PATRON_MARCADOR_C = re.compile(r'[Cc][/.]')
+
+
+def _compilar_patron_anclas(anclas: List[str]) -> Optional[re.Pattern]:
+    r"""
+    Compila una lista de anclas en un único patrón con límites de palabra.
+    
+    Se usan lookarounds (?<!\w)/(?!\w) en lugar de \b para que las anclas que
+    terminan en puntuación (ej: "dr.") también funcionen. Las alternativas se
+    ordenan de mayor a menor longitud ("doctoras" antes que "doctor").
+    """
+    if not anclas:
+        return None
+    alternativas = "|".join(re.escape(a) for a in sorted(anclas, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternativas})(?!\w)", re.IGNORECASE)
+
+
+# Evita falsos positivos como "dr" dentro de "Pedro" o "sr" dentro de "Israel"
+_PATRON_ANCLAS_DERECHA = _compilar_patron_anclas(ANCLAS_CONTEXTUALES_DERECHA)
+_PATRON_ANCLAS_IZQUIERDA = _compilar_patron_anclas(ANCLAS_CONTEXTUALES_IZQUIERDA)
+
 
 class ContextualAnchorMatcher:
     """
@@ -27,6 +64,11 @@ class ContextualAnchorMatcher:
     sin depender de NER tradicional.
     """
     
+    # Matcher compartido por vocabulario (clave: id(nlp.vocab)). Las reglas son
+    # constantes, así que el Matcher se construye una sola vez por proceso
+    _matchers_compartidos: Dict[int, Matcher] = {}
+    _lock = threading.Lock()
+    
     def __init__(self, nlp):
         """
         Inicializa el matcher con el modelo spaCy.
@@ -35,9 +77,11 @@ class ContextualAnchorMatcher:
             nlp: Pipeline de spaCy cargado
         """
         self.nlp = nlp
-        self.matcher = Matcher(nlp.vocab)
-        # Cache para tokens indexados por posición (evita recálculos)
-        self._token_cache = {}
+        clave = id(nlp.vocab)
+        with ContextualAnchorMatcher._lock:
+            if clave not in ContextualAnchorMatcher._matchers_compartidos:
+                ContextualAnchorMatcher._matchers_compartidos[clave] = Matcher(nlp.vocab)
+            self.matcher = ContextualAnchorMatcher._matchers_compartidos[clave]
     
     def _extraer_contexto(self, doc_text: str, start: int, end: int, window: int = 60) -> str:
         """
@@ -57,7 +101,20 @@ class ContextualAnchorMatcher:
         return doc_text[ctx_start:ctx_end].strip()
     
     def add_default_rules(self):
-        """Registra las 6 reglas contextuales por defecto."""
+        """
+        Registra las 6 reglas contextuales por defecto.
+        
+        Es idempotente: el Matcher es compartido, así que las reglas solo se
+        agregan la primera vez.
+        """
+        with ContextualAnchorMatcher._lock:
+            self._agregar_reglas_matcher()
+    
+    def _agregar_reglas_matcher(self):
+        """Agrega al Matcher las reglas 2 y 4 si todavía no están registradas."""
+        if "NOMBRE_DESPUES_DE_CONTRA" in self.matcher and "APELLIDO_NOMBRE_JUDICIAL" in self.matcher:
+            return
+        
         # REGLA 2: "contra" + nombres en MAYÚSCULAS (2-6 tokens, mínimo 2 caracteres)
         patron_contra = [
             {"LOWER": "contra"},
@@ -68,7 +125,8 @@ class ContextualAnchorMatcher:
             {"IS_ALPHA": True, "IS_UPPER": True, "LENGTH": {">=": 2}, "OP": "?"},
             {"IS_ALPHA": True, "IS_UPPER": True, "LENGTH": {">=": 2}, "OP": "?"},
         ]
-        self.matcher.add("NOMBRE_DESPUES_DE_CONTRA", [patron_contra], greedy="LONGEST")
+        if "NOMBRE_DESPUES_DE_CONTRA" not in self.matcher:
+            self.matcher.add("NOMBRE_DESPUES_DE_CONTRA", [patron_contra], greedy="LONGEST")
         
         # REGLA 4: Apellido + Nombre (Title Case, 2-6 tokens, mínimo 2 caracteres)
         patron_apellido_nombre = [
@@ -79,9 +137,10 @@ class ContextualAnchorMatcher:
             {"IS_ALPHA": True, "IS_TITLE": True, "LENGTH": {">=": 2}, "OP": "?"},
             {"IS_ALPHA": True, "IS_TITLE": True, "LENGTH": {">=": 2}, "OP": "?"},
         ]
-        self.matcher.add("APELLIDO_NOMBRE_JUDICIAL", [patron_apellido_nombre], greedy="LONGEST")
+        if "APELLIDO_NOMBRE_JUDICIAL" not in self.matcher:
+            self.matcher.add("APELLIDO_NOMBRE_JUDICIAL", [patron_apellido_nombre], greedy="LONGEST")
     
-    def find_matches(self, doc) -> List[Dict[str, Any]]:
+    def find_matches(self, doc, include_context: bool = True) -> List[Dict[str, Any]]:
         """
         Encuentra todas las coincidencias de reglas de anclaje en el documento.
         
@@ -93,6 +152,8 @@ class ContextualAnchorMatcher:
         
         Args:
             doc: Documento procesado por spaCy
+            include_context: Si es False no se arma el campo "context"; el llamador
+                puede obtenerlo bajo demanda con get_context()
             
         Returns:
             Lista de diccionarios con información de cada coincidencia:
@@ -108,65 +169,151 @@ class ContextualAnchorMatcher:
                 }
             ]
         """
+        # OPTIMIZACIÓN: Si el texto no tiene ningún par de palabras capitalizadas
+        # consecutivas, ninguna regla (ni el Matcher) puede disparar
+        if not _PATRON_CHEQUEO_RAPIDO.search(doc.text):
+            return []
+        
         resultados = []
         
+        # OPTIMIZACIÓN: Cachear token.text una sola vez por documento
+        # (cada acceso a .text cruza Cython y el StringStore)
+        textos = [token.text for token in doc]
+        # Índice local a la llamada (sin estado mutable en la instancia: un mismo
+        # matcher puede compartirse entre hilos)
+        posiciones = self._construir_posiciones(doc)
+        
         # ========== REGLA 1: ANCLAS_CONTEXTUALES ==========
-        anclas_matches = self._detectar_anclas_contextuales(doc)
+        anclas_matches = self._detectar_anclas_contextuales(doc, textos, posiciones)
         resultados.extend(anclas_matches)
         
+        # Las reglas 3 y 5 solo disparan sobre un marcador "C/"; la 6 necesita una coma
+        doc_text = doc.text
+        hay_marcador_c = _PATRON_MARCADOR_C.search(doc_text) is not None
+        
         # ========== REGLA 3: PATRON_C_S ==========
-        patron_cs_matches = self._detectar_patron_c_s(doc)
-        resultados.extend(patron_cs_matches)
+        if hay_marcador_c:
+            patron_cs_matches = self._detectar_patron_c_s(doc, textos)
+            resultados.extend(patron_cs_matches)
         
         # ========== REGLA 5: NOMBRE_ANTES_DE_C_BARRA ==========
-        nombre_antes_c_matches = self._detectar_nombre_antes_de_c_barra(doc)
-        resultados.extend(nombre_antes_c_matches)
+        if hay_marcador_c:
+            nombre_antes_c_matches = self._detectar_nombre_antes_de_c_barra(doc, textos, posiciones)
+            resultados.extend(nombre_antes_c_matches)
         
         # ========== REGLA 6: NOMBRE_JUDICIAL_CON_COMA ==========
-        nombre_coma_matches = self._detectar_nombre_judicial_con_coma(doc)
-        resultados.extend(nombre_coma_matches)
+        if ',' in doc_text:
+            nombre_coma_matches = self._detectar_nombre_judicial_con_coma(doc)
+            resultados.extend(nombre_coma_matches)
         
         # ========== REGLAS 2 y 4: Matcher de spaCy ==========
         matches = self.matcher(doc)
         
+        # Spans de nombre ya cubiertos por las reglas custom: si el nombre que
+        # sigue a "contra" ya fue detectado, no se arma un resultado duplicado
+        spans_cubiertos = {(r["span_start"], r["span_end"]) for r in resultados}
+        
         for match_id, start, end in matches:
             rule_name = self.nlp.vocab.strings[match_id]
             span = doc[start:end]
-            matched_text = span.text
             
             # Determinar ancla y tokens según la regla
             if rule_name == "NOMBRE_DESPUES_DE_CONTRA":
+                if (doc[start + 1].idx, span.end_char) in spans_cubiertos:
+                    continue
                 anchor = "contra"
-                name_tokens = [token.text for token in span[1:]]  # Excluir "contra"
+                name_tokens = textos[start + 1:end]  # Excluir "contra"
             elif rule_name == "APELLIDO_NOMBRE_JUDICIAL":
                 anchor = "title_case"
-                name_tokens = [token.text for token in span]
+                name_tokens = textos[start:end]
             else:
                 anchor = "unknown"
-                name_tokens = [token.text for token in span]
-            
-            # Extraer contexto (60 caracteres antes y después)
-            span_start_char = span.start_char
-            span_end_char = span.end_char
-            
-            ctx_start = max(0, span_start_char - 60)
-            ctx_end = min(len(doc.text), span_end_char + 60)
-            context = doc.text[ctx_start:ctx_end].strip()
+                name_tokens = textos[start:end]
             
             resultado = {
                 "rule": rule_name,
                 "anchor": anchor,
-                "matched_text": matched_text,
+                "matched_text": span.text,
                 "name_tokens": name_tokens,
-                "span_start": span_start_char,
-                "span_end": span_end_char,
-                "context": context
+                "span_start": span.start_char,
+                "span_end": span.end_char
             }
             
             resultados.append(resultado)
         
+        # Varias reglas disparan sobre el mismo span ("PÉREZ, CARLOS" por anclas,
+        # coma y Matcher): deduplicar antes de devolver
+        resultados = self._deduplicar_resultados(resultados)
+        
+        # OPTIMIZACIÓN: El contexto se arma al final y solo para las coincidencias
+        # que sobreviven a la deduplicación (o nunca, si el llamador no lo necesita)
+        if include_context:
+            doc_text = doc.text
+            for resultado in resultados:
+                resultado["context"] = self.get_context(resultado, doc_text)
+        
         return resultados
     
+    def get_context(self, match: Dict[str, Any], doc_text: str) -> str:
+        """
+        Obtiene el contexto de una coincidencia bajo demanda (60 caracteres antes y después).
+        
+        Args:
+            match: Coincidencia devuelta por find_matches
+            doc_text: Texto completo del documento
+            
+        Returns:
+            Contexto extraído
+        """
+        return self._extraer_contexto(doc_text, match["span_start"], match["span_end"])
+    
+    def _deduplicar_resultados(self, resultados: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Elimina coincidencias repetidas entre reglas (OPTIMIZADO).
+        
+        1. Duplicados exactos: mismo (span_start, span_end) → se conserva el primero
+           (respeta el orden de ejecución de las reglas).
+        2. Casi-duplicados: un span contenido en el anterior y que difiere en a lo
+           sumo 2 caracteres por cada borde → barrido lineal sobre la lista ordenada.
+        
+        Args:
+            resultados: Coincidencias de todas las reglas
+            
+        Returns:
+            Coincidencias sin duplicados, en el orden original
+        """
+        vistos = set()
+        unicos = []
+        for resultado in resultados:
+            clave = (resultado["span_start"], resultado["span_end"])
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            unicos.append(resultado)
+        
+        # Barrido: ordenar por inicio (y fin descendente para que el contenedor vaya primero)
+        orden = sorted(
+            range(len(unicos)),
+            key=lambda i: (unicos[i]["span_start"], -unicos[i]["span_end"])
+        )
+        descartados = set()
+        previo = None
+        for i in orden:
+            actual = unicos[i]
+            if (
+                previo is not None
+                and actual["span_end"] <= previo["span_end"]
+                and actual["span_start"] - previo["span_start"] <= 2
+                and previo["span_end"] - actual["span_end"] <= 2
+            ):
+                descartados.add(i)
+                continue
+            previo = actual
+        
+        if not descartados:
+            return unicos
+        return [r for i, r in enumerate(unicos) if i not in descartados]
+    
     def extract_names(self, doc) -> List[str]:
         """
         Extrae únicamente los nombres detectados por las reglas de anclaje.
@@ -189,7 +336,9 @@ class ContextualAnchorMatcher:
         
         return nombres
     
-    def _detectar_anclas_contextuales(self, doc) -> List[Dict[str, Any]]:
+    def _detectar_anclas_contextuales(
+        self, doc, textos: List[str], posiciones: List[int]
+    ) -> List[Dict[str, Any]]:
         """
         REGLA 1: Detecta nombres cerca de anclas contextuales (OPTIMIZADO).
         
@@ -200,58 +349,46 @@ class ContextualAnchorMatcher:
         
         Args:
             doc: Documento procesado por spaCy
+            textos: Texto de cada token del documento (cacheado)
+            posiciones: Posición de carácter de cada token (ordenada)
             
         Returns:
             Lista de matches con la estructura estándar
         """
         resultados = []
-        texto_lower = doc.text.lower()
+        # Los patrones son IGNORECASE: se busca sobre el texto original, sin
+        # generar una copia en minúsculas del documento completo (además las
+        # posiciones quedan alineadas aunque .lower() cambie longitudes)
         doc_text = doc.text
         
-        # OPTIMIZACIÓN: Construir índice de tokens por posición de caracteres (una sola vez)
-        # Esto evita iterar sobre todos los tokens en cada búsqueda de ventana
-        if id(doc) not in self._token_cache:
-            token_por_posicion = []
-            for token in doc:
-                token_por_posicion.append((token.idx, token))
-            self._token_cache[id(doc)] = token_por_posicion
-        else:
-            token_por_posicion = self._token_cache[id(doc)]
-        
         # ========== PROCESAR ANCLAS DERECHA (nombre después del ancla) ==========
-        # OPTIMIZACIÓN: Crear regex pattern para buscar todas las anclas de una vez
-        if ANCLAS_CONTEXTUALES_DERECHA:
-            # Escapar caracteres especiales y unir con |
-            anclas_escaped = [re.escape(a) for a in ANCLAS_CONTEXTUALES_DERECHA]
-            pattern_derecha = re.compile('|'.join(anclas_escaped), re.IGNORECASE)
-            
-            for match in pattern_derecha.finditer(texto_lower):
-                ancla = match.group()
-                pos = match.start()
+        # OPTIMIZACIÓN: Regex pre-compilado que busca todas las anclas de una vez
+        if _PATRON_ANCLAS_DERECHA is not None:
+            for match in _PATRON_ANCLAS_DERECHA.finditer(doc_text):
+                ancla = match.group().lower()
                 
                 # Ventana: desde el FINAL del ancla hasta +70 caracteres
-                ancla_end = pos + len(ancla)
+                ancla_end = match.end()
                 ventana_start = ancla_end
                 ventana_end = min(len(doc_text), ancla_end + 70)
                 
                 # OPTIMIZACIÓN: Buscar tokens en ventana usando búsqueda binaria/filtrado eficiente
-                tokens_en_ventana = [tok for pos_idx, tok in token_por_posicion 
-                                     if ventana_start <= pos_idx < ventana_end]
+                indices_en_ventana = range(
+                    bisect_left(posiciones, ventana_start),
+                    bisect_left(posiciones, ventana_end)
+                )
                 
                 # Buscar secuencias de 2-6 tokens consecutivos válidos
                 nombre_detectado = self._buscar_nombre_en_tokens(
-                    tokens_en_ventana, doc_text, ancla, "ANCLAS_CONTEXTUALES_DERECHA"
+                    doc, textos, indices_en_ventana, doc_text, ancla, "ANCLAS_CONTEXTUALES_DERECHA"
                 )
                 if nombre_detectado:
                     resultados.append(nombre_detectado)
         
         # ========== PROCESAR ANCLAS IZQUIERDA (nombre antes del ancla) ==========
-        if ANCLAS_CONTEXTUALES_IZQUIERDA:
-            anclas_escaped = [re.escape(a) for a in ANCLAS_CONTEXTUALES_IZQUIERDA]
-            pattern_izquierda = re.compile('|'.join(anclas_escaped), re.IGNORECASE)
-            
-            for match in pattern_izquierda.finditer(texto_lower):
-                ancla = match.group()
+        if _PATRON_ANCLAS_IZQUIERDA is not None:
+            for match in _PATRON_ANCLAS_IZQUIERDA.finditer(doc_text):
+                ancla = match.group().lower()
                 pos = match.start()
                 
                 # Ventana: desde -70 caracteres hasta el INICIO del ancla
@@ -259,21 +396,36 @@ class ContextualAnchorMatcher:
                 ventana_end = pos
                 
                 # Encontrar tokens a la IZQUIERDA del ancla
-                tokens_en_ventana = [tok for pos_idx, tok in token_por_posicion 
-                                     if ventana_start <= pos_idx < ventana_end]
+                indices_en_ventana = range(
+                    bisect_left(posiciones, ventana_start),
+                    bisect_left(posiciones, ventana_end)
+                )
                 
                 # Buscar secuencias de 2-6 tokens consecutivos válidos
                 nombre_detectado = self._buscar_nombre_en_tokens_izquierda(
-                    tokens_en_ventana, doc_text, ancla, "ANCLAS_CONTEXTUALES_IZQUIERDA"
+                    doc, textos, indices_en_ventana, doc_text, ancla, "ANCLAS_CONTEXTUALES_IZQUIERDA"
                 )
                 if nombre_detectado:
                     resultados.append(nombre_detectado)
         
         return resultados
     
+    @staticmethod
+    def _construir_posiciones(doc) -> List[int]:
+        """
+        Devuelve la posición de carácter (token.idx) de cada token, en orden.
+        
+        La lista está ordenada de forma ascendente, por lo que una ventana de
+        caracteres [inicio, fin) corresponde al rango de índices
+        [bisect_left(posiciones, inicio), bisect_left(posiciones, fin)).
+        """
+        return [token.idx for token in doc]
+    
     def _buscar_nombre_en_tokens(
         self, 
-        tokens_en_ventana: List, 
+        doc,
+        textos: List[str],
+        indices_en_ventana: Sequence[int], 
         doc_text: str, 
         ancla: str, 
         rule_name: str
@@ -285,49 +437,41 @@ class ContextualAnchorMatcher:
         VALIDACIÓN: Cada token debe tener al menos 2 caracteres para evitar
         detectar letras sueltas como "S E N T E N C I A".
         """
-        ventana_len = len(tokens_en_ventana)
+        ventana_len = len(indices_en_ventana)
         
-        for i in range(ventana_len):
-            token_inicial = tokens_en_ventana[i]
+        for k in range(ventana_len):
+            i = indices_en_ventana[k]
             
             # Verificar condiciones del token inicial (min 2 caracteres)
-            text_inicial = token_inicial.text
-            if not token_inicial.is_alpha or not text_inicial[0].isupper() or len(text_inicial) < 2:
+            text_inicial = textos[i]
+            if len(text_inicial) < 2 or not text_inicial[0].isupper() or not doc[i].is_alpha:
                 continue
             
             # Acumular tokens consecutivos válidos (cada uno con min 2 caracteres)
-            tokens_candidatos = [token_inicial]
-            max_j = min(i + 6, ventana_len)
-            
-            for j in range(i + 1, max_j):
-                token_siguiente = tokens_en_ventana[j]
-                text_siguiente = token_siguiente.text
-                if token_siguiente.is_alpha and text_siguiente[0].isupper() and len(text_siguiente) >= 2:
-                    tokens_candidatos.append(token_siguiente)
+            candidatos = [i]
+            max_k = min(k + 6, ventana_len)
+            
+            for m in range(k + 1, max_k):
+                j = indices_en_ventana[m]
+                text_siguiente = textos[j]
+                if len(text_siguiente) >= 2 and text_siguiente[0].isupper() and doc[j].is_alpha:
+                    candidatos.append(j)
                 else:
                     break
             
             # Validar cantidad de tokens
-            if 2 <= len(tokens_candidatos) <= 6:
-                span_start = tokens_candidatos[0].idx
-                last_token = tokens_candidatos[-1]
-                span_end = last_token.idx + len(last_token.text)
-                
-                return {
-                    "rule": rule_name,
-                    "anchor": ancla,
-                    "matched_text": doc_text[span_start:span_end],
-                    "name_tokens": [t.text for t in tokens_candidatos],
-                    "span_start": span_start,
-                    "span_end": span_end,
-                    "context": self._extraer_contexto(doc_text, span_start, span_end)
-                }
+            if 2 <= len(candidatos) <= 6:
+                return self._construir_resultado(
+                    doc, textos, candidatos, doc_text, ancla, rule_name
+                )
         
         return None
     
     def _buscar_nombre_en_tokens_izquierda(
         self, 
-        tokens_en_ventana: List, 
+        doc,
+        textos: List[str],
+        indices_en_ventana: Sequence[int], 
         doc_text: str, 
         ancla: str, 
         rule_name: str
@@ -340,48 +484,61 @@ class ContextualAnchorMatcher:
         detectar letras sueltas como "S E N T E N C I A".
         """
         # Iterar desde el final hacia el inicio para encontrar el más cercano al ancla
-        for i in range(len(tokens_en_ventana) - 1, -1, -1):
-            token_inicial = tokens_en_ventana[i]
+        for k in range(len(indices_en_ventana) - 1, -1, -1):
+            i = indices_en_ventana[k]
             
             # Verificar condiciones del token inicial (min 2 caracteres)
-            text_inicial = token_inicial.text
-            if not token_inicial.is_alpha or not text_inicial[0].isupper() or len(text_inicial) < 2:
+            text_inicial = textos[i]
+            if len(text_inicial) < 2 or not text_inicial[0].isupper() or not doc[i].is_alpha:
                 continue
             
             # Acumular tokens consecutivos válidos hacia la izquierda (cada uno con min 2 caracteres)
-            tokens_candidatos = [token_inicial]
-            min_j = max(-1, i - 6)
-            
-            for j in range(i - 1, min_j, -1):
-                if j < 0:
-                    break
-                token_anterior = tokens_en_ventana[j]
-                text_anterior = token_anterior.text
-                if token_anterior.is_alpha and text_anterior[0].isupper() and len(text_anterior) >= 2:
-                    tokens_candidatos.insert(0, token_anterior)
+            candidatos = [i]
+            min_m = max(-1, k - 6)
+            
+            for m in range(k - 1, min_m, -1):
+                j = indices_en_ventana[m]
+                text_anterior = textos[j]
+                if len(text_anterior) >= 2 and text_anterior[0].isupper() and doc[j].is_alpha:
+                    candidatos.insert(0, j)
                 else:
                     break
             
             # Validar cantidad de tokens
-            if 2 <= len(tokens_candidatos) <= 6:
-                span_start = tokens_candidatos[0].idx
-                last_token = tokens_candidatos[-1]
-                span_end = last_token.idx + len(last_token.text)
-                
+            if 2 <= len(candidatos) <= 6:
                 # Retornar inmediatamente el más cercano al ancla (primera coincidencia válida)
-                return {
-                    "rule": rule_name,
-                    "anchor": ancla,
-                    "matched_text": doc_text[span_start:span_end],
-                    "name_tokens": [t.text for t in tokens_candidatos],
-                    "span_start": span_start,
-                    "span_end": span_end,
-                    "context": self._extraer_contexto(doc_text, span_start, span_end)
-                }
+                return self._construir_resultado(
+                    doc, textos, candidatos, doc_text, ancla, rule_name
+                )
         
         return None
     
-    def _detectar_patron_c_s(self, doc) -> List[Dict[str, Any]]:
+    def _construir_resultado(
+        self,
+        doc,
+        textos: List[str],
+        candidatos: List[int],
+        doc_text: str,
+        ancla: str,
+        rule_name: str
+    ) -> Dict[str, Any]:
+        """
+        Arma el diccionario estándar de coincidencia a partir de índices de tokens.
+        """
+        span_start = doc[candidatos[0]].idx
+        ultimo = candidatos[-1]
+        span_end = doc[ultimo].idx + len(textos[ultimo])
+        
+        return {
+            "rule": rule_name,
+            "anchor": ancla,
+            "matched_text": doc_text[span_start:span_end],
+            "name_tokens": [textos[i] for i in candidatos],
+            "span_start": span_start,
+            "span_end": span_end
+        }
+    
+    def _detectar_patron_c_s(self, doc, textos: List[str]) -> List[Dict[str, Any]]:
         """
         REGLA 3: Detecta nombres entre "C/" y "S/" (formato expediente judicial) (OPTIMIZADO).
         
@@ -390,6 +547,7 @@ class ContextualAnchorMatcher:
         
         Args:
             doc: Documento procesado por spaCy
+            textos: Texto de cada token del documento (cacheado)
             
         Returns:
             Lista de matches con la estructura estándar
@@ -397,16 +555,15 @@ class ContextualAnchorMatcher:
         resultados = []
         doc_text = doc.text
         
-        # OPTIMIZACIÓN: Set para búsqueda O(1) y listas para orden
-        marcadores_c = {"C/", "C.", "c/", "c."}
-        marcadores_s = {"S/", "S.", "s/", "s."}
+        # OPTIMIZACIÓN: frozensets de módulo para búsqueda O(1) y listas para orden
+        marcadores_c = _MARCADORES_C
+        marcadores_s = _MARCADORES_S
         
         indices_c = []
         indices_s = []
         
         # Una sola iteración sobre tokens
-        for i, token in enumerate(doc):
-            token_text = token.text
+        for i, token_text in enumerate(textos):
             if token_text in marcadores_c:
                 indices_c.append(i)
             elif token_text in marcadores_s:
@@ -431,33 +588,24 @@ class ContextualAnchorMatcher:
             # Extraer tokens entre C/ y S/ (min 2 caracteres cada token)
             tokens_entre = []
             for i in range(idx_c + 1, idx_s):
-                token = doc[i]
-                token_text = token.text
+                token_text = textos[i]
                 
-                if token.is_alpha and token_text[0].isupper() and len(token_text) >= 2:
-                    tokens_entre.append(token)
+                if len(token_text) >= 2 and token_text[0].isupper() and doc[i].is_alpha:
+                    tokens_entre.append(i)
                 elif tokens_entre:  # Si ya empezamos a acumular, detener al encontrar no-alpha
                     break
             
             # Validar que haya entre 2 y 6 tokens
             if 2 <= len(tokens_entre) <= 6:
-                span_start = tokens_entre[0].idx
-                last_token = tokens_entre[-1]
-                span_end = last_token.idx + len(last_token.text)
-                
-                resultados.append({
-                    "rule": "PATRON_C_S",
-                    "anchor": "C/...S/",
-                    "matched_text": doc_text[span_start:span_end],
-                    "name_tokens": [t.text for t in tokens_entre],
-                    "span_start": span_start,
-                    "span_end": span_end,
-                    "context": self._extraer_contexto(doc_text, span_start, span_end)
-                })
+                resultados.append(self._construir_resultado(
+                    doc, textos, tokens_entre, doc_text, "C/...S/", "PATRON_C_S"
+                ))
         
         return resultados
     
-    def _detectar_nombre_antes_de_c_barra(self, doc) -> List[Dict[str, Any]]:
+    def _detectar_nombre_antes_de_c_barra(
+        self, doc, textos: List[str], posiciones: List[int]
+    ) -> List[Dict[str, Any]]:
         """
         REGLA 5: Detecta nombres ANTES de "C/" (demandante en formato judicial) (OPTIMIZADO).
         
@@ -466,23 +614,18 @@ class ContextualAnchorMatcher:
         
         Args:
             doc: Documento procesado por spaCy
+            textos: Texto de cada token del documento (cacheado)
+            posiciones: Posición de carácter de cada token (ordenada)
             
         Returns:
             Lista de matches con la estructura estándar
         """
         resultados = []
         doc_text = doc.text
-        marcadores_c = {"C/", "C.", "c/", "c."}
-        
-        # Reutilizar índice de tokens si existe
-        if id(doc) not in self._token_cache:
-            token_por_posicion = [(token.idx, token) for token in doc]
-            self._token_cache[id(doc)] = token_por_posicion
-        else:
-            token_por_posicion = self._token_cache[id(doc)]
+        marcadores_c = _MARCADORES_C
         
         # Buscar tokens "C/" o "C."
-        indices_c = [i for i, token in enumerate(doc) if token.text in marcadores_c]
+        indices_c = [i for i, token_text in enumerate(textos) if token_text in marcadores_c]
         
         # Para cada "C/", buscar nombre a la IZQUIERDA (70 caracteres antes)
         for idx_c in indices_c:
@@ -493,54 +636,21 @@ class ContextualAnchorMatcher:
             ventana_start = max(0, pos_c - 70)
             ventana_end = pos_c
             
-            # OPTIMIZACIÓN: Filtrado directo con list comprehension
-            tokens_en_ventana = [tok for pos_idx, tok in token_por_posicion 
-                                 if ventana_start <= pos_idx < ventana_end]
+            # OPTIMIZACIÓN: Búsqueda binaria sobre las posiciones ordenadas
+            indices_en_ventana = range(
+                bisect_left(posiciones, ventana_start),
+                bisect_left(posiciones, ventana_end)
+            )
             
-            if not tokens_en_ventana:
+            if not indices_en_ventana:
                 continue
             
             # Buscar el ÚLTIMO grupo de 2-6 tokens en MAYÚSCULAS antes de "C/"
-            for i in range(len(tokens_en_ventana) - 1, -1, -1):
-                token_inicial = tokens_en_ventana[i]
-                text_inicial = token_inicial.text
-                
-                # Verificar que sea alfabético, empiece en mayúscula y tenga min 2 caracteres
-                if not token_inicial.is_alpha or not text_inicial[0].isupper() or len(text_inicial) < 2:
-                    continue
-                
-                # Acumular tokens consecutivos válidos hacia la izquierda
-                tokens_candidatos = [token_inicial]
-                min_j = max(-1, i - 6)
-                
-                for j in range(i - 1, min_j, -1):
-                    if j < 0:
-                        break
-                    token_anterior = tokens_en_ventana[j]
-                    text_anterior = token_anterior.text
-                    if token_anterior.is_alpha and text_anterior[0].isupper() and len(text_anterior) >= 2:
-                        tokens_candidatos.insert(0, token_anterior)
-                    else:
-                        break
-                
-                # Validar cantidad de tokens (2-6)
-                if 2 <= len(tokens_candidatos) <= 6:
-                    span_start = tokens_candidatos[0].idx
-                    last_token = tokens_candidatos[-1]
-                    span_end = last_token.idx + len(last_token.text)
-                    
-                    resultados.append({
-                        "rule": "NOMBRE_ANTES_DE_C_BARRA",
-                        "anchor": "C/",
-                        "matched_text": doc_text[span_start:span_end],
-                        "name_tokens": [t.text for t in tokens_candidatos],
-                        "span_start": span_start,
-                        "span_end": span_end,
-                        "context": self._extraer_contexto(doc_text, span_start, span_end)
-                    })
-                    
-                    # Retornar el más cercano al "C/" (primera coincidencia válida)
-                    break
+            nombre_detectado = self._buscar_nombre_en_tokens_izquierda(
+                doc, textos, indices_en_ventana, doc_text, "C/", "NOMBRE_ANTES_DE_C_BARRA"
+            )
+            if nombre_detectado:
+                resultados.append(nombre_detectado)
         
         return resultados
     
@@ -587,8 +697,7 @@ class ContextualAnchorMatcher:
                 "name_tokens": tokens_sin_coma,  # Tokens sin coma para procesamiento interno
                 "nombre_original": f"{apellido}, {nombre}",  # Con coma preservada para output
                 "span_start": span_start,
-                "span_end": span_end,
-                "context": self._extraer_contexto(doc_text, span_start, span_end)
+                "span_end": span_end
             })
         
         return resultados
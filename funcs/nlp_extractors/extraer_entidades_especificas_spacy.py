@@ -1,23 +1,35 @@
 """
 Módulo para extraer entidades específicas de un PDF usando spaCy.
 Soporta extracción de nombres (6 fases) y documentos (DNI, CUIL, CUIT, CUIF, Matrícula).
+
+spaCy (y las reglas contextuales, que dependen de él) se importan de forma lazy, la
+primera vez que se necesita el pipeline: un pedido que solo extrae documentos por
+regex no paga la carga del paquete.
 """
 import re
 import os
-import spacy
-from typing import List, Dict, Optional, Tuple, Any
+import hashlib
+import logging
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, List, Dict, Optional, Tuple, Any, Union
 from funcs.nlp_extractors.constantes import PALABRAS_FILTRO_NOMBRES, ANCLAS_CONTEXTUALES
 from funcs.nlp_extractors.constantes import limpiar_bordes_nombre
 
 from funcs.normalizacion.normalizar_y_extraer_texto_pdf import (
     normalizacion_avanzada_pdf
 )
-from funcs.nlp_extractors.constantes import PATRONES_DOCUMENTOS, STOP_WORDS, PALABRAS_FILTRO_NOMBRES
+from funcs.nlp_extractors.constantes import PATRONES_DOCUMENTOS, STOP_WORDS
 from funcs.nlp_extractors.validadores_entidades import (
     validar_dni, validar_cuil, validar_cuit, 
-    validar_cuif, validar_matricula, validar_cbu
+    validar_cuif, validar_matricula, validar_cbu, solo_digitos
 )
-from funcs.nlp_extractors.contextual_anchor_rules import ContextualAnchorMatcher
+
+logger = logging.getLogger(__name__)
 
 # Visualización movida a un módulo separado (import opcional)
 try:
@@ -40,34 +52,366 @@ except Exception:
     _VIS_DISPONIBLE = False
 
 
-# Patrones regex precompilados para extracción de nombres
-PATRON_MAYUSCULAS = re.compile(r'\b([A-ZÁÉÍÓÚÑ]{2,}(?:[\s\.]+[A-ZÁÉÍÓÚÑ]{2,}){1,4})\b')
-PATRON_MIXTO = re.compile(r'\b([A-ZÁÉÍÓÚÑ][a-záéíóúñ]{1,}(?:[\s\.]+[A-ZÁÉÍÓÚÑ][a-záéíóúñ]{1,}){1,4})\b')
-PATRON_COMA = re.compile(r'\b([A-ZÁÉÍÓÚÑ]{2,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,2},\s+[A-ZÁÉÍÓÚÑ]{2,}(?:\s+[A-ZÁÉÍÓÚÑ]{2,}){0,2})\b')
+# Patrones regex precompilados para extracción de nombres.
+# Los cuantificadores posesivos (++, {2,}+; Python 3.11+) impiden que el motor
+# retroceda dentro de un token o separador: acortar un token nunca puede producir
+# una coincidencia (lo que sigue sería otra letra del mismo tipo), así que el
+# resultado es idéntico pero sin backtracking en textos largos
+_NOMBRE_MAYUSCULAS = r'[A-ZÁÉÍÓÚÑ]{2,}+(?:[\s\.]++[A-ZÁÉÍÓÚÑ]{2,}+){1,4}'
+_NOMBRE_MIXTO = r'[A-ZÁÉÍÓÚÑ][a-záéíóúñ]{1,}+(?:[\s\.]++[A-ZÁÉÍÓÚÑ][a-záéíóúñ]{1,}+){1,4}'
+PATRON_MAYUSCULAS = re.compile(rf'\b({_NOMBRE_MAYUSCULAS})\b')
+PATRON_MIXTO = re.compile(rf'\b({_NOMBRE_MIXTO})\b')
+# MAYÚSCULAS y Mixto en una sola pasada: sus coincidencias nunca se superponen
+# (un token no puede ser todo mayúsculas y Capitalizado a la vez), así que la
+# alternancia encuentra exactamente los mismos candidatos que dos finditer
+PATRON_NOMBRES = re.compile(rf'\b(?:(?P<mayusculas>{_NOMBRE_MAYUSCULAS})|(?P<mixto>{_NOMBRE_MIXTO}))\b')
+PATRON_COMA = re.compile(r'\b([A-ZÁÉÍÓÚÑ]{2,}+(?:\s++[A-ZÁÉÍÓÚÑ]{2,}+){0,2},\s++[A-ZÁÉÍÓÚÑ]{2,}+(?:\s++[A-ZÁÉÍÓÚÑ]{2,}+){0,2})\b')
+
+# Reemplazo de un solo carácter en la limpieza de nombres: str.translate es un
+# recorrido en C sin la maquinaria del motor de regex
+_TRANS_COMA = str.maketrans({',': ' '})
+_TRANS_PUNTO = str.maketrans({'.': ' '})
+
+# Stop-words en los bordes de un nombre ya limpio (tokens separados por un espacio):
+# la primera rama consume la racha inicial completa y la segunda la final, así que
+# un solo sub() equivale a quitar token a token por ambos extremos
+_ALTERNANCIA_STOP_WORDS = '|'.join(re.escape(w) for w in sorted(STOP_WORDS, key=len, reverse=True))
+_PATRON_STOP_WORDS_BORDES = re.compile(
+    rf'^(?:(?:{_ALTERNANCIA_STOP_WORDS})(?: |$))++|(?:(?:^| )(?:{_ALTERNANCIA_STOP_WORDS}))++$',
+    re.IGNORECASE,
+)
+
+# Patrones de documentos compilados una sola vez (en lugar de re.compile por llamada)
+_PATRONES_DOCUMENTOS_COMPILADOS = {
+    clave: re.compile(patron, flags=re.IGNORECASE)
+    for clave, patron in PATRONES_DOCUMENTOS.items()
+}
+
+# Entidad solicitada (minúsculas) → clave en PATRONES_DOCUMENTOS ("dni" → "DNI"),
+# precalculado para no hacer .upper() por entidad y por llamada
+_TIPOS_DOCUMENTO = {clave.lower(): clave for clave in PATRONES_DOCUMENTOS}
+
+# Entidades que acepta la API: nombres (en singular o plural) y los tipos de documento
+_ENTIDADES_VALIDAS = frozenset({"nombre", "nombres", *_TIPOS_DOCUMENTO})
+
+# Tipo de documento → validador de formato (armado una sola vez, no por llamada)
+_VALIDADORES: Dict[str, Callable[[str], bool]] = {
+    "dni": validar_dni,
+    "cuil": validar_cuil,
+    "cuit": validar_cuit,
+    "cuif": validar_cuif,
+    "matricula": validar_matricula,
+    "cbu": validar_cbu
+}
+
+# Tipos cuyo número se compara y valida sin separadores (solo dígitos)
+_TIPOS_SOLO_DIGITOS = frozenset({"cuit", "cuil", "dni", "cuif"})
+
+# CBU: 22 dígitos con espacios opcionales entre ellos
+_PATRON_NUMERO_CBU = re.compile(r'\b(\d(?:\s?\d){20,21})\b')
+
+# ANCLAS_CONTEXTUALES es una lista: para la Fase 4 (un chequeo por token) se usa
+# un frozenset y la pertenencia pasa a ser O(1) en vez de recorrer todas las anclas
+_ANCLAS_CONTEXTUALES_SET = frozenset(ANCLAS_CONTEXTUALES)
+
+# Puntuación que no distingue un nombre de otro al deduplicar ("CARBALLO, MARTA" = "Carballo Marta")
+_TRANS_PUNTUACION_CLAVE = str.maketrans('.,;:', '    ')
+
+# Tamaño de los caches por contenido (ver _CacheLRU). Los textos normalizados pueden
+# pesar varios MB, por eso se guardan menos que los spans PER (tuplas chicas)
+_MAX_TEXTOS_CACHEADOS = 32
+_MAX_SPANS_PER_CACHEADOS = 128
+_MAX_DOCS_CACHEADOS = 16
 
 _nlp = None
+_matcher = None
+# La extracción corre en threads (asyncio.to_thread): sin el lock, dos pedidos
+# simultáneos en frío cargarían el modelo dos veces. Solo protege la carga.
+_lock_carga_nlp = threading.Lock()
+# Serializa todo uso del pipeline ya cargado. El Vocab/StringStore de _nlp es uno
+# solo para el proceso y nlp.memory_zone() no es thread-safe: al salir de la zona
+# libera los strings y lexemas transitorios, incluidos los que estuvieran usando
+# los Docs de otro hilo. Reentrante: el batch lo toma y llama a _get_matcher().
+_lock_pipeline_spacy = threading.RLock()
+
+# Componentes del pipeline que este módulo no consume: solo se usan doc.ents (ner),
+# que depende únicamente de tok2vec. Se excluyen (no solo se deshabilitan): así ni
+# siquiera se cargan sus pesos, lo que reduce memoria y tiempo de arranque. Un
+# componente deshabilitado tampoco corría en nlp(), así que no se pierde nada.
+_COMPONENTES_NO_USADOS = [
+    "tagger", "morphologizer", "parser", "attribute_ruler", "lemmatizer", "senter"
+]
+
+# Modelos a probar, en orden. Por defecto el mediano: el grande carga ~500k vectores
+# (más RAM y arranque más lento) para una diferencia marginal en NER. La variable de
+# entorno SPACY_MODEL antepone otro modelo (p. ej. es_core_news_lg o un pipeline
+# transformer con NER) y SPACY_GPU=1 usa la GPU si hay una disponible.
+_MODELOS_SPACY_POR_DEFECTO = ["es_core_news_md", "es_core_news_lg", "es_core_news_sm"]
+
+# Valores por defecto de nlp.pipe() en el batch, sobrescribibles con SPACY_BATCH_SIZE
+# y SPACY_N_PROCESS. Un solo proceso por defecto: cada proceso extra vuelve a cargar
+# el modelo y serializa los Docs de vuelta, lo que en un servidor suele costar más
+# de lo que se gana.
+_BATCH_SIZE_POR_DEFECTO = 32
+_N_PROCESS_POR_DEFECTO = 1
+
+
+def _entero_de_entorno(nombre: str, por_defecto: int) -> int:
+    """Lee un entero positivo de una variable de entorno; si falta o es inválido usa el por defecto."""
+    valor = os.getenv(nombre, "").strip()
+    if not valor:
+        return por_defecto
+    try:
+        numero = int(valor)
+    except ValueError:
+        numero = 0
+    if numero < 1:
+        logger.warning("Valor inválido para %s (%r): se usa %s", nombre, valor, por_defecto)
+        return por_defecto
+    return numero
+
+
+# Tamaño máximo (en caracteres) de cada segmento que se pasa a spaCy. Un único Doc
+# sobre un PDF de varios MB dispara la memoria del tokenizer; el NER trabaja con
+# contexto local, así que procesar por segmentos no cambia lo que detecta. Con
+# SPACY_MAX_SEGMENTO se ajusta el compromiso entre memoria pico y overhead por Doc.
+_TAMANO_MAXIMO_SEGMENTO = _entero_de_entorno("SPACY_MAX_SEGMENTO", 100_000)
+
+
+def _modelos_spacy() -> List[str]:
+    """Devuelve los modelos a probar: SPACY_MODEL (si está definido) y luego los por defecto."""
+    modelo_configurado = os.getenv("SPACY_MODEL", "").strip()
+    if not modelo_configurado:
+        return list(_MODELOS_SPACY_POR_DEFECTO)
+    return [modelo_configurado] + [m for m in _MODELOS_SPACY_POR_DEFECTO if m != modelo_configurado]
+
 
 def _get_nlp():
     """
     Carga el pipeline de spaCy de forma lazy.
-    Usa el modelo es_core_news_md o es_core_news_lg si está disponible.
+    Usa SPACY_MODEL si está definido; si no, es_core_news_md (o lg/sm si es el
+    que está instalado). Solo quedan activos tok2vec y ner (ver _COMPONENTES_NO_USADOS).
     """
     global _nlp
-    if _nlp is None:
-        try:
-            # Intentar cargar el modelo grande primero, luego el mediano
+    if _nlp is not None:
+        return _nlp
+    with _lock_carga_nlp:
+        if _nlp is not None:
+            return _nlp
+        import spacy
+        
+        if os.getenv("SPACY_GPU", "").strip().lower() in ("1", "true", "yes"):
+            # prefer_gpu() no falla si no hay GPU: sigue en CPU
+            if spacy.prefer_gpu():
+                logger.info("spaCy usando GPU")
+            else:
+                logger.info("SPACY_GPU activo pero no hay GPU disponible: spaCy usa CPU")
+        
+        ultimo_error = None
+        for modelo in _modelos_spacy():
             try:
-                _nlp = spacy.load("es_core_news_lg")
-            except OSError:
-                _nlp = spacy.load("es_core_news_md")
-        except Exception as e:
+                nlp = spacy.load(modelo, exclude=_COMPONENTES_NO_USADOS)
+                logger.info("Modelo de spaCy cargado: %s", modelo)
+                # Ningún segmento supera _TAMANO_MAXIMO_SEGMENTO: el límite de spaCy
+                # (pensado para el parser, que no se carga) no debe rechazarlos
+                if nlp.max_length < _TAMANO_MAXIMO_SEGMENTO:
+                    nlp.max_length = _TAMANO_MAXIMO_SEGMENTO
+                # Se publica recién configurado: la lectura sin lock de arriba no
+                # debe ver un pipeline a medio preparar
+                _nlp = nlp
+                break
+            except OSError as e:
+                # Modelo no instalado: probar el siguiente
+                logger.warning("No se pudo cargar el modelo de spaCy %s: %s", modelo, e)
+                ultimo_error = e
+            except Exception as e:
+                ultimo_error = e
+                break
+        
+        if _nlp is None:
             raise RuntimeError(
-                f"No se pudo cargar el modelo de spaCy: {e}. "
+                f"No se pudo cargar el modelo de spaCy: {ultimo_error}. "
                 "Ejecuta: python -m spacy download es_core_news_md"
             )
     return _nlp
 
 
+def _get_matcher():
+    """
+    Devuelve el ContextualAnchorMatcher del pipeline con las reglas por defecto ya
+    registradas, creándolo de forma lazy una sola vez (como _get_nlp). Se vuelve a
+    crear solo si cambió el pipeline.
+    """
+    global _matcher
+    from funcs.nlp_extractors.contextual_anchor_rules import ContextualAnchorMatcher
+    
+    nlp = _get_nlp()
+    # Registrar las reglas agrega strings al Vocab compartido: si otro hilo estuviera
+    # dentro de una memory_zone quedarían como transitorios (ver _lock_pipeline_spacy)
+    with _lock_pipeline_spacy:
+        if _matcher is None or _matcher.nlp is not nlp:
+            matcher = ContextualAnchorMatcher(nlp)
+            matcher.add_default_rules()
+            _matcher = matcher
+        return _matcher
+
+
+def precargar_pipeline_spacy() -> None:
+    """
+    Carga el modelo de spaCy y el matcher contextual por adelantado (se llama al
+    arrancar la aplicación), para que el primer pedido no pague la carga del modelo.
+    """
+    _get_matcher()
+
+
+class _CacheLRU:
+    """
+    Cache LRU acotado y thread-safe para resultados serializables (str, tuplas).
+    Nunca se guardan objetos Doc de spaCy: quedan atados al vocab y a su memoria.
+    """
+
+    def __init__(self, max_items: int):
+        self._max_items = max_items
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave: str):
+        with self._lock:
+            valor = self._items.get(clave)
+            if valor is not None:
+                self._items.move_to_end(clave)
+            return valor
+
+    def put(self, clave: str, valor) -> None:
+        with self._lock:
+            self._items[clave] = valor
+            self._items.move_to_end(clave)
+            while len(self._items) > self._max_items:
+                self._items.popitem(last=False)
+
+
+# Texto normalizado por hash del contenido del PDF (las rutas son temporales y
+# cambian en cada request, el contenido no)
+_cache_textos_pdf = _CacheLRU(_MAX_TEXTOS_CACHEADOS)
+# Texto normalizado por hash del texto crudo (entrada de texto plano / TXT / JSON)
+_cache_textos_crudos = _CacheLRU(_MAX_TEXTOS_CACHEADOS)
+# Spans PER (start, end, texto) por hash del texto normalizado
+_cache_spans_per = _CacheLRU(_MAX_SPANS_PER_CACHEADOS)
+# Docs completos (segmentos serializados con DocBin) por hash del texto normalizado.
+# Solo los necesita la visualización: la extracción se arregla con los spans PER
+_cache_docs_serializados = _CacheLRU(_MAX_DOCS_CACHEADOS)
+
+
+def _hash_contenido(contenido: bytes) -> str:
+    """Hash corto del contenido, usado como clave de los caches."""
+    return hashlib.blake2b(contenido, digest_size=16).hexdigest()
+
+
+def _clave_texto(texto: str) -> str:
+    """Clave de cache para un texto normalizado."""
+    return _hash_contenido(texto.encode("utf-8"))
+
+
+def _normalizar_pdf_con_cache(path_pdf: Union[str, bytes]) -> str:
+    """
+    normalizacion_avanzada_pdf() cacheado por hash del contenido del PDF: si el
+    mismo archivo se consulta otra vez (p. ej. con otras entidades) no se vuelve
+    a extraer ni normalizar el texto. Acepta la ruta o el contenido en bytes.
+    """
+    if isinstance(path_pdf, (bytes, bytearray)):
+        clave = _hash_contenido(path_pdf)
+    else:
+        with open(path_pdf, "rb") as archivo:
+            clave = _hash_contenido(archivo.read())
+    texto = _cache_textos_pdf.get(clave)
+    if texto is None:
+        texto = normalizacion_avanzada_pdf(path_pdf=path_pdf)
+        _cache_textos_pdf.put(clave, texto)
+    return texto
+
+
+def _normalizar_texto_con_cache(raw_text: str) -> str:
+    """normalizacion_avanzada_pdf(raw_text=...) cacheado por hash del texto crudo."""
+    clave = _clave_texto(raw_text)
+    texto = _cache_textos_crudos.get(clave)
+    if texto is None:
+        texto = normalizacion_avanzada_pdf(raw_text=raw_text)
+        _cache_textos_crudos.put(clave, texto)
+    return texto
+
+
+def obtener_texto_normalizado(
+    path_pdf: Optional[Union[str, bytes]] = None,
+    raw_text: Optional[str] = None
+) -> str:
+    """
+    Devuelve el mismo texto normalizado que usa extraer_entidades_especificas()
+    para esa fuente. Sale de los caches por contenido: llamarla después de la
+    extracción (p. ej. para validar CUIL/CUIT) no vuelve a normalizar el texto.
+    """
+    if path_pdf:
+        return _normalizar_pdf_con_cache(path_pdf)
+    if raw_text:
+        return _normalizar_texto_con_cache(raw_text)
+    raise ValueError("Se debe pasar path_pdf o raw_text")
+
+
+def _segmentar_texto(texto: str, tamano_maximo: int = _TAMANO_MAXIMO_SEGMENTO) -> List[Tuple[int, str]]:
+    """
+    Divide el texto en segmentos contiguos de a lo sumo tamano_maximo caracteres,
+    cortando preferentemente al final de una oración (". ") o, si no hay, en el
+    último espacio. La concatenación de los segmentos es exactamente el texto.
+    
+    Args:
+        texto: Texto normalizado (una sola línea)
+        tamano_maximo: Tamaño máximo de cada segmento
+        
+    Returns:
+        Lista de tuplas (offset del segmento en el texto, segmento)
+    """
+    segmentos = []
+    inicio = 0
+    while len(texto) - inicio > tamano_maximo:
+        limite = inicio + tamano_maximo
+        corte = texto.rfind('. ', inicio, limite)
+        if corte != -1:
+            corte += 2
+        else:
+            corte = texto.rfind(' ', inicio, limite)
+            corte = corte + 1 if corte != -1 else limite
+        segmentos.append((inicio, texto[inicio:corte]))
+        inicio = corte
+    segmentos.append((inicio, texto[inicio:]))
+    return segmentos
+
+
+def _parametros_pipe(
+    cantidad_segmentos: int,
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Devuelve batch_size y n_process para nlp.pipe(): los recibidos o, si faltan,
+    SPACY_BATCH_SIZE / SPACY_N_PROCESS (o los por defecto). No tiene sentido levantar
+    más procesos que segmentos (cada uno carga el modelo), así que un texto corto
+    (un solo segmento) se procesa siempre en el proceso actual.
+    """
+    if batch_size is None:
+        batch_size = _entero_de_entorno("SPACY_BATCH_SIZE", _BATCH_SIZE_POR_DEFECTO)
+    if n_process is None:
+        n_process = _entero_de_entorno("SPACY_N_PROCESS", _N_PROCESS_POR_DEFECTO)
+    return {"batch_size": batch_size, "n_process": max(1, min(n_process, cantidad_segmentos))}
+
+
+def _clave_nombre(nombre: str) -> str:
+    """
+    Clave de deduplicación de un nombre: minúsculas, sin puntuación (.,;:) y con
+    los espacios colapsados, para que variantes de formato del mismo nombre
+    ("CARBALLO, MARTA" / "Carballo  Marta") se detecten como duplicadas.
+    """
+    return ' '.join(nombre.lower().translate(_TRANS_PUNTUACION_CLAVE).split())
+
+
 def _extraer_contexto(texto: str, start: int, end: int, window: int = 60) -> str:
     """
     Extrae el contexto alrededor de una posición en el texto.
@@ -97,25 +441,20 @@ def _limpiar_y_normalizar_nombre(nombre_raw: str, tipo_patron: str) -> tuple[lis
     Returns:
         Tupla (tokens_limpios, nombre_normalizado)
     """
-    # Limpiar puntuación del nombre
+    # Limpiar puntuación del nombre y colapsar espacios (split() sin argumentos
+    # descarta los bordes y las rachas de espacios)
     if tipo_patron == "coma":
         # "CARBALLO, MARTA" → "CARBALLO MARTA"
-        nombre_limpio_temp = re.sub(r',', ' ', nombre_raw)
-        nombre_limpio_temp = re.sub(r'\s+', ' ', nombre_limpio_temp).strip()
+        nombre_limpio_temp = ' '.join(nombre_raw.translate(_TRANS_COMA).split())
     else:
         # Para otros patrones, solo limpiar puntos
-        nombre_limpio_temp = re.sub(r'\.', ' ', nombre_raw)
-        nombre_limpio_temp = re.sub(r'\s+', ' ', nombre_limpio_temp).strip()
+        nombre_limpio_temp = ' '.join(nombre_raw.translate(_TRANS_PUNTO).split())
 
     # Filtrar stop-words al inicio/final
-    tokens = nombre_limpio_temp.split()
-    while tokens and tokens[0].lower() in STOP_WORDS:
-        tokens.pop(0)
-    while tokens and tokens[-1].lower() in STOP_WORDS:
-        tokens.pop()
+    nombre_limpio = _PATRON_STOP_WORDS_BORDES.sub('', nombre_limpio_temp).strip()
+    tokens = nombre_limpio.split()
 
     # Normalizar nombre final
-    nombre_limpio = ' '.join(tokens)
     if tipo_patron == 'mayusculas':
         nombre_limpio = nombre_limpio.title()
     
@@ -125,7 +464,7 @@ def _limpiar_y_normalizar_nombre(nombre_raw: str, tipo_patron: str) -> tuple[lis
 
 def extraer_entidades_especificas(
     entidades_solicitadas: List[str],
-    path_pdf: Optional[str] = None,
+    path_pdf: Optional[Union[str, bytes]] = None,
     raw_text: Optional[str] = None,
     # Parámetros de visualización: si se pasan explícitamente (True/False) se respetan;
     # si se dejan como None, se utilizará la configuración global en visualization_displacy.py
@@ -138,13 +477,14 @@ def extraer_entidades_especificas(
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
     Extrae entidades específicas de un PDF o texto según lo solicitado.
-    IMPORTANTE: Usa dos versiones del texto:
-    - texto_crudo: para spaCy NER (nombres)
-    - texto_normalizado: para documentos (DNI, CUIT, etc.)
+    IMPORTANTE: Todo el flujo (spaCy NER para nombres y regex para documentos
+    como DNI, CUIT, etc.) usa el mismo texto normalizado.
+    
+    Es un atajo sobre extraer_entidades_especificas_batch() con un solo elemento.
     
     Args:
         entidades_solicitadas: Lista de entidades a extraer
-        path_pdf: Ruta al archivo PDF (opcional si se proporciona raw_text)
+        path_pdf: Ruta al archivo PDF o su contenido en bytes (opcional si se proporciona raw_text)
         raw_text: Texto plano a analizar (opcional si se proporciona path_pdf)
     """
     # Validar entrada
@@ -154,16 +494,234 @@ def extraer_entidades_especificas(
     if path_pdf and raw_text:
         raise ValueError("Solo se puede pasar path_pdf O raw_text, no ambos")
     
+    return extraer_entidades_especificas_batch(
+        entidades_solicitadas,
+        paths_pdf=[path_pdf] if path_pdf else None,
+        raw_texts=[raw_text] if raw_text else None,
+        visualizar=visualizar,
+        vis_style=vis_style,
+        vis_serve=vis_serve,
+        vis_options=vis_options,
+        vis_save=vis_save,
+        vis_save_dir=vis_save_dir,
+    )[0]
+
+
+def extraer_entidades_especificas_batch(
+    entidades_solicitadas: List[str],
+    paths_pdf: Optional[List[Union[str, bytes]]] = None,
+    raw_texts: Optional[List[str]] = None,
+    batch_size: Optional[int] = None,
+    n_process: Optional[int] = None,
+    visualizar: Optional[bool] = None,
+    vis_style: Optional[str] = None,
+    vis_serve: bool = False,
+    vis_options: Optional[Dict[str, Any]] = None,
+    vis_save: Optional[bool] = None,
+    vis_save_dir: Optional[str] = None,
+) -> List[Dict[str, List[Dict[str, Any]]]]:
+    """
+    Extrae entidades específicas de varios PDFs o textos en un solo lote.
+    
+    OPTIMIZACIÓN: Los textos se procesan con nlp.pipe() en lugar de nlp() uno por
+    uno, lo que agrupa el trabajo de tok2vec/NER por lotes y permite repartirlo
+    entre varios procesos (n_process).
+    
+    Args:
+        entidades_solicitadas: Lista de entidades a extraer (la misma para todo el lote)
+        paths_pdf: Rutas a los archivos PDF o sus contenidos en bytes (opcional si se proporciona raw_texts)
+        raw_texts: Textos planos a analizar (opcional si se proporciona paths_pdf)
+        batch_size: Cantidad de segmentos por lote de nlp.pipe() (por defecto
+            SPACY_BATCH_SIZE o 32)
+        n_process: Procesos para nlp.pipe() (por defecto SPACY_N_PROCESS o 1, nunca
+            más que la cantidad de segmentos a procesar)
+        
+    Returns:
+        Lista de resultados, uno por PDF/texto y en el mismo orden de entrada
+    """
+    # Validar entrada
+    if paths_pdf is None and raw_texts is None:
+        raise ValueError("Se debe pasar paths_pdf o raw_texts")
+    
+    if paths_pdf is not None and raw_texts is not None:
+        raise ValueError("Solo se puede pasar paths_pdf O raw_texts, no ambos")
+    
+    entidades_solicitadas = _normalizar_entidades_solicitadas(entidades_solicitadas)
+    
+    # ========== SEPARACIÓN DE TEXTOS ==========
+    # Extraer texto NORMALIZADO para todo el flujo
+    if paths_pdf is not None:
+        # Caso 1: Desde PDF
+        textos_normalizados = [_normalizar_pdf_con_cache(path) for path in paths_pdf]
+    else:
+        # Caso 2: Desde texto plano
+        textos_normalizados = [_normalizar_texto_con_cache(texto) for texto in raw_texts]
+    
+    # Procesar con spaCy SOLO si se necesitan nombres o si la visualización está activa
+    # Si 'visualizar' es None, usamos la configuración global de visualization_displacy
+    debe_visualizar = _visualizacion_activa(visualizar)
+    debe_procesar_spacy = "nombre" in entidades_solicitadas or debe_visualizar
+    opciones_vis = dict(
+        visualizar=visualizar,
+        vis_style=vis_style,
+        vis_serve=vis_serve,
+        vis_options=vis_options,
+        vis_save=vis_save,
+        vis_save_dir=vis_save_dir,
+    )
+    
+    if not (debe_procesar_spacy and textos_normalizados):
+        return [
+            _extraer_entidades_de_texto(texto_normalizado, None, entidades_solicitadas, **opciones_vis)
+            for texto_normalizado in textos_normalizados
+        ]
+    
+    # Todo el trabajo con spaCy (pipe, reglas contextuales y materialización del
+    # resultado dentro de la memory_zone) se hace con _lock_pipeline_spacy tomado:
+    # el pipeline es compartido por los hilos de los distintos pedidos
+    with _lock_pipeline_spacy:
+        nlp = _get_nlp()
+        
+        if "nombre" in entidades_solicitadas:
+            # Registrar las reglas del Matcher ANTES de entrar en la zona de memoria:
+            # los strings agregados dentro de ella son transitorios
+            _get_matcher()
+        
+        # Regex primero: el NER solo sirve para validar candidatos regex (Fase 2).
+        # Si un texto no tiene ningún candidato viable, o sus spans PER ya están en
+        # cache, basta con tokenizarlo (las reglas contextuales de la Fase 3 solo
+        # usan tokens). La visualización sí necesita las entidades, así que en ese
+        # caso se procesa todo.
+        claves_texto = [_clave_texto(texto) for texto in textos_normalizados]
+        docs_serializados = [None] * len(textos_normalizados)
+        # Spans PER de cada texto que se pasan junto con sus Docs (None: se calculan
+        # de los Docs, que en ese caso siempre pasaron por el NER)
+        spans_por_texto = [None] * len(textos_normalizados)
+        if debe_visualizar:
+            # Los Docs completos de un texto ya visualizado se recuperan del cache
+            docs_serializados = [_cache_docs_serializados.get(clave) for clave in claves_texto]
+            requiere_ner = [datos is None for datos in docs_serializados]
+        else:
+            # El cache se consulta UNA sola vez: si se volviera a consultar más
+            # adelante, la entrada podría haber sido desalojada (otro pedido, o un
+            # lote de más de _MAX_SPANS_PER_CACHEADOS textos) y los spans se
+            # calcularían de Docs solo tokenizados, sin entidades
+            spans_por_texto = [_cache_spans_per.get(clave) for clave in claves_texto]
+            requiere_ner = [
+                spans is None and _hay_candidatos_viables(texto)
+                for texto, spans in zip(textos_normalizados, spans_por_texto)
+            ]
+            # Sin candidatos viables el NER no puede cambiar el resultado: spans
+            # vacíos, que no se cachean (no salen de un Doc procesado con NER)
+            spans_por_texto = [
+                () if spans is None and not ner else spans
+                for spans, ner in zip(spans_por_texto, requiere_ner)
+            ]
+        
+        # Cada texto se parte en segmentos acotados; todos los segmentos del lote
+        # van en un único stream de nlp.pipe y se reagrupan por texto con su offset
+        segmentos_por_texto = [_segmentar_texto(texto) for texto in textos_normalizados]
+        segmentos_ner = [
+            segmento
+            for segmentos, ner in zip(segmentos_por_texto, requiere_ner) if ner
+            for _, segmento in segmentos
+        ]
+        
+        if segmentos_ner:
+            parametros = _parametros_pipe(len(segmentos_ner), batch_size, n_process)
+            docs_ner = iter(nlp.pipe(segmentos_ner, **parametros))
+        else:
+            docs_ner = iter(())
+        
+        docs = (
+            _construir_segmentos_doc(
+                nlp, clave, segmentos, ner, datos, docs_ner, cachear=debe_visualizar
+            )
+            for clave, segmentos, ner, datos in zip(
+                claves_texto, segmentos_por_texto, requiere_ner, docs_serializados
+            )
+        )
+        
+        # memory_zone() (spaCy >= 3.8) libera al salir los strings y entradas del vocab
+        # que agregaron estos Docs; sin ella el vocab crece con cada PDF en un servidor
+        # de larga vida. Todo lo que se devuelve (dicts/str) se materializa dentro de
+        # la zona y ningún Doc sobrevive a ella.
+        usar_zona = hasattr(nlp, "memory_zone")
+        with (nlp.memory_zone() if usar_zona else nullcontext()):
+            return [
+                _extraer_entidades_de_texto(
+                    texto_normalizado, segmentos_doc, entidades_solicitadas,
+                    spans_per=spans, **opciones_vis
+                )
+                for texto_normalizado, segmentos_doc, spans in zip(
+                    textos_normalizados, docs, spans_por_texto
+                )
+            ]
+
+
+def _construir_segmentos_doc(
+    nlp,
+    clave_texto: str,
+    segmentos: List[Tuple[int, str]],
+    requiere_ner: bool,
+    docs_serializados: Optional[bytes],
+    docs_ner,
+    cachear: bool = False
+) -> List[Tuple[int, Any]]:
+    """
+    Arma las tuplas (offset, Doc) de un texto a partir de, en orden de preferencia:
+    sus Docs serializados en cache, el stream de nlp.pipe (docs_ner) o solo el
+    tokenizer si no requiere NER.
+    
+    Con cachear=True los Docs recién procesados con NER se serializan con DocBin
+    (que conserva las entidades) para no repetir el NER en la próxima visualización
+    del mismo texto.
+    """
+    from spacy.tokens import DocBin
+    
+    if docs_serializados is not None:
+        docs = DocBin().from_bytes(docs_serializados).get_docs(nlp.vocab)
+        return [(offset, doc) for (offset, _), doc in zip(segmentos, docs)]
+    
+    segmentos_doc = [
+        (offset, next(docs_ner) if requiere_ner else nlp.make_doc(segmento))
+        for offset, segmento in segmentos
+    ]
+    if cachear and requiere_ner:
+        _cache_docs_serializados.put(
+            clave_texto, DocBin(docs=[doc for _, doc in segmentos_doc]).to_bytes()
+        )
+    return segmentos_doc
+
+
+def _visualizacion_activa(visualizar: Optional[bool]) -> bool:
+    """
+    Indica si corresponde generar la visualización con displaCy: respeta el
+    parámetro explícito si se pasó, sino usa la configuración global.
+    """
+    if visualizar is not None:
+        return bool(visualizar)
+    # usar configuración global si el módulo de visualización está disponible
+    return _VIS_DISPONIBLE and is_visualization_enabled()
+
+
+def _normalizar_entidades_solicitadas(entidades_solicitadas: List[str]) -> List[str]:
+    """
+    Normaliza (minúsculas, sin espacios) y valida las entidades solicitadas.
+    "nombres" se unifica como "nombre".
+    
+    Raises:
+        ValueError: Si alguna entidad no es válida
+    """
     # Normalizar entidades solicitadas
     entidades_solicitadas = [e.lower().strip() for e in entidades_solicitadas]
     
     # Validar entidades
-    entidades_validas = {"nombre", "nombres", "dni", "matricula", "cuif", "cuit", "cuil", "cbu"}
-    entidades_invalidas = set(entidades_solicitadas) - entidades_validas
+    entidades_invalidas = set(entidades_solicitadas) - _ENTIDADES_VALIDAS
     if entidades_invalidas:
         raise ValueError(
             f"Entidades no válidas: {', '.join(entidades_invalidas)}. "
-            f"Entidades válidas: {', '.join(sorted(entidades_validas))}"
+            f"Entidades válidas: {', '.join(sorted(_ENTIDADES_VALIDAS))}"
         )
     
     # Normalizar "nombres" a "nombre"
@@ -171,81 +729,65 @@ def extraer_entidades_especificas(
         entidades_solicitadas.append("nombre")
         entidades_solicitadas.remove("nombres")
     
-    # ========== SEPARACIÓN DE TEXTOS ==========
-    # Extraer texto NORMALIZADO para todo el flujo
-    # print("[DEBUG] Extrayendo texto NORMALIZADO...")
-    
-    if path_pdf:
-        # Caso 1: Desde PDF
-        texto_normalizado = normalizacion_avanzada_pdf(path_pdf=path_pdf)
-    else:
-        # Caso 2: Desde texto plano
-        texto_normalizado = normalizacion_avanzada_pdf(raw_text=raw_text)
-    
-    # print(f"[DEBUG] Texto NORMALIZADO extraído: {len(texto_normalizado)} caracteres")
-    
-    # Imprimir el texto normalizado completo SIEMPRE (independiente de las entidades solicitadas)
-    # print("[DEBUG] --- TEXTO NORMALIZADO COMPLETO (INICIO) ---")
-    # print(texto_normalizado)
-    # print("[DEBUG] --- TEXTO NORMALIZADO COMPLETO (FIN) ---")
-    
-    # Reutilizar texto_normalizado como texto_crudo para spaCy
-    texto_crudo = texto_normalizado
+    return entidades_solicitadas
 
-    # Procesar con spaCy SOLO si se necesitan nombres o si la visualización está activa
-    # Si 'visualizar' es None, usamos la configuración global de visualization_displacy
-    doc = None
-    debe_procesar_spacy = False
-    if "nombre" in entidades_solicitadas:
-        debe_procesar_spacy = True
-    elif visualizar is not None:
-        debe_procesar_spacy = bool(visualizar)
-    else:
-        # usar configuración global si el módulo de visualización está disponible
-        debe_procesar_spacy = _VIS_DISPONIBLE and is_visualization_enabled()
 
-    if debe_procesar_spacy:
-        # print("[DEBUG] Procesando texto con spaCy para extracción de nombres...")
-        nlp = _get_nlp()
-        doc = nlp(texto_crudo)  # ← SIEMPRE texto_crudo
+def _extraer_entidades_de_texto(
+    texto_normalizado: str,
+    segmentos_doc: Optional[List[Tuple[int, Any]]],
+    entidades_solicitadas: List[str],
+    spans_per: Optional[Tuple[Tuple[int, int, str], ...]] = None,
+    visualizar: Optional[bool] = None,
+    vis_style: Optional[str] = None,
+    vis_serve: bool = False,
+    vis_options: Optional[Dict[str, Any]] = None,
+    vis_save: Optional[bool] = None,
+    vis_save_dir: Optional[str] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Extrae las entidades de un texto ya normalizado (y sus docs de spaCy, si se procesó).
     
+    Args:
+        texto_normalizado: Texto normalizado del PDF o texto plano
+        segmentos_doc: Tuplas (offset, Doc) de los segmentos del texto (ver
+            _segmentar_texto), o None si no fue necesario procesarlo con spaCy
+        entidades_solicitadas: Entidades ya normalizadas por _normalizar_entidades_solicitadas()
+        spans_per: Spans PER ya conocidos del texto (ver _extraer_nombres_con_contexto)
+    """
     # Estructura de resultado
     resultado: Dict[str, List[Dict[str, Any]]] = {}
     
-    # Extracción de nombres (usa texto crudo)
+    # Extracción de nombres (usa el mismo texto normalizado que procesó spaCy)
     if "nombre" in entidades_solicitadas:
-        # print("[DEBUG] Extrayendo NOMBRES con texto CRUDO...")
-        resultado["nombres"] = _extraer_nombres_con_contexto(texto_crudo, doc=doc)
-        # print(f"[DEBUG] Nombres encontrados: {len(resultado['nombres'])}")
-    
-    # Extracción de documentos (usa texto normalizado)
-    for entidad in entidades_solicitadas:
-        if entidad == "nombre":
-            continue  # Ya procesado arriba
-            
-        entidad_key = entidad.upper()
-        if entidad_key in PATRONES_DOCUMENTOS:
-            # print(f"[DEBUG] Extrayendo {entidad_key} con texto NORMALIZADO...")
-            resultado[entidad] = _extraer_y_validar_documento(
-                texto_normalizado,  # ← TEXTO NORMALIZADO
-                entidad
-            )
-            # print(f"[DEBUG] {entidad_key} encontrados: {len(resultado[entidad])}")
+        logger.debug("Extrayendo NOMBRES con texto NORMALIZADO...")
+        resultado["nombres"] = _extraer_nombres_con_contexto(
+            texto_normalizado, segmentos_doc=segmentos_doc, spans_per=spans_per
+        )
+        logger.debug("Nombres encontrados: %s", len(resultado['nombres']))
+    
+    # Extracción de documentos (usa texto normalizado): una sola pasada para todos los tipos.
+    # No se reparte en hilos: ya es un único recorrido del texto y el motor de re no
+    # libera el GIL, así que varios hilos solo sumarían overhead.
+    tipos_documento = [entidad for entidad in entidades_solicitadas if entidad in _TIPOS_DOCUMENTO]
+    if tipos_documento:
+        logger.debug("Extrayendo %s con texto NORMALIZADO...", tipos_documento)
+        resultado.update(_extraer_y_validar_documentos(
+            texto_normalizado,  # ← TEXTO NORMALIZADO
+            tipos_documento
+        ))
 
     # Generar visualización: respetar parámetro explícito si se pasó, sino usar config global
-    debe_visualizar = False
-    if visualizar is not None:
-        debe_visualizar = bool(visualizar)
-    else:
-        debe_visualizar = _VIS_DISPONIBLE and is_visualization_enabled()
+    debe_visualizar = _visualizacion_activa(visualizar)
     
-    if debe_visualizar and doc is not None:
+    if debe_visualizar and segmentos_doc is not None:
         # Generar visualización pero NO incluir el HTML ni rutas en la respuesta API
-        # print("[DEBUG] Generando visualización con displaCy (no incluida en la respuesta)...")
+        logger.debug("Generando visualización con displaCy (no incluida en la respuesta)...")
         try:
             # Llamamos al render y guardado si corresponde, pero descartamos el resultado
+            # displaCy acepta un Doc o una lista de Docs (uno por segmento)
+            docs_vis = [doc for _, doc in segmentos_doc]
             _ = render_and_maybe_save(
-                doc,
+                docs_vis[0] if len(docs_vis) == 1 else docs_vis,
                 style=vis_style,
                 options=vis_options,
                 serve=vis_serve,
@@ -254,13 +796,16 @@ def extraer_entidades_especificas(
             )
         except Exception as e:
             # No queremos que un fallo de visualización afecte la respuesta principal
-            # print(f"[DEBUG] Error al generar visualización (se ignorará): {e}")
-            pass
+            logger.debug("Error al generar visualización (se ignorará): %s", e)
 
     return resultado
 
 
-def _extraer_nombres_con_contexto(texto: str, doc=None) -> List[Dict[str, Any]]:
+def _extraer_nombres_con_contexto(
+    texto: str,
+    segmentos_doc: List[Tuple[int, Any]],
+    spans_per: Optional[Tuple[Tuple[int, int, str], ...]] = None
+) -> List[Dict[str, Any]]:
     """
     Extrae nombres usando enfoque HÍBRIDO MEJORADO en 6 fases:
     
@@ -286,165 +831,93 @@ def _extraer_nombres_con_contexto(texto: str, doc=None) -> List[Dict[str, Any]]:
     
     Args:
         texto: Texto normalizado a procesar
-        doc: Documento spaCy ya procesado (opcional, para reutilizar)
+        segmentos_doc: Tuplas (offset, Doc) ya procesadas por spaCy en
+            extraer_entidades_especificas_batch (con _lock_pipeline_spacy tomado y
+            dentro de su memory_zone). Las posiciones de cada Doc son relativas a
+            su segmento.
+        spans_per: Spans PER (start, end, texto) ya conocidos para este texto. Sin
+            spans_per, los Docs deben haber pasado por el NER: los spans se
+            calculan de ellos y se cachean.
         
     Returns:
         Lista de nombres únicos con contexto
     """
-    # Si no se proporciona un doc, cargar el pipeline y procesar
-    if doc is None:
-        nlp = _get_nlp()
-        doc = nlp(texto)
-    else:
-        nlp = _get_nlp()
+    clave_texto = _clave_texto(texto)
     
-    nombres_encontrados = []
+    # Claves de deduplicación como str (no hash(...) enteros): el str ya guarda su
+    # hash, así que la consulta cuesta lo mismo y no hay riesgo de colisiones que
+    # descarten un nombre distinto. Los candidatos son tuplas (ver Fase 1).
     nombres_unicos = set()
-    candidatos_regex = []
-    candidatos_rechazados_spacy = []  # Almacena candidatos rechazados por spaCy para validar con reglas
     
     # ========== FASE 1: CAPTURAR CANDIDATOS CON REGEX ==========
-    # print("\n[DEBUG] ===== FASE 1: CAPTURA DE CANDIDATOS CON REGEX =====")
-    
-    # Capturar todos los candidatos de los tres patrones precompilados
-    for match in PATRON_MAYUSCULAS.finditer(texto):
-        candidatos_regex.append({
-            "texto": match.group(1),
-            "start": match.start(),
-            "end": match.end(),
-            "tipo_patron": "mayusculas"
-        })
+    logger.debug("FASE 1: CAPTURA DE CANDIDATOS CON REGEX")
     
-    for match in PATRON_MIXTO.finditer(texto):
-        candidatos_regex.append({
-            "texto": match.group(1),
-            "start": match.start(),
-            "end": match.end(),
-            "tipo_patron": "mixto"
-        })
-    
-    for match in PATRON_COMA.finditer(texto):
-        candidatos_regex.append({
-            "texto": match.group(1),
-            "start": match.start(),
-            "end": match.end(),
-            "tipo_patron": "coma"
-        })
+    candidatos_regex = list(_capturar_candidatos_regex(texto))
     
     # Debug: Mostrar candidatos capturados por regex
-    # print(f"[DEBUG] Regex capturó {len(candidatos_regex)} candidatos:")
-    for i, cand in enumerate(candidatos_regex[:15], 1):  # Mostrar máximo 15
-        # print(f"  {i}. '{cand['texto']}' (tipo: {cand['tipo_patron']}, pos: {cand['start']}-{cand['end']})")
-        pass
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Regex capturó %s candidatos:", len(candidatos_regex))
+        for i, (nombre_raw, start_pos, end_pos, tipo_patron) in enumerate(candidatos_regex[:15], 1):  # Mostrar máximo 15
+            logger.debug("%s. '%s' (tipo: %s, pos: %s-%s)", i, nombre_raw, tipo_patron, start_pos, end_pos)
     
     # FASE 2: Validar candidatos con spaCy
-    # print("\n[DEBUG] ===== FASE 2: VALIDACIÓN CON SPACY =====")
-    # print(f"[DEBUG] spaCy procesará {len(texto)} caracteres de texto")
+    logger.debug("FASE 2: VALIDACIÓN CON SPACY")
+    logger.debug("spaCy procesará %s caracteres de texto", len(texto))
+    
+    if spans_per is None:
+        spans_per = tuple(
+            # Trasladar posiciones del segmento a posiciones globales del texto
+            (offset + ent.start_char, offset + ent.end_char, ent.text)
+            for offset, doc in segmentos_doc
+            for ent in doc.ents
+            if ent.label_ in ("PER", "PERSON")
+        )
+        _cache_spans_per.put(clave_texto, spans_per)
     
-    spans_validados = set()
-    entidades_per_detectadas = []
-    for ent in doc.ents:
-        if ent.label_ in ("PER", "PERSON"):
-            spans_validados.add((ent.start_char, ent.end_char))
-            entidades_per_detectadas.append(ent.text)
+    spans_validados = {(span_start, span_end) for span_start, span_end, _ in spans_per}
     
-    # print(f"[DEBUG] spaCy detectó {len(entidades_per_detectadas)} entidades PER: {entidades_per_detectadas}")
-
+    if logger.isEnabledFor(logging.DEBUG):
+        entidades_per_detectadas = [texto_ent for _, _, texto_ent in spans_per]
+        logger.debug("spaCy detectó %s entidades PER: %s", len(entidades_per_detectadas), entidades_per_detectadas)
     
-    # Procesar cada candidato regex
-    # print(f"\n[DEBUG] Procesando candidatos regex...")
-    for candidato in candidatos_regex:
-        nombre_raw = candidato["texto"]
-        start_pos = candidato["start"]
-        end_pos = candidato["end"]
-        tipo_patron = candidato["tipo_patron"]
-
-        # Limpiar y normalizar usando función auxiliar
-        tokens, nombre_limpio = _limpiar_y_normalizar_nombre(nombre_raw, tipo_patron)
-
-        # VALIDACIÓN ESTRICTA: mínimo 2, máximo 5 palabras
-        if len(tokens) < 2:
-            # print(f"  ❌ '{nombre_raw}' rechazado: menos de 2 palabras")
-            continue
-        
-        if len(tokens) > 5:
-            # print(f"  ❌ '{nombre_raw}' rechazado: más de 5 palabras")
-            continue
-
-        # Validar que todos los tokens tengan al menos 2 caracteres
-        if not _tiene_tokens_validos(nombre_limpio, min_longitud=2):
-            # print(f"  ❌ '{nombre_raw}' rechazado: contiene tokens de 1 carácter")
-            continue
-
-        # Evitar duplicados
-        if nombre_limpio.lower() in nombres_unicos:
-            # print(f"  ❌ '{nombre_raw}' rechazado: duplicado")
-            continue
-
-        # ========== VALIDACIÓN CON SPACY ==========
-        # Verificar si este candidato se superpone con algún span validado por spaCy
-        validado_por_spacy = False
-        span_coincidente = None
-        for span_start, span_end in spans_validados:
-            # Hay superposición si los rangos se cruzan
-            if not (end_pos <= span_start or start_pos >= span_end):
-                validado_por_spacy = True
-                span_coincidente = (span_start, span_end)
-                break
-
-        # Si no fue validado por spaCy, guardar para validar con reglas contextuales (Fase 3)
-        if not validado_por_spacy:
-            # print(f"  ⚠️  '{nombre_raw}' NO validado por spaCy NER → se validará con reglas contextuales")
-            
-            # Guardar candidato rechazado para validación posterior con reglas
-            candidatos_rechazados_spacy.append({
-                "nombre": nombre_limpio,
-                "start": start_pos,
-                "end": end_pos
-            })
-            continue
-        else:
-            # print(f"  ✅ '{nombre_raw}' validado por SPACY (span: {span_coincidente})")
-            pass
-
-        nombres_unicos.add(nombre_limpio.lower())
-
-        # Extraer contexto usando función centralizada
-        contexto = _extraer_contexto(texto, start_pos, end_pos, window=60)
-
-        nombres_encontrados.append({
-            "nombre": nombre_limpio,
-            "contexto": contexto,
-            "posicion": start_pos
-        })
+    nombres_encontrados, candidatos_rechazados_spacy = _validar_candidatos_con_spacy(
+        candidatos_regex, spans_validados, nombres_unicos
+    )
 
     # FASE 3: Aplicar reglas contextuales
-    # print("\n[DEBUG] ===== FASE 3: DETECCIÓN CON REGLAS CONTEXTUALES =====")
-    
-    context_matcher = ContextualAnchorMatcher(nlp)
-    context_matcher.add_default_rules()
-    matches_contextuales = context_matcher.find_matches(doc)
-    
-    # print(f"[DEBUG] Reglas contextuales detectaron {len(matches_contextuales)} coincidencias")
-    conteo_por_regla = {}
-    for match in matches_contextuales:
-        regla = match.get("rule", "unknown")
-        conteo_por_regla[regla] = conteo_por_regla.get(regla, 0) + 1
-    
-    # print(f"[DEBUG] Desglose por regla:")
-    for regla, count in conteo_por_regla.items():
-        # print(f"  - {regla}: {count} coincidencias")
-        pass
+    logger.debug("FASE 3: DETECCIÓN CON REGLAS CONTEXTUALES")
+    
+    context_matcher = _get_matcher()
+    # El contexto se arma al final, solo para los nombres que superan todas las fases
+    matches_contextuales = []
+    for offset, doc in segmentos_doc:
+        matches_segmento = context_matcher.find_matches(doc, include_context=False)
+        if offset:
+            # Trasladar posiciones del segmento a posiciones globales del texto
+            for match in matches_segmento:
+                match["span_start"] += offset
+                match["span_end"] += offset
+        matches_contextuales.extend(matches_segmento)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Reglas contextuales detectaron %s coincidencias", len(matches_contextuales))
+        conteo_por_regla = {}
+        for match in matches_contextuales:
+            regla = match.get("rule", "unknown")
+            conteo_por_regla[regla] = conteo_por_regla.get(regla, 0) + 1
+        
+        logger.debug("Desglose por regla:")
+        for regla, count in conteo_por_regla.items():
+            logger.debug("- %s: %s coincidencias", regla, count)
     
     # Crear conjuntos para validación de candidatos rechazados
-    spans_reglas_contextuales = set()
-    nombres_reglas_contextuales = set()  # Nombres detectados por reglas (normalizados)
-    
-    for match in matches_contextuales:
-        spans_reglas_contextuales.add((match["span_start"], match["span_end"]))
-        # Normalizar y guardar tokens del nombre para comparación flexible
-        nombre_normalizado = " ".join(match["name_tokens"]).lower()
-        nombres_reglas_contextuales.add(nombre_normalizado)
+    spans_reglas_contextuales = {
+        (match["span_start"], match["span_end"]) for match in matches_contextuales
+    }
+    # Nombres detectados por reglas, normalizados para comparación flexible
+    nombres_reglas_contextuales = {
+        " ".join(match["name_tokens"]).lower() for match in matches_contextuales
+    }
     
     # Procesar coincidencias de reglas contextuales
     for match in matches_contextuales:
@@ -458,133 +931,420 @@ def _extraer_nombres_con_contexto(texto: str, doc=None) -> List[Dict[str, Any]]:
             nombre_limpio = nombre_raw.title()
         
         # Verificar si ya fue agregado
-        if nombre_limpio.lower() in nombres_unicos:
-            # print(f"  ⚠️  '{nombre_raw}' (regla: {match.get('rule', 'unknown')}, ancla: {match['anchor']}) ya detectado previamente")
+        if _clave_nombre(nombre_limpio) in nombres_unicos:
+            logger.debug("'%s' (regla: %s, ancla: %s) ya detectado previamente", nombre_raw, match.get('rule', 'unknown'), match['anchor'])
             continue
         
         # Agregar nombre detectado por regla contextual
-        nombres_unicos.add(nombre_limpio.lower())
+        nombres_unicos.add(_clave_nombre(nombre_limpio))
         
         # Validar que todos los tokens tengan al menos 2 caracteres
         if not _tiene_tokens_validos(nombre_limpio, min_longitud=2):
-            # print(f"  ❌ '{nombre_raw}' rechazado: contiene tokens de 1 carácter")
+            logger.debug("'%s' rechazado: contiene tokens de 1 carácter", nombre_raw)
             continue
         
-        # print(f"  ✅ '{nombre_raw}' detectado por {match.get('rule', 'REGLA_DESCONOCIDA')} (ancla: {match['anchor']})")
+        logger.debug("'%s' detectado por %s (ancla: %s)", nombre_raw, match.get('rule', 'REGLA_DESCONOCIDA'), match['anchor'])
         
         nombres_encontrados.append({
             "nombre": nombre_limpio,
-            "contexto": match["context"],
-            "posicion": match["span_start"]
+            "posicion": match["span_start"],
+            "fin": match["span_end"]
         })
     
     # ========== VALIDAR CANDIDATOS RECHAZADOS POR SPACY CON REGLAS CONTEXTUALES ==========
-    # print(f"\n[DEBUG] Validando {len(candidatos_rechazados_spacy)} candidatos rechazados por spaCy...")
+    logger.debug("Validando %s candidatos rechazados por spaCy...", len(candidatos_rechazados_spacy))
+    
+    # Spans de las reglas indexados una vez: cada consulta es un bisect en vez de
+    # recorrer todos los spans
+    intervalos_reglas = _indexar_intervalos(spans_reglas_contextuales)
+    indice_tokens_reglas = _indexar_tokens_reglas(nombres_reglas_contextuales)
+    indice_subcadenas_reglas = _indexar_subcadenas_reglas(nombres_reglas_contextuales)
     
-    for candidato in candidatos_rechazados_spacy:
-        nombre = candidato["nombre"]
-        start_pos = candidato["start"]
-        end_pos = candidato["end"]
+    for nombre, start_pos, end_pos in candidatos_rechazados_spacy:
         
         validado_por_regla = False
         metodo_validacion = None
         
         # Método 1: Verificar superposición de spans (posiciones)
-        for span_start, span_end in spans_reglas_contextuales:
-            # Hay superposición si los rangos se cruzan
-            if not (end_pos <= span_start or start_pos >= span_end):
-                validado_por_regla = True
-                metodo_validacion = "superposición de spans"
-                break
+        if _hay_superposicion(intervalos_reglas, start_pos, end_pos):
+            validado_por_regla = True
+            metodo_validacion = "superposición de spans"
+        
+        nombre_lower = nombre.lower()
         
         # Método 2: Verificar si los tokens del candidato están contenidos en algún nombre de regla
+        # (o viceversa), consultando el índice invertido de tokens de las reglas
         if not validado_por_regla:
-            tokens_candidato = set(nombre.lower().split())
-            for nombre_regla in nombres_reglas_contextuales:
-                tokens_regla = set(nombre_regla.split())
-                # Si todos los tokens del candidato están en la regla, o viceversa
-                if tokens_candidato.issubset(tokens_regla) or tokens_regla.issubset(tokens_candidato):
-                    validado_por_regla = True
-                    metodo_validacion = "coincidencia de tokens"
-                    break
+            if _hay_inclusion_de_tokens(indice_tokens_reglas, set(nombre_lower.split())):
+                validado_por_regla = True
+                metodo_validacion = "coincidencia de tokens"
         
         # Método 3: Verificar si el nombre del candidato contiene o está contenido en algún nombre de regla
         if not validado_por_regla:
-            nombre_lower = nombre.lower()
-            for nombre_regla in nombres_reglas_contextuales:
-                if nombre_lower in nombre_regla or nombre_regla in nombre_lower:
-                    validado_por_regla = True
-                    metodo_validacion = "subcadena de texto"
-                    break
+            if _hay_subcadena_con_regla(indice_subcadenas_reglas, nombre_lower):
+                validado_por_regla = True
+                metodo_validacion = "subcadena de texto"
         
         if validado_por_regla:
             # Validar que todos los tokens tengan al menos 2 caracteres
             if not _tiene_tokens_validos(nombre, min_longitud=2):
-                # print(f"  ❌ '{nombre}' rechazado: contiene tokens de 1 carácter (ej: 'S E N T E N')")
+                logger.debug("'%s' rechazado: contiene tokens de 1 carácter (ej: 'S E N T E N')", nombre)
                 continue
             
             # Verificar si ya fue agregado
-            if nombre.lower() in nombres_unicos:
-                # print(f"  ⚠️  '{nombre}' ya fue agregado por las reglas contextuales")
+            if _clave_nombre(nombre) in nombres_unicos:
+                logger.debug("'%s' ya fue agregado por las reglas contextuales", nombre)
                 continue
             
             # Agregar nombre rescatado por reglas contextuales
-            nombres_unicos.add(nombre.lower())
-            
-            # Extraer contexto usando función centralizada
-            contexto = _extraer_contexto(texto, start_pos, end_pos, window=60)
+            nombres_unicos.add(_clave_nombre(nombre))
             
-            # print(f"  ✅ '{nombre}' RESCATADO por regla contextual ({metodo_validacion})")
+            logger.debug("'%s' RESCATADO por regla contextual (%s)", nombre, metodo_validacion)
             
             nombres_encontrados.append({
                 "nombre": nombre,
-                "contexto": contexto,
-                "posicion": start_pos
+                "posicion": start_pos,
+                "fin": end_pos
             })
         else:
-            # print(f"  ❌ '{nombre}' rechazado definitivamente (no validado ni por spaCy ni por reglas)")
-            pass
+            logger.debug("'%s' rechazado definitivamente (no validado ni por spaCy ni por reglas)", nombre)
     
     # FASE 4: Limpieza de anclas contextuales
-    # print("\n[DEBUG] ===== FASE 4: LIMPIEZA DE ANCLAS CONTEXTUALES =====")
-    # print(f"[DEBUG] Nombres antes de limpiar anclas: {len(nombres_encontrados)}")
+    logger.debug("FASE 4: LIMPIEZA DE ANCLAS CONTEXTUALES")
+    logger.debug("Nombres antes de limpiar anclas: %s", len(nombres_encontrados))
     nombres_sin_anclas = _limpiar_anclas_de_nombres(nombres_encontrados)
-    # print(f"[DEBUG] Nombres después de limpiar anclas: {len(nombres_sin_anclas)}")
+    logger.debug("Nombres después de limpiar anclas: %s", len(nombres_sin_anclas))
     
     # FASE 5: Deduplicación y limpieza de bordes
-    # print("\n[DEBUG] ===== FASE 5: DEDUPLICACIÓN Y LIMPIEZA DE BORDES =====")
-    # print(f"[DEBUG] Nombres antes de deduplicación: {len(nombres_sin_anclas)}")
+    logger.debug("FASE 5: DEDUPLICACIÓN Y LIMPIEZA DE BORDES")
+    logger.debug("Nombres antes de deduplicación: %s", len(nombres_sin_anclas))
     nombres_deduplicados = _eliminar_duplicados_y_subconjuntos(nombres_sin_anclas)
-    # print(f"[DEBUG] Nombres después de deduplicación: {len(nombres_deduplicados)}")
+    logger.debug("Nombres después de deduplicación: %s", len(nombres_deduplicados))
     
     nombres_limpios = _limpiar_bordes_de_nombres(nombres_deduplicados)
-    # print(f"[DEBUG] Nombres después de limpiar bordes: {len(nombres_limpios)}")
+    logger.debug("Nombres después de limpiar bordes: %s", len(nombres_limpios))
     
     # FASE 6: Filtrar palabras no-nombres
-    # print("\n[DEBUG] ===== FASE 6: FILTRO DE PALABRAS NO-NOMBRES =====")
-    # print(f"[DEBUG] Nombres antes de filtrar palabras: {len(nombres_limpios)}")
+    logger.debug("FASE 6: FILTRO DE PALABRAS NO-NOMBRES")
+    logger.debug("Nombres antes de filtrar palabras: %s", len(nombres_limpios))
     nombres_finales = _filtrar_palabras_no_nombres(nombres_limpios)
-    # print(f"[DEBUG] Nombres después de filtrar palabras: {len(nombres_finales)}")
+    logger.debug("Nombres después de filtrar palabras: %s", len(nombres_finales))
     
     # Debug: Resumen final
-    # print(f"\n[DEBUG] ===== RESUMEN FINAL =====")
-    # print(f"  - Fase 1 - Candidatos regex capturados: {len(candidatos_regex)}")
-    # print(f"  - Fase 3 - Detectados por reglas contextuales: {len(matches_contextuales)}")
-    # print(f"  - Fase 4 - Nombres después de limpiar anclas: {len(nombres_sin_anclas)}")
-    # print(f"  - Fase 5 - Nombres después de deduplicación: {len(nombres_limpios)}")
-    # print(f"  - Fase 6 - Nombres después de filtrar palabras: {len(nombres_finales)}")
-    # print(f"  - TOTAL nombres únicos finales: {len(nombres_finales)}")
-    lista_nombres_finales = [n['nombre'] for n in nombres_finales]
-    # print(f"  - Lista final: {lista_nombres_finales}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("RESUMEN FINAL")
+        logger.debug("- Fase 1 - Candidatos regex capturados: %s", len(candidatos_regex))
+        logger.debug("- Fase 3 - Detectados por reglas contextuales: %s", len(matches_contextuales))
+        logger.debug("- Fase 4 - Nombres después de limpiar anclas: %s", len(nombres_sin_anclas))
+        logger.debug("- Fase 5 - Nombres después de deduplicación: %s", len(nombres_limpios))
+        logger.debug("- Fase 6 - Nombres después de filtrar palabras: %s", len(nombres_finales))
+        logger.debug("- TOTAL nombres únicos finales: %s", len(nombres_finales))
+        logger.debug("- Lista final: %s", [n['nombre'] for n in nombres_finales])
     
     # Ordenar por posición
-    nombres_finales.sort(key=lambda x: x['posicion'])
+    nombres_finales.sort(key=itemgetter('posicion'))
+    
+    # El contexto se extrae recién ahora, solo para los nombres que sobrevivieron a
+    # todas las fases (los descartados nunca pagan el recorte del texto). Los campos
+    # internos (posición, fin, tokens en minúsculas) no forman parte del resultado.
+    return [
+        {"nombre": item["nombre"], "contexto": _extraer_contexto(texto, item["posicion"], item["fin"])}
+        for item in nombres_finales
+    ]
+
+
+def _validar_candidatos_con_spacy(
+    candidatos_regex: List[Tuple[str, int, int, str]],
+    spans_validados,
+    nombres_unicos: set
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, int, int]]]:
+    """
+    FASE 2: Valida los candidatos regex contra los spans PER de spaCy.
+    
+    Es el bucle más caliente del pipeline (un paso por candidato), por eso está
+    aislado en una función con tipos simples (tuplas, ints, str) y con los nombres
+    globales enlazados a variables locales antes del bucle.
+    
+    Args:
+        candidatos_regex: Tuplas (texto, start, end, tipo_patron) de la Fase 1
+        spans_validados: Spans (start, end) PER detectados por spaCy
+        nombres_unicos: Claves (_clave_nombre) de los nombres ya agregados; se actualiza in-place
+        
+    Returns:
+        Tupla (nombres validados por spaCy, candidatos (nombre, start, end) rechazados
+        por spaCy para validar con reglas contextuales)
+    """
+    nombres_encontrados = []
+    candidatos_rechazados_spacy = []
+    
+    # Índice de intervalos para consultar superposición en O(log M) por candidato
+    inicios, fines_max = _indexar_intervalos(spans_validados)
+    
+    # Enlaces locales (evitan búsquedas globales/atributos en cada iteración)
+    normalizar = _normalizar_candidato
+    clave_nombre = _clave_nombre
+    agregar_encontrado = nombres_encontrados.append
+    agregar_rechazado = candidatos_rechazados_spacy.append
+    agregar_unico = nombres_unicos.add
+    debug = logger.debug
+    # Con DEBUG apagado (lo normal en producción) se evita la llamada a logger.debug
+    # por candidato, que aunque no emita nada cuesta dos llamadas de Python
+    depurar = logger.isEnabledFor(logging.DEBUG)
+    
+    logger.debug("Procesando candidatos regex...")
+    # Un mismo nombre aparece muchas veces en un expediente: cada cadena distinta
+    # se limpia, filtra y lleva a su clave de deduplicación una sola vez, y las
+    # repeticiones reutilizan el par (nombre limpio, clave)
+    candidatos_normalizados: Dict[Tuple[str, str], Optional[Tuple[str, str]]] = {}
+    for nombre_raw, start_pos, end_pos, tipo_patron in candidatos_regex:
+        # Limpiar, normalizar y aplicar filtros de forma (2-5 palabras, tokens >= 2 caracteres)
+        clave_candidato = (nombre_raw, tipo_patron)
+        if clave_candidato in candidatos_normalizados:
+            normalizado = candidatos_normalizados[clave_candidato]
+        else:
+            nombre_limpio = normalizar(nombre_raw, tipo_patron)
+            normalizado = None if nombre_limpio is None else (nombre_limpio, clave_nombre(nombre_limpio))
+            candidatos_normalizados[clave_candidato] = normalizado
+        if normalizado is None:
+            continue
+        nombre_limpio, clave = normalizado
+
+        # Evitar duplicados
+        if clave in nombres_unicos:
+            if depurar:
+                debug("'%s' rechazado: duplicado", nombre_raw)
+            continue
+
+        # ========== VALIDACIÓN CON SPACY ==========
+        # Verificar si este candidato se superpone con algún span validado por spaCy
+        # (misma consulta que _hay_superposicion, en línea)
+        idx = bisect_left(inicios, end_pos)
+        validado_por_spacy = idx > 0 and fines_max[idx - 1] > start_pos
+
+        # Si no fue validado por spaCy, guardar para validar con reglas contextuales (Fase 3)
+        if not validado_por_spacy:
+            if depurar:
+                debug("'%s' NO validado por spaCy NER → se validará con reglas contextuales", nombre_raw)
+            
+            # Guardar candidato rechazado para validación posterior con reglas
+            agregar_rechazado((nombre_limpio, start_pos, end_pos))
+            continue
+
+        if depurar:
+            debug("'%s' validado por SPACY", nombre_raw)
+        agregar_unico(clave)
+
+        agregar_encontrado({
+            "nombre": nombre_limpio,
+            "posicion": start_pos,
+            "fin": end_pos
+        })
+    
+    return nombres_encontrados, candidatos_rechazados_spacy
+
+
+def _indexar_intervalos(spans) -> Tuple[List[int], List[int]]:
+    """
+    Prepara un conjunto de spans (start, end) para consultas de superposición.
+    
+    Returns:
+        Tupla (inicios ordenados, máximo fin acumulado hasta cada posición). El
+        máximo acumulado hace que la consulta sea correcta aunque haya spans
+        superpuestos entre sí.
+    """
+    inicios = []
+    fines_max = []
+    fin_max = -1
+    for span_start, span_end in sorted(spans):
+        inicios.append(span_start)
+        fin_max = max(fin_max, span_end)
+        fines_max.append(fin_max)
+    return inicios, fines_max
+
+
+def _hay_superposicion(intervalos: Tuple[List[int], List[int]], start: int, end: int) -> bool:
+    """
+    Indica si [start, end) se cruza con algún span indexado por _indexar_intervalos().
+    
+    Los spans que empiezan antes de end están a la izquierda de bisect_left(inicios, end);
+    alguno se superpone si y solo si el mayor fin entre ellos supera a start.
+    """
+    inicios, fines_max = intervalos
+    idx = bisect_left(inicios, end)
+    return idx > 0 and fines_max[idx - 1] > start
+
+
+def _indexar_tokens_reglas(nombres_reglas) -> Tuple[Dict[str, List[int]], List[int]]:
+    """
+    Índice invertido de los nombres detectados por reglas contextuales.
+    
+    Returns:
+        Tupla (token -> índices de las reglas que lo contienen, cantidad de tokens
+        distintos de cada regla)
+    """
+    indice = {}
+    tamanos = []
+    for i, nombre_regla in enumerate(nombres_reglas):
+        tokens_regla = set(nombre_regla.split())
+        tamanos.append(len(tokens_regla))
+        for token in tokens_regla:
+            indice.setdefault(token, []).append(i)
+    return indice, tamanos
+
+
+def _hay_inclusion_de_tokens(indice_reglas: Tuple[Dict[str, List[int]], List[int]], tokens_candidato: set) -> bool:
+    """
+    Indica si los tokens del candidato están todos en alguna regla o si todos los
+    tokens de alguna regla están en el candidato (ver _indexar_tokens_reglas).
+    
+    Solo se recorren las reglas que comparten algún token con el candidato: contar
+    cuántos tokens comparte cada una alcanza para decidir ambas inclusiones.
+    """
+    indice, tamanos = indice_reglas
+    if not tamanos:
+        return False
+    # Un conjunto vacío está incluido en cualquier otro
+    if not tokens_candidato or 0 in tamanos:
+        return True
+    
+    compartidos = {}
+    for token in tokens_candidato:
+        for i in indice.get(token, ()):
+            compartidos[i] = compartidos.get(i, 0) + 1
+    
+    cantidad_candidato = len(tokens_candidato)
+    return any(
+        cantidad == cantidad_candidato or cantidad == tamanos[i]
+        for i, cantidad in compartidos.items()
+    )
+
+
+# Separador de los nombres de reglas en el buffer de _indexar_subcadenas_reglas: no
+# aparece en ningún nombre, así que una coincidencia nunca cruza de una regla a otra
+_SEPARADOR_REGLAS = '\x00'
+
+
+def _indexar_subcadenas_reglas(nombres_reglas) -> Tuple[str, List[str]]:
+    """
+    Prepara los nombres detectados por reglas contextuales para búsquedas de subcadena.
+    
+    Returns:
+        Tupla (todos los nombres unidos por _SEPARADOR_REGLAS, nombres ordenados por largo)
+    """
+    nombres = sorted(nombres_reglas, key=len)
+    return _SEPARADOR_REGLAS.join(nombres), nombres
+
+
+def _hay_subcadena_con_regla(indice_reglas: Tuple[str, List[str]], nombre_lower: str) -> bool:
+    """
+    Indica si el nombre está contenido en algún nombre de regla o si algún nombre
+    de regla está contenido en él (ver _indexar_subcadenas_reglas).
     
-    # Eliminar campo posición
-    for nombre in nombres_finales:
-        del nombre['posicion']
+    La primera dirección es una sola búsqueda sobre el buffer unido; para la segunda
+    solo se prueban las reglas que no son más largas que el nombre.
+    """
+    buffer_reglas, nombres_por_largo = indice_reglas
+    if not nombres_por_largo:
+        return False
+    if _SEPARADOR_REGLAS not in nombre_lower and nombre_lower in buffer_reglas:
+        return True
+    
+    largo = len(nombre_lower)
+    for nombre_regla in nombres_por_largo:
+        if len(nombre_regla) > largo:
+            break
+        if nombre_regla in nombre_lower:
+            return True
+    return False
+
+
+def _capturar_candidatos_regex(texto: str):
+    """
+    FASE 1: Genera los candidatos a nombre capturados por regex, en orden:
+    primero MAYÚSCULAS, luego Mixto (ambos de una sola pasada) y luego formato
+    con coma.
     
-    return nombres_finales
+    Args:
+        texto: Texto normalizado a procesar
+        
+    Yields:
+        Tuplas (texto, start, end, tipo_patron). Tuplas y no diccionarios: puede
+        haber miles de candidatos por documento y solo se recorren en orden.
+    """
+    # Capturar candidatos MAYÚSCULAS y Mixto en una sola pasada sobre el texto.
+    # Un texto sin minúsculas (típico de PDFs escaneados con OCR) no puede tener
+    # candidatos Mixto: alcanza con el patrón de MAYÚSCULAS solo, sin la alternancia.
+    # isupper() es exacto (no un muestreo) y corta en la primera minúscula.
+    if texto.isupper():
+        for match in PATRON_MAYUSCULAS.finditer(texto):
+            yield (match.group(1), match.start(), match.end(), "mayusculas")
+    else:
+        # La pasada única encuentra los candidatos en orden de texto, pero se
+        # entregan todos los de MAYÚSCULAS antes que los Mixto, como con dos
+        # finditer: la Fase 2 se queda con la primera aparición de cada nombre,
+        # y de ese orden dependen la posición y el contexto de la respuesta
+        candidatos_mixto = []
+        for match in PATRON_NOMBRES.finditer(texto):
+            if match.lastgroup == "mayusculas":
+                yield (match.group("mayusculas"), match.start(), match.end(), "mayusculas")
+            else:
+                candidatos_mixto.append((match.group("mixto"), match.start(), match.end(), "mixto"))
+        yield from candidatos_mixto
+    
+    # El formato con coma queda en una pasada aparte: sus coincidencias se SUPERPONEN
+    # con las de MAYÚSCULAS ("PEREZ GOMEZ, JUAN CARLOS" contiene "PEREZ GOMEZ" y
+    # "JUAN CARLOS"), y en una alternancia finditer se quedaría con una sola de ellas.
+    # Sin ninguna coma en el texto no puede haber coincidencias: se evita el recorrido.
+    if ',' not in texto:
+        return
+    for match in PATRON_COMA.finditer(texto):
+        yield (match.group(1), match.start(), match.end(), "coma")
+
+
+def _hay_candidatos_viables(texto: str) -> bool:
+    """
+    Indica si algún candidato regex supera los filtros previos a la validación
+    con spaCy (2 a 5 palabras, tokens de al menos 2 caracteres). Si ninguno lo
+    hace, el resultado de la Fase 2 (NER) no puede afectar a los nombres.
+    Se detiene en el primer candidato viable.
+    """
+    for nombre_raw, _, _, tipo_patron in _capturar_candidatos_regex(texto):
+        if _normalizar_candidato(nombre_raw, tipo_patron) is not None:
+            return True
+    return False
+
+
+def _normalizar_candidato(nombre_raw: str, tipo_patron: str) -> Optional[str]:
+    """
+    Limpia un candidato regex y aplica los filtros de forma previos a spaCy:
+    mínimo 2 y máximo 5 palabras, todas de al menos 2 caracteres.
+    
+    Args:
+        nombre_raw: Nombre original capturado
+        tipo_patron: Tipo de patrón ("mayusculas", "mixto", "coma")
+        
+    Returns:
+        Nombre normalizado, o None si el candidato no pasa los filtros
+    """
+    # Limpiar y normalizar usando función auxiliar
+    tokens, nombre_limpio = _limpiar_y_normalizar_nombre(nombre_raw, tipo_patron)
+
+    # VALIDACIÓN ESTRICTA: mínimo 2, máximo 5 palabras
+    if len(tokens) < 2:
+        logger.debug("'%s' rechazado: menos de 2 palabras", nombre_raw)
+        return None
+    
+    if len(tokens) > 5:
+        logger.debug("'%s' rechazado: más de 5 palabras", nombre_raw)
+        return None
+
+    # Validar que todos los tokens tengan al menos 2 caracteres (sobre los tokens
+    # ya separados, sin volver a partir el nombre)
+    if any(len(token) < 2 for token in tokens):
+        logger.debug("'%s' rechazado: contiene tokens de 1 carácter", nombre_raw)
+        return None
+    
+    return nombre_limpio
 
 
 def _filtrar_palabras_no_nombres(nombres: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -604,7 +1364,7 @@ def _filtrar_palabras_no_nombres(nombres: List[Dict[str, Any]]) -> List[Dict[str
     La comparación es case-insensitive: "Ley", "LEY", "ley" se consideran iguales.
     
     Args:
-        nombres: Lista de diccionarios con 'nombre', 'contexto', 'posicion'
+        nombres: Lista de diccionarios con 'nombre', 'posicion', 'fin', 'tokens_lower'
         
     Returns:
         Lista filtrada sin nombres que contengan palabras filtro
@@ -613,17 +1373,15 @@ def _filtrar_palabras_no_nombres(nombres: List[Dict[str, Any]]) -> List[Dict[str
     
     for item in nombres:
         nombre_original = item['nombre']
-        tokens = nombre_original.split()
         
-        # Convertir tokens a minúsculas para comparación case-insensitive
-        tokens_lower = [t.lower() for t in tokens]
+        # Tokens ya en minúsculas (Fase 4) para la comparación case-insensitive
+        tokens_lower = item['tokens_lower']
         
         # Buscar si algún token está en PALABRAS_FILTRO_NOMBRES
         palabras_encontradas = [t for t in tokens_lower if t in PALABRAS_FILTRO_NOMBRES]
         
         if palabras_encontradas:
-            # print(f"  ❌ '{nombre_original}' filtrado: contiene palabras no-nombre ({', '.join(palabras_encontradas)})")
-            pass
+            logger.debug("'%s' filtrado: contiene palabras no-nombre %s", nombre_original, palabras_encontradas)
         else:
             nombres_validos.append(item)
     
@@ -644,10 +1402,12 @@ def _limpiar_anclas_de_nombres(nombres: List[Dict[str, Any]]) -> List[Dict[str,
         "Sr Juan García DNI" → "Juan García"
     
     Args:
-        nombres: Lista de diccionarios con 'nombre', 'contexto', 'posicion'
+        nombres: Lista de diccionarios con 'nombre', 'posicion', 'fin' (span del
+            nombre en el texto; el contexto se arma al final)
         
     Returns:
-        Lista con nombres limpios (sin anclas contextuales)
+        Lista con nombres limpios (sin anclas contextuales); cada diccionario suma
+        'tokens_lower' (tokens del nombre en minúsculas) para las fases siguientes
     """
     
     nombres_limpios = []
@@ -658,33 +1418,35 @@ def _limpiar_anclas_de_nombres(nombres: List[Dict[str, Any]]) -> List[Dict[str,
         
         # Filtrar tokens que sean anclas contextuales (comparación case-insensitive)
         tokens_limpios = []
+        tokens_lower = []
         for token in tokens:
             token_lower = token.lower()
             # Remover puntos para comparar (ej: "Dr." → "dr")
             token_sin_punto = token_lower.rstrip('.')
             
             # Verificar si el token es un ancla contextual
-            if token_lower not in ANCLAS_CONTEXTUALES and token_sin_punto not in ANCLAS_CONTEXTUALES:
+            if token_lower not in _ANCLAS_CONTEXTUALES_SET and token_sin_punto not in _ANCLAS_CONTEXTUALES_SET:
                 tokens_limpios.append(token)
+                tokens_lower.append(token_lower)
         
         # Reconstruir nombre sin anclas
-        nombre_sin_anclas = ' '.join(tokens_limpios).strip()
+        nombre_sin_anclas = ' '.join(tokens_limpios)
         
         # Validar que queden al menos 2 tokens (nombre válido)
-        tokens_finales = nombre_sin_anclas.split()
-        if len(tokens_finales) >= 2:
+        if len(tokens_limpios) >= 2:
             if nombre_sin_anclas != nombre_original:
-                # print(f"  🧹 '{nombre_original}' → '{nombre_sin_anclas}' (anclas limpiadas)")
-                pass
+                logger.debug("'%s' → '%s' (anclas limpiadas)", nombre_original, nombre_sin_anclas)
             
+            # Los tokens en minúsculas viajan con el nombre: las Fases 5 y 6 los
+            # reutilizan en lugar de volver a pasar el nombre a minúsculas
             nombres_limpios.append({
                 'nombre': nombre_sin_anclas,
-                'contexto': item['contexto'],
-                'posicion': item['posicion']
+                'posicion': item['posicion'],
+                'fin': item['fin'],
+                'tokens_lower': tuple(tokens_lower)
             })
         else:
-            # print(f"  ❌ '{nombre_original}' descartado: menos de 2 tokens después de limpiar anclas")
-            pass
+            logger.debug("'%s' descartado: menos de 2 tokens después de limpiar anclas", nombre_original)
     
     return nombres_limpios
 
@@ -704,7 +1466,7 @@ def _limpiar_bordes_de_nombres(nombres: List[Dict[str, Any]]) -> List[Dict[str,
         "Lopez Gonzales y Perez" → "Lopez Gonzales y Perez" (NO cambia, "y" está en medio)
     
     Args:
-        nombres: Lista de diccionarios con 'nombre', 'contexto', 'posicion'
+        nombres: Lista de diccionarios con 'nombre', 'posicion', 'fin', 'tokens_lower'
         
     Returns:
         Lista con nombres con bordes limpios
@@ -720,22 +1482,24 @@ def _limpiar_bordes_de_nombres(nombres: List[Dict[str, Any]]) -> List[Dict[str,
         tokens_finales = nombre_limpio.split()
         if len(tokens_finales) >= 2:
             if nombre_limpio != nombre_original:
-                # print(f"  🧹 '{nombre_original}' → '{nombre_limpio}' (bordes limpiados)")
-                pass
+                logger.debug("'%s' → '%s' (bordes limpiados)", nombre_original, nombre_limpio)
+                tokens_lower = tuple(t.lower() for t in tokens_finales)
+            else:
+                tokens_lower = item['tokens_lower']
             
             nombres_limpios.append({
                 'nombre': nombre_limpio,
-                'contexto': item['contexto'],
-                'posicion': item['posicion']
+                'posicion': item['posicion'],
+                'fin': item['fin'],
+                'tokens_lower': tokens_lower
             })
         else:
-            # print(f"  ❌ '{nombre_original}' descartado: menos de 2 tokens después de limpiar bordes")
-            pass
+            logger.debug("'%s' descartado: menos de 2 tokens después de limpiar bordes", nombre_original)
     
     return nombres_limpios
 
 
-def _es_nombre_valido_sin_palabras_prohibidas(nombre: str) -> bool:
+def _es_nombre_valido_sin_palabras_prohibidas(tokens_lower) -> bool:
     """
     Verifica si un nombre NO contiene palabras prohibidas (institucionales, jurídicas, etc.).
     
@@ -747,17 +1511,15 @@ def _es_nombre_valido_sin_palabras_prohibidas(nombre: str) -> bool:
         "CARLOS PICCIOCHI RIOS Secretario Cámara" → False (contiene "secretario" y "cámara")
     
     Args:
-        nombre: Nombre a validar
+        tokens_lower: Tokens del nombre en minúsculas (ya calculados en la Fase 4)
         
     Returns:
         True si el nombre NO contiene palabras prohibidas, False en caso contrario
     """
-    
-    tokens = set(nombre.lower().split())
-    # Si tiene intersección con palabras filtro, es inválido
-    if tokens.intersection(PALABRAS_FILTRO_NOMBRES):
-        return False
-    return True
+    # Si algún token es palabra filtro, es inválido. isdisjoint corta en el primer
+    # token prohibido y no arma un set intermedio; al recorrer los tokens en C es
+    # además más rápido que any(t in ... for t in ...)
+    return PALABRAS_FILTRO_NOMBRES.isdisjoint(tokens_lower)
 
 
 def _tiene_tokens_validos(nombre: str, min_longitud: int = 2) -> bool:
@@ -775,10 +1537,10 @@ def _tiene_tokens_validos(nombre: str, min_longitud: int = 2) -> bool:
     Returns:
         True si todos los tokens tienen al menos min_longitud caracteres, False en caso contrario
     """
-    tokens = nombre.split()
-    
-    # Validar que todos los tokens tengan al menos min_longitud caracteres
-    for token in tokens:
+    # Validar que todos los tokens tengan al menos min_longitud caracteres.
+    # El bucle explícito corta en el primer token corto y, para nombres de 2-6
+    # tokens, resulta más rápido que all(...) con generador o min(map(len, ...))
+    for token in nombre.split():
         if len(token) < min_longitud:
             return False
     
@@ -808,7 +1570,7 @@ def _eliminar_duplicados_y_subconjuntos(nombres: List[Dict[str, Any]]) -> List[D
                palabras prohibidas → resultado: "CARLOS PICCIOCHI RIOS" sobrevive.
     
     Args:
-        nombres: Lista de diccionarios con 'nombre', 'contexto', 'posicion'
+        nombres: Lista de diccionarios con 'nombre', 'posicion', 'fin', 'tokens_lower'
         
     Returns:
         Lista filtrada sin duplicados ni subconjuntos (con lógica inteligente)
@@ -816,51 +1578,74 @@ def _eliminar_duplicados_y_subconjuntos(nombres: List[Dict[str, Any]]) -> List[D
     if not nombres:
         return []
     
-    # Convertir cada nombre a conjunto de tokens (en minúsculas para comparación)
+    # Convertir cada nombre a conjunto de tokens (en minúsculas para comparación).
+    # La validez se decide una sola vez por nombre, sobre esos mismos tokens: los
+    # nombres con palabras prohibidas se descartan acá y no llegan a compararse.
+    # Cada conjunto se codifica además como máscara de bits sobre el vocabulario de
+    # tokens del documento (un bit por token distinto): igualdad y subconjunto pasan
+    # a ser un AND y una comparación de enteros en lugar de recorrer los sets
+    bit_por_token = {}
     nombres_con_tokens = []
     for item in nombres:
-        tokens = set(item['nombre'].lower().split())
-        nombres_con_tokens.append({
-            'original': item,
-            'tokens': tokens,
-            'tokens_count': len(tokens),
-            'es_valido': _es_nombre_valido_sin_palabras_prohibidas(item['nombre'])
-        })
+        tokens = set(item['tokens_lower'])
+        if not _es_nombre_valido_sin_palabras_prohibidas(tokens):
+            logger.debug("'%s' eliminado: contiene palabras prohibidas (pre-filtro)", item['nombre'])
+            continue
+        mascara = 0
+        for token in tokens:
+            bit = bit_por_token.get(token)
+            if bit is None:
+                bit = bit_por_token[token] = 1 << len(bit_por_token)
+            mascara |= bit
+        nombres_con_tokens.append((len(tokens), tokens, mascara, item))
     
     # Ordenar por cantidad de tokens (ASCENDENTE) para procesar primero los más cortos
-    # Esto permite que los cortos se agreguen primero si son válidos
-    nombres_con_tokens.sort(key=lambda x: x['tokens_count'])
-    
-    nombres_validos = []
-    tokens_ya_usados = []
-    
-    for item in nombres_con_tokens:
-        tokens_actual = item['tokens']
-        nombre_actual = item['original']['nombre']
-        es_actual_valido = item['es_valido']
+    # Esto permite que los cortos se agreguen primero si son válidos. La cantidad va
+    # precalculada en la tupla y itemgetter (en C) evita una lambda por comparación
+    nombres_con_tokens.sort(key=itemgetter(0))
+    
+    # Nombres ya agregados: id incremental -> (item original, tokens, máscara). El dict conserva
+    # el orden de inserción y los ids crecen con él, así que recorrer los candidatos
+    # por id ascendente equivale a recorrer la lista completa en orden.
+    nombres_validos = {}
+    # Índice invertido token -> ids de los nombres agregados que lo contienen. Dos
+    # conjuntos de tokens no vacíos sin tokens en común no pueden ser iguales ni
+    # subconjunto uno del otro, así que solo se compara contra los que comparten
+    # al menos un token (en vez de contra todos los agregados).
+    ids_por_token = {}
+    ids_sin_tokens = set()
+    siguiente_id = 0
+    
+    for _, tokens_actual, mascara_actual, original in nombres_con_tokens:
+        nombre_actual = original['nombre']
         es_valido = True
         
-        # Si el nombre actual tiene palabras prohibidas, descartarlo de inmediato
-        if not es_actual_valido:
-            # print(f"  🗑️  '{nombre_actual}' eliminado: contiene palabras prohibidas (pre-filtro)")
-            continue
+        if tokens_actual:
+            ids_candidatos = set(ids_sin_tokens)
+            for token in tokens_actual:
+                ids_candidatos.update(ids_por_token.get(token, ()))
+        else:
+            # Un conjunto vacío es subconjunto de cualquier otro: comparar contra todos
+            ids_candidatos = nombres_validos.keys()
         
-        # Verificar contra todos los nombres ya agregados
-        for idx, tokens_existente in enumerate(tokens_ya_usados):
-            nombre_existente = nombres_validos[idx]['nombre']
+        # Verificar contra los nombres ya agregados que pueden coincidir
+        for idx in sorted(ids_candidatos):
+            original_existente, tokens_existente, mascara_existente = nombres_validos[idx]
+            nombre_existente = original_existente['nombre']
+            comunes = mascara_actual & mascara_existente
             
             # CASO 1: Duplicado con tokens en diferente orden
             # Si los conjuntos de tokens son idénticos → es duplicado
-            if tokens_actual == tokens_existente:
-                # print(f"  🗑️  '{nombre_actual}' eliminado: duplicado con diferente orden")
+            if mascara_actual == mascara_existente:
+                logger.debug("'%s' eliminado: duplicado con diferente orden", nombre_actual)
                 es_valido = False
                 break
             
             # CASO 2: El actual es subconjunto de uno existente
             # Si el existente ya está en la lista, significa que era válido
             # Por lo tanto, el actual (más corto) debe ser eliminado
-            if tokens_actual.issubset(tokens_existente):
-                # print(f"  🗑️  '{nombre_actual}' eliminado: subconjunto de '{nombre_existente}'")
+            if comunes == mascara_actual:
+                logger.debug("'%s' eliminado: subconjunto de '%s'", nombre_actual, nombre_existente)
                 es_valido = False
                 break
             
@@ -869,136 +1654,198 @@ def _eliminar_duplicados_y_subconjuntos(nombres: List[Dict[str, Any]]) -> List[D
             # Si el actual es válido, eliminamos el existente (más corto) y agregamos el actual.
             # Si el actual NO es válido, mantenemos el existente.
             # Pero ya validamos arriba que el actual es válido, así que podemos reemplazar.
-            if tokens_existente.issubset(tokens_actual):
-                # print(f"  🔄  '{nombre_existente}' será reemplazado por '{nombre_actual}' (versión más completa)")
-                # Eliminar el existente de las listas
-                nombres_validos.pop(idx)
-                tokens_ya_usados.pop(idx)
+            if comunes == mascara_existente:
+                logger.debug("'%s' será reemplazado por '%s' (versión más completa)", nombre_existente, nombre_actual)
+                # Eliminar el existente (y sus entradas en el índice)
+                del nombres_validos[idx]
+                for token in tokens_existente:
+                    ids_por_token[token].discard(idx)
+                ids_sin_tokens.discard(idx)
                 # El actual se agregará después del bucle
                 break
         
         if es_valido:
-            nombres_validos.append(item['original'])
-            tokens_ya_usados.append(tokens_actual)
-    
-    return nombres_validos
+            nombres_validos[siguiente_id] = (original, tokens_actual, mascara_actual)
+            for token in tokens_actual:
+                ids_por_token.setdefault(token, set()).add(siguiente_id)
+            if not tokens_actual:
+                ids_sin_tokens.add(siguiente_id)
+            siguiente_id += 1
+    
+    return [original for original, _, _ in nombres_validos.values()]
 
 
 def _extraer_y_validar_documento(texto: str, tipo_doc: str) -> List[Dict[str, any]]:
+    """
+    Extrae y valida números de documento de un único tipo.
+    
+    Atajo sobre _extraer_y_validar_documentos() para un solo tipo de documento.
+    
+    Args:
+        texto: Texto normalizado donde buscar
+        tipo_doc: Tipo de documento (dni, matricula, cuif, cuit, cuil, cbu)
+        
+    Returns:
+        Lista con documentos encontrados y validados
+    """
+    return _extraer_y_validar_documentos(texto, [tipo_doc])[tipo_doc]
+
+
+@lru_cache(maxsize=None)
+def _patron_documentos_combinado(tipos_doc: Tuple[str, ...]) -> re.Pattern:
+    r"""
+    Compila (una sola vez por combinación) un patrón con un grupo nombrado por tipo.
+    
+    Ejemplo para ("dni", "cuit"):
+        (?P<dni>\bDNI\s+([\d\s]+)\b)|(?P<cuit>\bCUIT\s+([\d\s]+?)(?=\s*[^\d]|$))
+    
+    Las etiquetas de cada tipo son distintas y lo que consume cada patrón después
+    de su etiqueta son solo dígitos/espacios, así que las coincidencias de tipos
+    distintos nunca se superponen: una sola pasada encuentra lo mismo que una
+    pasada por tipo.
+    """
+    return re.compile(
+        "|".join(f"(?P<{tipo}>{PATRONES_DOCUMENTOS[_TIPOS_DOCUMENTO[tipo]]})" for tipo in tipos_doc),
+        flags=re.IGNORECASE
+    )
+
+
+def _extraer_y_validar_documentos(texto: str, tipos_doc: List[str]) -> Dict[str, List[Dict[str, any]]]:
     """
     Extrae y valida números de documento según normativas argentinas.
     
+    OPTIMIZACIÓN: Recorre el texto UNA sola vez para todos los tipos solicitados
+    (alternancia con grupos nombrados) y despacha cada coincidencia a su validador
+    según match.lastgroup.
+    
     Validaciones aplicadas:
     - DNI: 7-8 dígitos
     - CUIL: 11 dígitos, prefijos 20/23/24/27, dígito verificador
     - CUIT: 11 dígitos, prefijos 20-27/30/33-34, dígito verificador
     - CUIF: 1-10 dígitos numéricos
     - Matrícula: 1-10 caracteres alfanuméricos
+    - CBU: 22 dígitos buscados cerca de la palabra "CBU"
     
     Args:
         texto: Texto normalizado donde buscar
-        tipo_doc: Tipo de documento (dni, matricula, cuif, cuit, cuil)
+        tipos_doc: Tipos de documento (dni, matricula, cuif, cuit, cuil, cbu)
         
     Returns:
-        Lista con documentos encontrados y validados:
-        [
-            {
-                "numero": "44667656",
-                "contexto": "..."
-            }
-        ]
+        Diccionario tipo → lista con documentos encontrados y validados:
+        {
+            "dni": [
+                {
+                    "numero": "44667656",
+                    "contexto": "..."
+                }
+            ]
+        }
     """
-    documentos_encontrados = []
-    numeros_unicos = set()
-    
-    tipo_doc_upper = tipo_doc.upper()
-    patron = PATRONES_DOCUMENTOS[tipo_doc_upper]
-    regex = re.compile(patron, flags=re.IGNORECASE)
-    
-    # Mapa de validadores
-    validadores = {
-        "dni": validar_dni,
-        "cuil": validar_cuil,
-        "cuit": validar_cuit,
-        "cuif": validar_cuif,
-        "matricula": validar_matricula,
-        "cbu": validar_cbu
+    tipos = tuple(dict.fromkeys(tipos_doc))  # Únicos, preservando el orden
+    documentos_por_tipo: Dict[str, List[Dict[str, any]]] = {tipo: [] for tipo in tipos}
+    if not tipos:
+        return documentos_por_tipo
+    
+    # Números ya evaluados por tipo, válidos o no: la validación es determinística,
+    # así que cada número distinto se valida una sola vez aunque se repita en el texto
+    numeros_vistos: Dict[str, set] = {tipo: set() for tipo in tipos}
+    regex = _patron_documentos_combinado(tipos)
+    
+    # Todo lo que depende solo del tipo se resuelve una vez por llamada: grupo del
+    # número en el patrón combinado, si se limpia a dígitos, validador y destinos.
+    # Por coincidencia queda una única búsqueda en este dict
+    despacho = {
+        tipo: (
+            regex.groupindex[tipo] + 1,  # El número es el grupo interno, inmediatamente después del nombrado
+            tipo in _TIPOS_SOLO_DIGITOS,
+            _VALIDADORES[tipo],
+            numeros_vistos[tipo],
+            documentos_por_tipo[tipo],
+        )
+        for tipo in tipos if tipo != "cbu"
     }
     
-    validador = validadores.get(tipo_doc)
-    
-    # Manejo especial para CBU: buscar la palabra "CBU" y luego buscar números cerca
-    if tipo_doc == "cbu":
-        for match in regex.finditer(texto):
-            pos_cbu = match.start()
-            
-            # Definir ventana de búsqueda: 200 caracteres antes y después de "CBU"
-            ventana_inicio = max(0, pos_cbu - 200)
-            ventana_fin = min(len(texto), pos_cbu + 200)
-            ventana_texto = texto[ventana_inicio:ventana_fin]
-            
-            # Buscar secuencias de 22 dígitos (con posibles espacios internos)
-            # Patrón: 22 dígitos con espacios opcionales entre ellos
-            patron_numeros = r'\b(\d(?:\s?\d){20,21})\b'
-            
-            for num_match in re.finditer(patron_numeros, ventana_texto):
-                numero_capturado = num_match.group(1)
-                numero_limpio = re.sub(r'\D', '', numero_capturado)
-                
-                # Validar que tenga exactamente 22 dígitos
-                if not validar_cbu(numero_limpio):
-                    continue
-                
-                # Evitar duplicados
-                if numero_limpio in numeros_unicos:
-                    continue
-                
-                numeros_unicos.add(numero_limpio)
-                
-                # Extraer contexto desde la posición real en el texto original
-                pos_real = ventana_inicio + num_match.start()
-                contexto = _extraer_contexto(texto, pos_real, pos_real + len(numero_capturado), window=60)
-                
-                documento = {
-                    "numero": numero_limpio,
-                    "contexto": contexto
-                }
-                
-                documentos_encontrados.append(documento)
-        
-        return documentos_encontrados
-    
-    # Para otros documentos, usar el flujo normal
     for match in regex.finditer(texto):
-        numero = match.group(1)
+        tipo_doc = match.lastgroup
         
-        # Limpiar número (sin separadores)
-        numero_limpio = re.sub(r'\D', '', numero) if tipo_doc in ("cuit", "cuil", "dni", "cuif") else numero
-        
-        # Evitar duplicados
-        if numero_limpio in numeros_unicos:
+        # Manejo especial para CBU: buscar la palabra "CBU" y luego buscar números cerca
+        if tipo_doc == "cbu":
+            _extraer_cbu_cerca_de(
+                texto, match.start(), documentos_por_tipo["cbu"], numeros_vistos["cbu"]
+            )
             continue
         
-        # Validar formato
-        es_valido = validador(numero_limpio) if validador else False
+        grupo_numero, limpiar_digitos, validador, vistos, documentos = despacho[tipo_doc]
+        numero = match.group(grupo_numero)
         
-        # Solo agregar si es válido
-        if not es_valido:
+        # Limpiar número (sin separadores)
+        numero_limpio = solo_digitos(numero) if limpiar_digitos else numero
+        
+        # Evitar duplicados (y no volver a validar un número ya rechazado). Se agrega
+        # directamente y se mira si el set creció: un solo hash en lugar de dos
+        cantidad_vistos = len(vistos)
+        vistos.add(numero_limpio)
+        if len(vistos) == cantidad_vistos:
             continue
         
-        numeros_unicos.add(numero_limpio)
+        # Validar formato; solo agregar si es válido
+        if not validador(numero_limpio):
+            continue
         
         # Extraer contexto usando función centralizada
         contexto = _extraer_contexto(texto, match.start(), match.end(), window=60)
         
-        documento = {
+        documentos.append({
             "numero": numero_limpio,
             "contexto": contexto
-        }
-        
-        documentos_encontrados.append(documento)
+        })
+    
+    return documentos_por_tipo
+
+
+def _extraer_cbu_cerca_de(
+    texto: str,
+    pos_cbu: int,
+    documentos_encontrados: List[Dict[str, any]],
+    numeros_vistos: set
+) -> None:
+    """
+    Busca CBUs válidos (22 dígitos) en una ventana de 200 caracteres alrededor
+    de una aparición de la palabra "CBU" y los agrega a documentos_encontrados.
     
-    return documentos_encontrados
+    numeros_vistos acumula los números ya evaluados (válidos o no): las ventanas
+    de dos "CBU" cercanos se superponen y así cada número se valida una sola vez.
+    """
+    # Definir ventana de búsqueda: 200 caracteres antes y después de "CBU".
+    # Se busca con pos/endpos sobre el texto completo en vez de copiar la ventana;
+    # las posiciones de los matches ya son las del texto original. En el borde
+    # izquierdo \b mira el carácter anterior real, así que una secuencia de dígitos
+    # cortada por la ventana ya no se toma como un número más corto
+    ventana_inicio = max(0, pos_cbu - 200)
+    ventana_fin = min(len(texto), pos_cbu + 200)
+    
+    # Buscar secuencias de 22 dígitos (con posibles espacios internos)
+    for num_match in _PATRON_NUMERO_CBU.finditer(texto, ventana_inicio, ventana_fin):
+        numero_capturado = num_match.group(1)
+        numero_limpio = solo_digitos(numero_capturado)
+        
+        # Evitar duplicados (y no volver a validar un número ya rechazado)
+        cantidad_vistos = len(numeros_vistos)
+        numeros_vistos.add(numero_limpio)
+        if len(numeros_vistos) == cantidad_vistos:
+            continue
+        
+        # Validar que tenga exactamente 22 dígitos
+        if not validar_cbu(numero_limpio):
+            continue
+        
+        # Extraer contexto usando función centralizada
+        contexto = _extraer_contexto(texto, num_match.start(), num_match.end(), window=60)
+        
+        documentos_encontrados.append({
+            "numero": numero_limpio,
+            "contexto": contexto
+        })
 
 
 def validar_entidades_solicitadas(entidades: List[str]) -> tuple[bool, Optional[str]]:
@@ -1014,8 +1861,7 @@ def validar_entidades_solicitadas(entidades: List[str]) -> tuple[bool, Optional[
     if not entidades or len(entidades) == 0:
         return False, "Debe especificar al menos una entidad a extraer"
     
-    entidades_validas = {"nombre", "nombres", "dni", "matricula", "cuif", "cuit", "cuil", "cbu"}
-    entidades_invalidas = set(e.lower().strip() for e in entidades) - entidades_validas
+    entidades_invalidas = set(e.lower().strip() for e in entidades) - _ENTIDADES_VALIDAS
     
     if entidades_invalidas:
         return False, (
@@ -2,7 +2,51 @@
 Validadores para entidades (DNI, CUIL, CUIT, CUIF, Matrícula).
 Implementa validación estricta de formatos según normativas argentinas.
 """
-import re
+from operator import mul
+
+
+class _TablaConservar(dict):
+    """
+    Tabla para str.translate que conserva los caracteres aceptados por
+    `conservar` y elimina el resto.
+    
+    Se completa a demanda (__missing__) en lugar de enumerar todo Unicode: la
+    primera vez que aparece un carácter se decide y queda memorizado.
+    """
+    
+    def __init__(self, conservar):
+        super().__init__()
+        self._conservar = conservar
+    
+    def __missing__(self, codigo: int):
+        valor = codigo if self._conservar(chr(codigo)) else None
+        self[codigo] = valor
+        return valor
+
+
+# Equivalente a re.sub(r'\D', '', ...): \d en patrones str es cualquier dígito
+# decimal Unicode, es decir str.isdecimal
+_TABLA_SOLO_DIGITOS = _TablaConservar(str.isdecimal)
+# Equivalente a re.sub(r'[^A-Za-z0-9]', '', ...)
+_TABLA_SOLO_ALFANUMERICOS_ASCII = _TablaConservar(lambda c: c.isascii() and c.isalnum())
+
+
+# Secuencia de multiplicadores para el módulo 11 de CUIT/CUIL
+_MULTIPLICADORES_CUIT = (5, 4, 3, 2, 7, 6, 5, 4, 3, 2)
+# Sobre los bytes ASCII cada dígito vale (byte - 48): se resta una sola vez al final
+_AJUSTE_ASCII_CUIT = ord('0') * sum(_MULTIPLICADORES_CUIT)
+
+
+def solo_digitos(texto: str) -> str:
+    """
+    Elimina todo lo que no sea dígito (separadores, espacios, letras).
+    
+    str.translate con tabla es un recorrido en C, más barato que la sustitución
+    por regex; si el texto ya viene limpio se devuelve tal cual.
+    """
+    if texto.isdecimal():
+        return texto
+    return texto.translate(_TABLA_SOLO_DIGITOS)
 
 
 def validar_dni(numero: str) -> bool:
@@ -11,8 +55,10 @@ def validar_dni(numero: str) -> bool:
     - Solo números
     - Longitud: 7 u 8 dígitos
     """
-    numero_limpio = re.sub(r'\D', '', numero)
-    return len(numero_limpio) in (7, 8) and numero_limpio.isdigit()
+    # solo_digitos ya deja únicamente dígitos (y devuelve tal cual un número limpio):
+    # alcanza con la longitud, sin volver a recorrer con isdigit()
+    numero_limpio = solo_digitos(numero)
+    return len(numero_limpio) in (7, 8)
 
 
 def validar_cuil(numero: str) -> bool:
@@ -22,7 +68,7 @@ def validar_cuil(numero: str) -> bool:
     - Prefijos válidos: 20, 23, 24, 27
     - Estructura: AA-BBBBBBBB-C
     """
-    numero_limpio = re.sub(r'\D', '', numero)
+    numero_limpio = solo_digitos(numero)
     
     if len(numero_limpio) != 11:
         return False
@@ -42,7 +88,7 @@ def validar_cuit(numero: str) -> bool:
     - Prefijos válidos: 20, 23, 24, 27 (personas físicas), 30, 33, 34 (jurídicas)
     - Estructura: AA-BBBBBBBB-C
     """
-    numero_limpio = re.sub(r'\D', '', numero)
+    numero_limpio = solo_digitos(numero)
     
     if len(numero_limpio) != 11:
         return False
@@ -62,8 +108,8 @@ def validar_cuif(numero: str) -> bool:
     - Longitud: 1 a 10 dígitos
     - Sin formato estructurado
     """
-    numero_limpio = re.sub(r'\D', '', numero)
-    return 1 <= len(numero_limpio) <= 10 and numero_limpio.isdigit()
+    numero_limpio = solo_digitos(numero)
+    return 1 <= len(numero_limpio) <= 10
 
 
 def validar_matricula(codigo: str) -> bool:
@@ -73,8 +119,12 @@ def validar_matricula(codigo: str) -> bool:
     - Longitud: 1 a 10 caracteres
     - Sin caracteres especiales (solo letras y números)
     """
-    codigo_limpio = re.sub(r'[^A-Za-z0-9]', '', codigo)
-    return 1 <= len(codigo_limpio) <= 10 and codigo_limpio.isalnum()
+    # Un código que ya es alfanumérico ASCII no tiene nada que limpiar
+    if codigo.isascii() and codigo.isalnum():
+        codigo_limpio = codigo
+    else:
+        codigo_limpio = codigo.translate(_TABLA_SOLO_ALFANUMERICOS_ASCII)
+    return 1 <= len(codigo_limpio) <= 10
 
 
 def validar_cbu(numero: str) -> bool:
@@ -84,8 +134,10 @@ def validar_cbu(numero: str) -> bool:
     - Longitud: 22 dígitos exactos
     - Uso: cuentas bancarias tradicionales (transferencias bancarias)
     """
-    numero_limpio = re.sub(r'\D', '', numero)
-    return len(numero_limpio) == 22 and numero_limpio.isdigit()
+    # El extractor ya pasa el número limpio: solo_digitos lo devuelve tras un único
+    # isdecimal() (sin regex) y la longitud alcanza para decidir
+    numero_limpio = solo_digitos(numero)
+    return len(numero_limpio) == 22
 
 
 def _validar_digito_verificador(numero: str) -> bool:
@@ -101,24 +153,32 @@ def _validar_digito_verificador(numero: str) -> bool:
     if len(numero) != 11:
         return False
     
-    # Secuencia de multiplicadores para módulo 11
-    multiplicadores = [5, 4, 3, 2, 7, 6, 5, 4, 3, 2]
-    
-    try:
-        # Calcular suma ponderada
-        suma = sum(int(numero[i]) * multiplicadores[i] for i in range(10))
-        
-        # Calcular dígito verificador esperado
-        resto = suma % 11
-        digito_esperado = 11 - resto
-        
-        # Casos especiales
-        if digito_esperado == 11:
-            digito_esperado = 0
-        elif digito_esperado == 10:
-            digito_esperado = 9
-        
-        # Comparar con el dígito verificador real
-        return int(numero[10]) == digito_esperado
-    except (ValueError, IndexError):
-        return False
+    if numero.isascii():
+        if not numero.isdigit():
+            return False
+        # Calcular suma ponderada directamente sobre los bytes, sin crear un int por dígito
+        # (map se detiene en el décimo byte, el verificador queda afuera)
+        digitos = numero.encode('ascii')
+        suma = sum(map(mul, digitos, _MULTIPLICADORES_CUIT)) - _AJUSTE_ASCII_CUIT
+        digito_verificador = digitos[10] - 48
+    else:
+        # Dígitos Unicode no ASCII (p. ej. arábigo-índicos): int() los convierte
+        try:
+            valores = [int(c) for c in numero]
+        except ValueError:
+            return False
+        suma = sum(map(mul, valores, _MULTIPLICADORES_CUIT))
+        digito_verificador = valores[10]
+    
+    # Calcular dígito verificador esperado
+    resto = suma % 11
+    digito_esperado = 11 - resto
+    
+    # Casos especiales
+    if digito_esperado == 11:
+        digito_esperado = 0
+    elif digito_esperado == 10:
+        digito_esperado = 9
+    
+    # Comparar con el dígito verificador real
+    return digito_verificador == digito_esperado
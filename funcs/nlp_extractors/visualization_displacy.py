@@ -10,8 +10,8 @@ import os
 import base64
 from datetime import datetime
 import uuid
-import spacy
-from spacy import displacy
+# displacy se importa dentro de cada función: importar este módulo (por ejemplo
+# para leer la configuración) no carga spaCy
 
 
 # ========== CONFIGURACIÓN CENTRAL DE VISUALIZACIÓN ==========
@@ -50,6 +50,7 @@ def render_visualization(doc, style: str = 'ent', options: Optional[Dict[str, An
     """Renderiza con displaCy y devuelve un diccionario con el HTML/SVG en la clave 'content'."""
     result: Dict[str, Any] = {'style': style}
     try:
+        from spacy import displacy
         content = displacy.render(doc, style=style, options=options or {})
         result['content'] = content
     except Exception as e:
@@ -63,6 +64,7 @@ def serve_visualization(doc, style: str = 'ent', options: Optional[Dict[str, Any
     """
     result: Dict[str, Any] = {'style': style}
     try:
+        from spacy import displacy
         displacy.serve(doc, style=style, options=options or {})
         result['served'] = True
     except Exception as e:
@@ -84,8 +86,10 @@ def save_visualization_content(content: str, style: str = 'ent', save_dir: Optio
     filename = f'displacy_{style}_{timestamp}_{unique}.{ext}'
     path = os.path.join(save_dir, filename)
 
-    with open(path, 'w', encoding='utf-8') as fh:
-        fh.write(content)
+    # Se codifica una sola vez: los mismos bytes se escriben y, si es SVG, van a base64
+    contenido_bytes = content.encode('utf-8')
+    with open(path, 'wb') as fh:
+        fh.write(contenido_bytes)
 
     result: Dict[str, Any] = {
         'path': path,
@@ -94,7 +98,7 @@ def save_visualization_content(content: str, style: str = 'ent', save_dir: Optio
     }
 
     if ext == 'svg':
-        result['svg_base64'] = base64.b64encode(content.encode('utf-8')).decode('utf-8')
+        result['svg_base64'] = base64.b64encode(contenido_bytes).decode('ascii')
 
     return result
 
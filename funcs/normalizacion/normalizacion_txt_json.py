@@ -5,6 +5,7 @@ Incluye normalización simple, eliminación de acentos, tokenización y filtrado
 
 import re
 import unicodedata
+from functools import lru_cache
 from typing import List, Set
 
 # Stopwords para filtrado
@@ -18,18 +19,57 @@ STOPWORDS_ES: Set[str] = {
 NON_ALNUM = re.compile(r"[^0-9a-z]+")
 
 
+def _sin_marcas_diacriticas(s: str) -> str:
+    """NFKD + quita marcas diacríticas (categoría Mn)."""
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+
+
+# Latin-1 + Latin Extended-A (hasta U+017F): cubre las letras acentuadas del español.
+# En ese rango no hay marcas combinantes, así que descomponer carácter por carácter
+# da lo mismo que descomponer el texto completo y se puede resolver con una tabla
+_LIMITE_TABLA_ACENTOS = "\u017f"
+_TABLA_SIN_ACENTOS = str.maketrans({
+    chr(c): _sin_marcas_diacriticas(chr(c)) for c in range(0x80, 0x180)
+})
+
+# Patrones de normalizar_para_comparacion (compilados una sola vez al importar)
+_PATRON_ESPACIOS = re.compile(r'\s+')
+_PATRON_BULLETS = re.compile(
+    r'(?:(?<=^)|(?<=\s))[\-\*\u2022\u2023\u25E6\u2043\u2219\u25AA\u25CF\u25CB\u25A0\u00B7\u204C\u204D\u2219\uF0B7\uF0A7\uF076](?=\s)'
+)
+_PATRON_PUNTO_ENTRE_LETRAS = re.compile(r'(?<=[a-zA-Z])\.(?=[a-zA-Z])')
+_PATRON_COMA_FINAL_PALABRA = re.compile(r'[,;](?=\s|$)')
+_PATRON_SEPARADOR_ENTRE_DIGITOS = re.compile(r'(?<=\d)[.\-/\s]+(?=\d)')
+
+# Reemplazos de caracteres sueltos (sin contexto): una tabla de str.translate los
+# resuelve en una sola pasada en C, sin el motor de regex
+_TABLA_CARACTERES_CONTROL = dict.fromkeys(
+    [*range(0x00, 0x09), *range(0x0b, 0x0d), *range(0x0e, 0x20), *range(0x7f, 0xa0)]
+)
+_TABLA_CORCHETES_PARENTESIS = str.maketrans('[](){}', '      ')
+
+
+# Se memoriza: compare_text_preciso normaliza todas las palabras del PDF una vez por
+# cada campo del JSON, así que las mismas palabras se repiten muchísimas veces
+@lru_cache(maxsize=65536)
 def strip_accents_lower(s: str) -> str:
     """
     Normaliza un texto: elimina acentos, convierte a minúsculas,
     deja solo caracteres alfanuméricos y espacios, colapsa espacios múltiples.
     """
-    # NFKD + quita marcas diacríticas + lowercase
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+    # NFKD + quita marcas diacríticas + lowercase. El texto ASCII no cambia con NFKD;
+    # el resto del caso común (acentos del español) se resuelve con str.translate
+    # y solo los caracteres fuera de la tabla pasan por la normalización completa
+    if not s.isascii():
+        if max(s) <= _LIMITE_TABLA_ACENTOS:
+            s = s.translate(_TABLA_SIN_ACENTOS)
+        else:
+            s = _sin_marcas_diacriticas(s)
     s = s.lower()
     # deja solo [0-9a-z] y espacios
     s = NON_ALNUM.sub(" ", s)
-    return re.sub(r"\s+", " ", s).strip()
+    return _PATRON_ESPACIOS.sub(" ", s).strip()
 
 
 def tokenize_text(s: str, remove_stopwords: bool = True) -> List[str]:
@@ -64,10 +104,22 @@ def has_token_overlap(a_tokens: List[str], b_tokens: List[str]) -> bool:
     if set_a & set_b:
         return True
     
-    # Si no hay intersección exacta, probar prefijo >= 3
+    # Si no hay intersección exacta, probar prefijo >= 3. Si un token de al menos 3
+    # caracteres es prefijo de otro, ambos comparten sus 3 primeros caracteres: se
+    # agrupan los tokens de b por esos 3 caracteres y cada token de a solo se
+    # compara con su grupo (en vez de con todos los tokens de b)
+    grupos_b = {}
+    for tb in set_b:
+        if len(tb) >= 3:
+            grupos_b.setdefault(tb[:3], []).append(tb)
+    if not grupos_b:
+        return False
+    
     for ta in set_a:
-        for tb in set_b:
-            if len(ta) >= 3 and len(tb) >= 3 and (ta.startswith(tb) or tb.startswith(ta)):
+        if len(ta) < 3:
+            continue
+        for tb in grupos_b.get(ta[:3], ()):
+            if ta.startswith(tb) or tb.startswith(ta):
                 return True
     
     return False
@@ -80,7 +132,7 @@ def normalizar_para_comparacion(texto: str) -> str:
     También elimina saltos de línea, caracteres especiales inválidos y colapsa espacios múltiples.
     """
     # Eliminar caracteres de reemplazo Unicode inválidos
-    texto = texto.replace('\ufffd', '').replace('�', '')
+    texto = texto.replace('\ufffd', '')
 
     # Normalizar forma canónica (evita variantes visuales raras de bullets/espacios)
     try:
@@ -89,29 +141,27 @@ def normalizar_para_comparacion(texto: str) -> str:
         pass
 
     # Eliminar otros caracteres de control y especiales problemáticos
-    texto = re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f\x7f-\x9f]', '', texto)
+    texto = texto.translate(_TABLA_CARACTERES_CONTROL)
 
     # Remover marcadores de lista/viñetas comunes (Word/PDF/PUA) cuando actúan como bullets
-    BULLETS_REGEX = r'(?:(?<=^)|(?<=\s))[\-\*\u2022\u2023\u25E6\u2043\u2219\u25AA\u25CF\u25CB\u25A0\u00B7\u204C\u204D\u2219\uF0B7\uF0A7\uF076](?=\s)'
-    texto = re.sub(BULLETS_REGEX, ' ', texto)
+    texto = _PATRON_BULLETS.sub(' ', texto)
 
-    # Eliminar saltos de línea y colapsar espacios
-    texto = texto.replace('\n', ' ').replace('\r', ' ')
-    texto = re.sub(r'\s+', ' ', texto).strip()
+    # Los saltos de línea y los espacios múltiples se colapsan una sola vez más abajo:
+    # ninguno de los pasos intermedios depende de cuántos espacios haya ni de su tipo
 
     # Eliminar puntos entre letras (ej: d.n.i → dni)
-    texto = re.sub(r'(?<=[a-zA-Z])\.(?=[a-zA-Z])', '', texto)
+    texto = _PATRON_PUNTO_ENTRE_LETRAS.sub('', texto)
     
     # Eliminar corchetes, paréntesis y otros caracteres de puntuación comunes
-    texto = re.sub(r'[\[\]\(\)\{\}]', ' ', texto)
+    texto = texto.translate(_TABLA_CORCHETES_PARENTESIS)
     
     # Eliminar comas, punto y coma al final de palabras
-    texto = re.sub(r'[,;](?=\s|$)', '', texto)
+    texto = _PATRON_COMA_FINAL_PALABRA.sub('', texto)
     
-    # Colapsar espacios múltiples que puedan haber quedado
-    texto = re.sub(r'\s+', ' ', texto).strip()
+    # Eliminar saltos de línea y colapsar espacios múltiples (incluidos los que quedaron)
+    texto = _PATRON_ESPACIOS.sub(' ', texto).strip()
 
     # Eliminar puntos, guiones, barras y espacios entre dígitos (separadores de miles)
-    texto = re.sub(r'(?<=\d)[.\-/\s]+(?=\d)', '', texto)
+    texto = _PATRON_SEPARADOR_ENTRE_DIGITOS.sub('', texto)
 
     return texto
@@ -2,10 +2,167 @@
 Abre un archivo PDF, extrae todo su texto concatenado y luego lo normaliza al eliminar saltos de línea, convertirlos en espacios y colapsar múltiples espacios consecutivos, devolviendo una sola línea de texto limpia.
 """
 import fitz  # PyMuPDF se usa en vez de PyPDF2 para extraer texto de PDF
-import re, unicodedata
+import re, os, unicodedata, hashlib, threading
+from collections import OrderedDict
+from typing import Tuple, Union
 
+# Patrones compilados una sola vez al importar el módulo (se aplican en cada
+# normalización, en el mismo orden que los pasos de cada función)
+_PATRON_ESPACIOS = re.compile(r'\s+')
 
-def extraer_texto_crudo_pdf(path_pdf: str) -> str:
+# Viñetas de Word/PDF/PUA cuando actúan como bullets (al inicio o tras un espacio)
+_PATRON_BULLETS = re.compile(
+    r'(?:(?<=^)|(?<=\s))[\-\*\u2022\u2023\u25E6\u2043\u2219\u25AA\u25CF\u25CB\u25A0\u00B7\u204C\u204D\uF0B7\uF0A7\uF076](?=\s)'
+)
+
+# Flags de extracción de PyMuPDF: los de "text" por defecto sin preservar
+# whitespace especial. Los tabs/espacios raros salen como espacio común, que igual
+# se colapsan después; se mantiene el recorte al mediabox para no sumar texto
+# fuera de la página. Las ligaduras (ﬁ, ﬂ) se preservan: normalizacion_avanzada_pdf
+# no aplica NFKC, así que expandirlas cambiaría el texto que recibe el NER
+_FLAGS_EXTRACCION_TEXTO = fitz.TEXTFLAGS_TEXT & ~fitz.TEXT_PRESERVE_WHITESPACE
+
+# Guiones largos — (em dash) y – (en dash) → guion normal, en una sola pasada
+_TABLA_GUIONES_LARGOS = str.maketrans({'—': '-', '–': '-'})
+
+# Coma seguida de "CUIT": punto de anclaje de eliminar_puntos_antes_de_cuit
+_PATRON_COMA_CUIT = re.compile(r',\s*CUIT\b', re.IGNORECASE)
+_PATRON_PUNTO_ENTRE_ALFANUMERICOS = re.compile(r'(?<=\w)\.(?=\w)')
+
+# Normalización avanzada (ver pasos en normalizacion_avanzada_pdf)
+# Las reglas consecutivas con el mismo reemplazo se unen en un solo patrón (una
+# pasada sobre el texto en vez de una por regla). Solo se unen reglas cuyo
+# reemplazo no puede generar una coincidencia nueva de la regla siguiente, así
+# que el resultado es el mismo que aplicarlas una detrás de otra:
+# - "Documento Nacional de Identidad" / "Documento Nacional" / "Documento" y las
+#   variantes de "D.N.I." → "DNI" (el opcional anidado prueba primero la frase
+#   más larga, igual que el orden original de las reglas)
+_PATRON_VARIANTES_DNI = re.compile(
+    r'\b(?:Documento(?:\s+Nacional(?:\s+de\s+Identidad)?)?|D[\W_]*N[\W_]*I)\b', re.IGNORECASE
+)
+# - C.U.I.T / C.U.I.L / C.U.I.F → "CUIT " / "CUIL " / "CUIF " (la letra final decide)
+_PATRON_VARIANTES_CUI = re.compile(r'\bC[\W_]*U[\W_]*I[\W_]*([TLF])[\W_\.]*\b', re.IGNORECASE)
+# - "Clave Bancaria Uniforme" → "CBU", que la regla de C.B.U siempre convertía
+#   en "CBU " consumiendo la misma puntuación posterior. El \b tras "Uniforme" es
+#   el de la regla original: sin él, "Uniforme_." se convertiría aunque antes no
+_PATRON_VARIANTES_CBU = re.compile(
+    r'\b(?:Clave\s+Bancaria\s+Uniforme\b|C[\W_]*B[\W_]*U)[\W_\.]*\b', re.IGNORECASE
+)
+# - "Matrícula" y las variantes de "M.P." → "MATRICULA"
+_PATRON_VARIANTES_MATRICULA = re.compile(r'\b(?:Matr[ií]cula|M[\W_]*P)\b', re.IGNORECASE)
+_PATRON_ETIQUETA_CON_SEPARADOR = re.compile(r'\b(DNI|MATRICULA|CUIT|CUIL|CUIF|CBU)\s*[-–—\.]\s*', re.IGNORECASE)
+# Prefijo "N°" / "Número" antes de un número, en una sola pasada. La abreviatura
+# distingue mayúsculas ("N", no "n") y la palabra no (solo esa rama lleva (?i:...)).
+# La palabra admite una abreviatura pegada detrás ("Num. N° 123"): aplicando las
+# reglas una detrás de otra, la abreviatura se quitaba primero y la palabra quedaba
+# directamente antes del número
+_PATRON_PREFIJO_NUMERO = re.compile(
+    r'\b(?:N[º°%”*]?[.:,\s-]*\s*'
+    r'|(?i:N[úu]m(?:ero|eros|\.?)?\s*[-:]?\s*)(?:\bN[º°%”*]?[.:,\s-]*\s*)?)'
+    r'(?=\d)'
+)
+# Separadores tras un dígito: entre dígitos (con espacios opcionales antes del
+# siguiente) o al final del número. Las dos ramas en una sola pasada dan el mismo
+# resultado que aplicarlas una detrás de otra: quitar un separador entre dígitos
+# nunca cambia lo que rodea a un separador final
+_PATRON_SEPARADOR_EN_NUMERO = re.compile(
+    r'(?<=\d)(?:[\.\-/]\s*(?=\d)|[\.\-/]+(?=\s|[^\d\w]|$))'
+)
+_PATRON_NUMERO_ENCERRADO = re.compile(r'(["\(\[\{])\s*(\d+)\s*(["\)\]\}])')
+_PATRON_APERTURA_ANTES_DE_DIGITO = re.compile(r'(["\(\[\{])\s*(\d)')
+_PATRON_CIERRE_TRAS_DIGITO = re.compile(r'(\d)\s*(["\)\]\}])')
+_PATRON_ETIQUETA_PEGADA_A_NUMERO = re.compile(r'\b(DNI|MATRICULA|CBU)[^\w]*(\d+)\b', re.IGNORECASE)
+_PATRON_RUIDO_ETIQUETA_NUMERO = re.compile(
+    r'\b(DNI|MATRICULA|CUIT|CUIL|CUIF|CBU)\b[^\d\n]{0,10}?(?:\d+[a-z]{1,3}\.?|[a-z]{1,5}\.?)?\s*(?=\d{4,})',
+    re.IGNORECASE
+)
+
+
+# Texto por página de los últimos PDFs leídos. En un mismo request el PDF se lee
+# varias veces (verificación de escaneo, comparación, detección de personas,
+# huérfanos); con el cache se abre y se extrae una sola vez
+_MAX_PDFS_CACHEADOS = 8
+_cache_paginas_pdf: "OrderedDict[tuple, Tuple[str, ...]]" = OrderedDict()
+_lock_cache_paginas_pdf = threading.Lock()
+# MuPDF no es thread-safe y la extracción corre en hilos (asyncio.to_thread): toda
+# llamada a PyMuPDF (abrir, iterar páginas, get_text) pasa por este lock
+_lock_mupdf = threading.Lock()
+
+
+def abrir_pdf(path_pdf: Union[str, bytes]) -> fitz.Document:
+    """
+    Abre un PDF desde su ruta o directamente desde su contenido en bytes.
+    
+    Con bytes, PyMuPDF lee el documento desde memoria: los endpoints que ya
+    tienen el PDF subido no necesitan escribirlo a un archivo temporal.
+    """
+    if isinstance(path_pdf, (bytes, bytearray)):
+        return fitz.open(stream=path_pdf, filetype="pdf")
+    return fitz.open(path_pdf)
+
+
+def iterar_paginas_pdf(path_pdf: Union[str, bytes]):
+    """
+    Genera el texto de cada página del PDF, una por vez, sin acumular el documento.
+    
+    La normalización se sigue aplicando sobre el texto completo (hay reglas que
+    cruzan páginas, p. ej. una etiqueta al final de una página y su número en la
+    siguiente), pero los consumidores arman ese texto con un único join en lugar
+    de concatenar página por página. Se une con un espacio para que la última
+    palabra de una página nunca quede pegada a la primera de la siguiente.
+    
+    El generador debe consumirse completo con _lock_mupdf tomado (como hace
+    extraer_paginas_pdf): cada paso llama a MuPDF.
+    """
+    # Las páginas se leen en secuencia a propósito: MuPDF no es thread-safe y
+    # PyMuPDF no libera el GIL en get_text(), así que repartir las páginas de un
+    # mismo documento entre hilos no acelera y puede corromper su estado interno.
+    with abrir_pdf(path_pdf) as doc:
+        for pagina in doc:
+            # sort=False: sin reordenar bloques por posición, el texto se aplana a una línea
+            yield pagina.get_text("text", flags=_FLAGS_EXTRACCION_TEXTO, sort=False)
+
+
+def _clave_cache_pdf(path_pdf: Union[str, bytes]) -> tuple:
+    """
+    Clave del cache de páginas: hash del contenido si el PDF viene en bytes, o
+    (ruta, mtime, tamaño) si viene como ruta, para no servir texto viejo si el
+    archivo cambia.
+    """
+    if isinstance(path_pdf, (bytes, bytearray)):
+        return ("bytes", hashlib.blake2b(path_pdf, digest_size=16).digest())
+    estado = os.stat(path_pdf)
+    return (path_pdf, estado.st_mtime_ns, estado.st_size)
+
+
+def extraer_paginas_pdf(path_pdf: Union[str, bytes]) -> Tuple[str, ...]:
+    """
+    Texto de cada página del PDF (ver iterar_paginas_pdf), cacheado para las
+    lecturas repetidas del mismo documento.
+    """
+    clave = _clave_cache_pdf(path_pdf)
+    with _lock_cache_paginas_pdf:
+        paginas = _cache_paginas_pdf.get(clave)
+        if paginas is not None:
+            _cache_paginas_pdf.move_to_end(clave)
+            return paginas
+
+    with _lock_mupdf:
+        # Otro hilo pudo haber extraído el mismo PDF mientras se esperaba el lock
+        with _lock_cache_paginas_pdf:
+            paginas = _cache_paginas_pdf.get(clave)
+        if paginas is not None:
+            return paginas
+        paginas = tuple(iterar_paginas_pdf(path_pdf))
+
+    with _lock_cache_paginas_pdf:
+        _cache_paginas_pdf[clave] = paginas
+        while len(_cache_paginas_pdf) > _MAX_PDFS_CACHEADOS:
+            _cache_paginas_pdf.popitem(last=False)
+    return paginas
+
+
+def extraer_texto_crudo_pdf(path_pdf: Union[str, bytes]) -> str:
     """
     Extrae texto crudo del PDF SIN normalización agresiva.
     Preserva acentos, mayúsculas, puntuación y estructura original.
@@ -21,33 +178,30 @@ def extraer_texto_crudo_pdf(path_pdf: str) -> str:
     - Eliminación de puntos/comas
     - Modificación de estructura del texto
     """
-    texto = ''
-    with fitz.open(path_pdf) as doc:
-        for pagina in doc:
-            texto += pagina.get_text()
+    texto = ' '.join(extraer_paginas_pdf(path_pdf))
     
-    # Normalización Unicode ligera (solo para caracteres especiales)
-    try:
-        texto = unicodedata.normalize("NFKC", texto)
-    except Exception:
-        pass
+    # Normalización Unicode ligera (solo para caracteres especiales).
+    # El texto ASCII ya está en NFKC: se evita recorrerlo con las tablas de Unicode
+    if not texto.isascii():
+        try:
+            texto = unicodedata.normalize("NFKC", texto)
+        except Exception:
+            pass
     
-    # Convertir saltos de línea a espacios (mínimo necesario)
-    texto = texto.replace('\n', ' ').replace('\r', ' ')
-    
-    # Colapsar espacios múltiples
-    texto = re.sub(r'\s+', ' ', texto).strip()
+    # Convertir saltos de línea a espacios y colapsar espacios múltiples
+    # (\s+ ya incluye \n y \r, no hace falta reemplazarlos antes)
+    texto = _PATRON_ESPACIOS.sub(' ', texto).strip()
     
     return texto
 
 
 # Extración de texto de un PDF + normalización simple
-def normalizacion_simple_pdf(path_pdf: str = None, raw_text: str = None):
+def normalizacion_simple_pdf(path_pdf: Union[str, bytes] = None, raw_text: str = None):
     """
     Extrae y normaliza texto de un PDF o de un texto plano proporcionado.
     
     Args:
-        path_pdf: Ruta al archivo PDF (opcional si se proporciona raw_text)
+        path_pdf: Ruta al archivo PDF o su contenido en bytes (opcional si se proporciona raw_text)
         raw_text: Texto plano directo (opcional si se proporciona path_pdf)
     
     Returns:
@@ -59,28 +213,26 @@ def normalizacion_simple_pdf(path_pdf: str = None, raw_text: str = None):
     if raw_text is not None:
         texto = raw_text
     elif path_pdf:
-        texto = ''
-        with fitz.open(path_pdf) as doc:
-            for pagina in doc:
-                texto += pagina.get_text()
+        texto = ' '.join(extraer_paginas_pdf(path_pdf))
     else:
         raise ValueError("Debe proporcionarse 'path_pdf' o 'raw_text'")
 
     # --- Normalización de símbolos de viñetas (solo símbolos) ---
     # Homogeneiza formas Unicode para capturar bullets "raros" provenientes de Word/PDF
-    try:
-        texto = unicodedata.normalize("NFKC", texto)
-    except Exception:
-        pass
+    # (el texto ASCII ya está en NFKC, ver extraer_texto_crudo_pdf)
+    if not texto.isascii():
+        try:
+            texto = unicodedata.normalize("NFKC", texto)
+        except Exception:
+            pass
 
     # Elimina marcadores de lista cuando aparecen como bullets (al inicio o tras un espacio)
-    BULLETS_REGEX = r'(?:(?<=^)|(?<=\s))[\-\*\u2022\u2023\u25E6\u2043\u2219\u25AA\u25CF\u25CB\u25A0\u00B7\u204C\u204D\uF0B7\uF0A7\uF076](?=\s)'
-    texto = re.sub(BULLETS_REGEX, ' ', texto)
+    texto = _PATRON_BULLETS.sub(' ', texto)
     # --- fin normalización de símbolos ---
 
     # Normalizar el texto: eliminar saltos de línea y espacios múltiples
-    texto = texto.replace('\n', ' ').replace('\r', ' ')
-    texto = re.sub(r'\s+', ' ', texto).strip()
+    # (\s+ ya incluye \n y \r, no hace falta reemplazarlos antes)
+    texto = _PATRON_ESPACIOS.sub(' ', texto).strip()
 
     return texto
 
@@ -90,23 +242,62 @@ def eliminar_puntos_antes_de_cuit(texto: str) -> str:
     dos palabras inmediatamente anteriores a la palabra 'CUIT',
     respetando cualquier coma o espacio que las separe del resto.
     """
-    # Captura dos "palabras" antes de ", CUIT"
-    patrón = re.compile(
-        r'(\b[\w\.]+)\s+([\w\.]+)(?=\s*,\s*CUIT\b)',
-        flags=re.IGNORECASE
-    )
+    # Equivale a sustituir (\b[\w\.]+)\s+([\w\.]+)(?=\s*,\s*CUIT\b) por las dos
+    # palabras limpias separadas por un espacio, pero en lugar de probar ese patrón
+    # en cada límite de palabra del texto solo se buscan las comas seguidas de
+    # "CUIT" y desde cada una se recorre el texto hacia la izquierda
+    partes = []
+    ultimo = 0
+    for anclaje in _PATRON_COMA_CUIT.finditer(texto):
+        # Segunda palabra: caracteres de palabra o puntos justo antes de la coma
+        # (con espacios opcionales en el medio) y precedida por un espacio
+        fin2 = anclaje.start()
+        while fin2 > ultimo and texto[fin2 - 1].isspace():
+            fin2 -= 1
+        inicio2 = fin2
+        while inicio2 > ultimo and _es_caracter_de_palabra_o_punto(texto[inicio2 - 1]):
+            inicio2 -= 1
+        if inicio2 == fin2 or inicio2 == ultimo or not texto[inicio2 - 1].isspace():
+            continue
+
+        # Primera palabra: la tanda de caracteres de palabra o puntos antes de esos
+        # espacios, desde su primer carácter de palabra (ahí está el \b inicial)
+        fin1 = inicio2 - 1
+        while fin1 > ultimo and texto[fin1 - 1].isspace():
+            fin1 -= 1
+        inicio1 = fin1
+        while inicio1 > ultimo and _es_caracter_de_palabra_o_punto(texto[inicio1 - 1]):
+            inicio1 -= 1
+        while inicio1 < fin1 and texto[inicio1] == '.':
+            inicio1 += 1
+        if inicio1 == fin1:
+            continue
 
-    def _repl(match: re.Match) -> str:
-        w1, w2 = match.group(1), match.group(2)
-        # Solo quitamos puntos que estén entre letras/dígitos
-        w1_clean = re.sub(r'(?<=\w)\.(?=\w)', '', w1)
-        w2_clean = re.sub(r'(?<=\w)\.(?=\w)', '', w2)
-        return f"{w1_clean} {w2_clean}"
+        partes.append(texto[ultimo:inicio1])
+        partes.append(_sin_puntos_entre_alfanumericos(texto[inicio1:fin1]))
+        partes.append(' ')
+        partes.append(_sin_puntos_entre_alfanumericos(texto[inicio2:fin2]))
+        ultimo = fin2
 
-    return patrón.sub(_repl, texto)
+    if not partes:
+        return texto
+    partes.append(texto[ultimo:])
+    return ''.join(partes)
+
+
+def _es_caracter_de_palabra_o_punto(caracter: str) -> bool:
+    r"""Equivalente a [\w\.] de re para un carácter."""
+    return caracter.isalnum() or caracter == '_' or caracter == '.'
+
+
+def _sin_puntos_entre_alfanumericos(palabra: str) -> str:
+    """Quita los puntos que estén entre letras/dígitos (la mayoría de las palabras no tiene)."""
+    if '.' not in palabra:
+        return palabra
+    return _PATRON_PUNTO_ENTRE_ALFANUMERICOS.sub('', palabra)
 
 # Extración de texto de un PDF + normalización avanzada
-def normalizacion_avanzada_pdf(path_pdf: str = None, raw_text: str = None) -> str:
+def normalizacion_avanzada_pdf(path_pdf: Union[str, bytes] = None, raw_text: str = None) -> str:
     """
     Extrae todo el texto de un PDF y luego aplica una normalización enfocada
     en facilitar la detección de DNI y matrículas.
@@ -117,79 +308,67 @@ def normalizacion_avanzada_pdf(path_pdf: str = None, raw_text: str = None) -> st
         texto = raw_text
     elif path_pdf:
         # 1.2) Detectamos si es un .pdf, en ese caso, realizamos la extracción básica de texto del PDF
-        texto = ''
-        with fitz.open(path_pdf) as doc:
-            for pagina in doc:
-                texto += pagina.get_text()
+        texto = ' '.join(extraer_paginas_pdf(path_pdf))
     else:
         raise ValueError("Debe proporcionarse 'path_pdf' o 'raw_text'")
 
-    # 2) Unificar sinónimos (case-insensitive), de forma más genérica
-    # 2.1) Detectar “Documento Nacional de Identidad” → “DNI”
-    texto = re.sub(r'\bDocumento\s+Nacional\s+de\s+Identidad\b', 'DNI', texto, flags=re.IGNORECASE)
-
-    # 2.2) Detectar “Documento Nacional” → “DNI”
-    texto = re.sub(r'\bDocumento\s+Nacional\b', 'DNI', texto, flags=re.IGNORECASE)
+    # Los pasos trabajan sobre el texto completo y no sobre una lista de tokens: varias
+    # reglas cruzan espacios ("Documento Nacional de Identidad", "D N I", "20 - 123",
+    # etiqueta + ruido + número). Las pasadas sin coincidencias no copian el texto
+    # (re.sub devuelve el mismo objeto), así que solo se paga por las que cambian algo.
 
-    # 2.3) Detectar “Documento” solo → “DNI”
-    texto = re.sub(r'\bDocumento\b', 'DNI', texto, flags=re.IGNORECASE)
-
-    # 2.4) Detectar variantes de “D.N.I.”, “DN-I”, “D N I”, etc. → “DNI”
-    texto = re.sub(r'\bD[\W_]*N[\W_]*I\b', 'DNI', texto, flags=re.IGNORECASE)
+    # 2) Unificar sinónimos (case-insensitive), de forma más genérica
+    # 2.1 - 2.4) Detectar “Documento Nacional de Identidad”, “Documento Nacional”,
+    # “Documento” solo y variantes de “D.N.I.”, “DN-I”, “D N I”, etc. → “DNI”
+    texto = _PATRON_VARIANTES_DNI.sub('DNI', texto)
 
     # 2.5) Detectar variantes con puntos, guiones o espacios en C.U.I.T / C.U.I.L / C.U.I.F (con o sin punto final)
-    texto = re.sub(r'\bC[\W_]*U[\W_]*I[\W_]*T[\W_\.]*\b', 'CUIT ', texto, flags=re.IGNORECASE)
-    texto = re.sub(r'\bC[\W_]*U[\W_]*I[\W_]*L[\W_\.]*\b', 'CUIL ', texto, flags=re.IGNORECASE)
-    texto = re.sub(r'\bC[\W_]*U[\W_]*I[\W_]*F[\W_\.]*\b', 'CUIF ', texto, flags=re.IGNORECASE)
-
-    # 2.5.1) Detectar "Clave Bancaria Uniforme" → "CBU"
-    texto = re.sub(r'\bClave\s+Bancaria\s+Uniforme\b', 'CBU', texto, flags=re.IGNORECASE)
+    texto = _PATRON_VARIANTES_CUI.sub(lambda m: f"CUI{m.group(1).upper()} ", texto)
 
-    # 2.5.2) Detectar variantes con puntos, guiones o espacios en C.B.U (con o sin punto final)
-    texto = re.sub(r'\bC[\W_]*B[\W_]*U[\W_\.]*\b', 'CBU ', texto, flags=re.IGNORECASE)
+    # 2.5.1 - 2.5.2) Detectar "Clave Bancaria Uniforme" y variantes con puntos, guiones
+    # o espacios en C.B.U (con o sin punto final) → "CBU "
+    texto = _PATRON_VARIANTES_CBU.sub('CBU ', texto)
 
-    # 2.6) Detectar “Matrícula” con o sin acento → “MATRICULA”
-    texto = re.sub(r'\bMatr[ií]cula\b', 'MATRICULA', texto, flags=re.IGNORECASE)
-
-    # 2.7) Variantes de “M.P.”, “M-P-”, “MP” con puntos/guiones/espacios entre letras → “MATRICULA”
-    texto = re.sub(r'\bM[\W_]*P\b', 'MATRICULA', texto, flags=re.IGNORECASE)
+    # 2.6 - 2.7) Detectar “Matrícula” con o sin acento y variantes de “M.P.”, “M-P-”, “MP”
+    # con puntos/guiones/espacios entre letras → “MATRICULA”
+    texto = _PATRON_VARIANTES_MATRICULA.sub('MATRICULA', texto)
 
     # 2.8) Detecta "DNI-", "MATRICULA-", "MATRICULA.", "CUIT-", "CUIL-", "CUIF-", "CBU-" con o sin espacios o guiones especiales
-    texto = re.sub(r'\b(DNI|MATRICULA|CUIT|CUIL|CUIF|CBU)\s*[-–—\.]\s*', r'\1 ', texto, flags=re.IGNORECASE)
+    texto = _PATRON_ETIQUETA_CON_SEPARADOR.sub(r'\1 ', texto)
 
     # 3) Eliminar 'N°', 'Nº', 'N%', 'N”', 'N*' (y variantes con ., : o espacios antes del número)
-    texto = re.sub(r'\bN[º°%”*]?[.:,\s-]*\s*(?=\d)', '', texto)
-
     # 3.1) Eliminar variantes de 'Número' (con o sin acento, plural o abreviado) solo si preceden a un número
-    texto = re.sub(r'\bN[úu]m(?:ero|eros|\.?)?\s*[-:]?\s*(?=\d)', '', texto, flags=re.IGNORECASE)
+    texto = _PATRON_PREFIJO_NUMERO.sub('', texto)
 
     # 4) Eliminar guiones largos especiales y convertirlos a guiones normales
     # Guiones largos: — (em dash), – (en dash)
-    texto = texto.replace('—', '-').replace('–', '-')
+    texto = texto.translate(_TABLA_GUIONES_LARGOS)
     
     # 5) Quitar separadores entre dígitos (., -, /) incluso con espacios
     # Esto convierte: 20-35123456-7 → 20351234567
-    texto = re.sub(r'(?<=\d)[\.\-/]\s*(?=\d)', '', texto)
     # También eliminar separadores justo después de dígitos (guiones/puntos/barras finales)
-    texto = re.sub(r'(?<=\d)[\.\-/]+(?=\s|[^\d\w]|$)', '', texto)
+    texto = _PATRON_SEPARADOR_EN_NUMERO.sub('', texto)
     
     # 6) Normalizar paréntesis y caracteres especiales alrededor de números
     # Eliminar paréntesis/comillas/corchetes que encierran números
-    texto = re.sub(r'(["\(\[\{])\s*(\d+)\s*(["\)\]\}])', r' \2 ', texto)
+    texto = _PATRON_NUMERO_ENCERRADO.sub(r' \2 ', texto)
     # Limpiar caracteres especiales sueltos al inicio/final de números
-    texto = re.sub(r'(["\(\[\{])\s*(\d)', r' \2', texto)  # Eliminar apertura antes de dígito
-    texto = re.sub(r'(\d)\s*(["\)\]\}])', r'\1 ', texto)  # Eliminar cierre después de dígito
+    texto = _PATRON_APERTURA_ANTES_DE_DIGITO.sub(r' \2', texto)  # Eliminar apertura antes de dígito
+    texto = _PATRON_CIERRE_TRAS_DIGITO.sub(r'\1 ', texto)  # Eliminar cierre después de dígito
 
     # 7) Eliminar puntos entre letras (Ej, S.R.L. -> SRL.)
     texto = eliminar_puntos_antes_de_cuit(texto)
 
     # 8) Asegurar siempre un espacio entre etiqueta y número
-    texto = re.sub(r'\b(DNI|MATRICULA|CBU)[^\w]*(\d+)\b', r'\1 \2', texto, flags=re.IGNORECASE)
+    texto = _PATRON_ETIQUETA_PEGADA_A_NUMERO.sub(r'\1 \2', texto)
     
     # 9) Eliminar ruido entre etiquetas y sus números. Cubre casos como: CUIT NS 20321777636 → CUIT 20321777636
-    texto = re.sub(r'\b(DNI|MATRICULA|CUIT|CUIL|CUIF|CBU)\b[^\d\n]{0,10}?(?:\d+[a-z]{1,3}\.?|[a-z]{1,5}\.?)?\s*(?=\d{4,})', r'\1 ', texto, flags=re.IGNORECASE)
+    # No se une con el paso 8 en un solo patrón: cuando una etiqueta va seguida de otra
+    # ("DNI: MATRICULA-123456") este paso ve el texto que dejó el paso 8 y el resultado
+    # cambia si ambas reglas se aplican en la misma pasada.
+    texto = _PATRON_RUIDO_ETIQUETA_NUMERO.sub(r'\1 ', texto)
 
     # 10) Colapsar cualquier whitespace a un solo espacio y recortar
-    texto = re.sub(r'\s+', ' ', texto).strip()
+    texto = _PATRON_ESPACIOS.sub(' ', texto).strip()
 
     return texto
\ No newline at end of file
@@ -3,15 +3,19 @@ Router de FastAPI que expone el endpoint POST /upload_files para recibir un arch
 (.json o .txt) y un PDF, guarda ambos en ficheros temporales, invoca la función de comparación
 devuelve los resultados estructurados en JSON.
 """
+import asyncio
 from fastapi import APIRouter, UploadFile, File, HTTPException, Body
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, constr
 
 from service.pdf_file_handler import procesar_pdf_y_comparar
 from funcs.detectar_personas_pdf import detectar_personas_dni_matricula
 
 #---------------------------------------------------------- Router
-router = APIRouter(tags=["Analizador PDF — Detección de personas y comparación de datos"])
+router = APIRouter(
+    tags=["Analizador PDF — Detección de personas y comparación de datos"],
+    default_response_class=ORJSONResponse,
+)
 
 # ---------------------------------------------------------- Post - Cargar un archivo JSON y un PDF para realizar la comparación de valores
 @router.post("/upload_files", summary=("Extrae personas de PDF o TXT y compara con datos opcionales"))
@@ -56,12 +60,13 @@ async def compare(
         )
 
     result = await procesar_pdf_y_comparar(pdf_file_main, data_file, txt_file_main)
-    return JSONResponse(result)
+    return ORJSONResponse(result)
 
 # ---------------------------------------------------------- Post - Detectar Nombre+Dni o Nombre+Matrícula 
 # Modelo para la entrada del endpoint /detect_phrase
 class TextPayload(BaseModel):
-    text: str = Field(..., description="Frase o párrafo a analizar")
+    # Recorte de espacios y texto no vacío validados por Pydantic (sin chequeos a mano en el endpoint)
+    text: constr(strip_whitespace=True, min_length=1) = Field(..., description="Frase o párrafo a analizar")
 
 @router.post("/detect_phrase", summary="Extrae nombres e identificadores desde texto")
 async def detect_personas(
@@ -75,8 +80,9 @@ async def detect_personas(
     """
     text = payload.text
     try:
-        resultado = detectar_personas_dni_matricula(raw_text=text)
+        # Detección sincrónica (regex sobre todo el texto): en un hilo para no bloquear el event loop
+        resultado = await asyncio.to_thread(detectar_personas_dni_matricula, raw_text=text)
     except ValueError as e:
         raise HTTPException(400, str(e))
 
-    return JSONResponse({"detected": resultado})
\ No newline at end of file
+    return ORJSONResponse({"detected": resultado})
\ No newline at end of file
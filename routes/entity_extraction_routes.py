@@ -3,7 +3,7 @@ Router de FastAPI para extracción de entidades específicas de documentos PDF.
 Permite al usuario seleccionar qué entidades desea extraer (nombres, DNI, matrícula, CUIF, CUIT, CUIL).
 """
 from fastapi import APIRouter, UploadFile, File, Body
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
 
 from service.entity_extraction_service import (
@@ -12,7 +12,7 @@ from service.entity_extraction_service import (
 )
 
 #---------------------------------------------------------- Router
-router = APIRouter(tags=["Extractor de Entidades Específicas"])
+router = APIRouter(tags=["Extractor de Entidades Específicas"], default_response_class=ORJSONResponse)
 
 # ---------------------------------------------------------- Post
 @router.post("/extract_entities_from_pdf", summary="Extrae entidades específicas de un PDF",
@@ -51,7 +51,7 @@ async def extract_entities_from_pdf(
             - "cbu": Clave Bancaria Uniforme
     """
     response = await procesar_extraccion_desde_pdf(pdf_file, entities)
-    return JSONResponse(content=response, status_code=200)
+    return ORJSONResponse(content=response, status_code=200)
 
 
 # ---------------------------------------------------------- Post
@@ -93,4 +93,4 @@ async def extract_entities_from_text(
             - "cbu": Clave Bancaria Uniforme
     """
     response = await procesar_extraccion_desde_texto(text_file, raw_text, entities)
-    return JSONResponse(content=response, status_code=200)
+    return ORJSONResponse(content=response, status_code=200)
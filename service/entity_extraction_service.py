@@ -2,9 +2,10 @@
 Servicio para extraer entidades específicas de diferentes fuentes (PDF, texto, archivos).
 Centraliza la lógica de negocio para mantener los endpoints limpios.
 """
-import tempfile
-import os
+import asyncio
 import json
+import re
+import orjson
 from typing import List, Dict, Optional, Tuple
 from fastapi import UploadFile, HTTPException
 
@@ -13,10 +14,14 @@ from service.pdf_file_handler import detectar_pdf_escaneado
 from service.entity_parser import parse_entities_input
 from funcs.nlp_extractors.extraer_entidades_especificas_spacy import (
     extraer_entidades_especificas,
+    obtener_texto_normalizado,
     validar_entidades_solicitadas
 )
 from funcs.detectar_identificadores_huerfanos import validar_cuil_cuit_en_texto
-from funcs.normalizacion.normalizar_y_extraer_texto_pdf import normalizacion_avanzada_pdf
+
+# Secuencia de 19+ dígitos: un entero así puede no entrar en 64 bits, y orjson lo
+# convertiría a float (un CBU de 22 dígitos perdería precisión)
+_PATRON_ENTERO_LARGO = re.compile(rb'\d{19,}')
 
 
 async def procesar_extraccion_desde_pdf(
@@ -48,33 +53,17 @@ async def procesar_extraccion_desde_pdf(
     if not es_valido:
         raise HTTPException(status_code=400, detail=mensaje_error)
     
-    tmp_pdf = None
-    
     try:
-        # Validar archivo PDF con todas las capas de seguridad
+        # Validar archivo PDF con todas las capas de seguridad (PyMuPDF lo abre
+        # directamente desde estos bytes, sin archivo temporal)
         pdf_content = await validar_archivo_completo(pdf_file, 'pdf')
         
-        # Guardar temporalmente
-        tmp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-        tmp_pdf.write(pdf_content)
-        tmp_pdf.close()
-        
-        # Verificar que no esté escaneado
-        detectar_pdf_escaneado(tmp_pdf.name)
-
-        # Extraer entidades solicitadas
-        resultado = extraer_entidades_especificas(
-            entidades_solicitadas=entities,
-            path_pdf=tmp_pdf.name
+        # Verificar que no esté escaneado, extraer entidades y validar identificadores:
+        # trabajo de CPU sincrónico, se corre en un hilo para no bloquear el event loop
+        resultado, identificadores_invalidos = await asyncio.to_thread(
+            _extraer_y_validar, entities, path_pdf=pdf_content
         )
         
-        # Validar identificadores inválidos si se solicitan CUIL o CUIT
-        identificadores_invalidos = None
-        if 'cuil' in entities or 'cuit' in entities:
-            # Obtener texto normalizado para búsqueda de inválidos
-            texto_normalizado = normalizacion_avanzada_pdf(path_pdf=tmp_pdf.name)
-            identificadores_invalidos = validar_cuil_cuit_en_texto(texto_normalizado)
-        
         # Construir respuesta estructurada
         return _construir_respuesta(
             fuente=pdf_file.filename,
@@ -92,13 +81,6 @@ async def procesar_extraccion_desde_pdf(
             status_code=500,
             detail=f"Error al procesar el PDF: {str(e)}"
         )
-    finally:
-        # Limpieza de archivo temporal
-        if tmp_pdf and os.path.exists(tmp_pdf.name):
-            try:
-                os.unlink(tmp_pdf.name)
-            except Exception:
-                pass
 
 
 async def procesar_extraccion_desde_texto(
@@ -152,20 +134,11 @@ async def procesar_extraccion_desde_texto(
                 detail="El texto proporcionado está vacío"
             )
         
-        # Extraer entidades
-        resultado = extraer_entidades_especificas(
-            entidades_solicitadas=entities,
-            path_pdf=None,
-            raw_text=texto_a_analizar
+        # Extraer entidades y validar identificadores (en un hilo, ver procesar_extraccion_desde_pdf)
+        resultado, identificadores_invalidos = await asyncio.to_thread(
+            _extraer_y_validar, entities, raw_text=texto_a_analizar
         )
         
-        # Validar identificadores inválidos si se solicitan CUIL o CUIT
-        identificadores_invalidos = None
-        if 'cuil' in entities or 'cuit' in entities:
-            # Obtener texto normalizado para búsqueda de inválidos
-            texto_normalizado = normalizacion_avanzada_pdf(raw_text=texto_a_analizar)
-            identificadores_invalidos = validar_cuil_cuit_en_texto(texto_normalizado)
-        
         # Construir respuesta estructurada
         return _construir_respuesta(
             fuente=nombre_fuente,
@@ -185,6 +158,42 @@ async def procesar_extraccion_desde_texto(
         )
 
 
+def _extraer_y_validar(
+    entities: List[str],
+    path_pdf: Optional[bytes] = None,
+    raw_text: Optional[str] = None
+) -> Tuple[Dict, Optional[Dict]]:
+    """
+    Parte sincrónica de la extracción: se ejecuta fuera del event loop.
+    
+    Si se pasa path_pdf (contenido del PDF en bytes), primero verifica que el PDF no esté escaneado. Luego extrae
+    las entidades solicitadas y, si se pidieron CUIL o CUIT, busca los identificadores
+    con dígito verificador inválido en el texto normalizado.
+    
+    Returns:
+        Tupla (resultado_extraccion, identificadores_invalidos_o_None)
+    """
+    if path_pdf:
+        detectar_pdf_escaneado(path_pdf)
+
+    # Extraer entidades solicitadas
+    resultado = extraer_entidades_especificas(
+        entidades_solicitadas=entities,
+        path_pdf=path_pdf,
+        raw_text=raw_text
+    )
+    
+    # Validar identificadores inválidos si se solicitan CUIL o CUIT
+    identificadores_invalidos = None
+    if 'cuil' in entities or 'cuit' in entities:
+        # Texto normalizado para búsqueda de inválidos: el mismo que ya usó la
+        # extracción, recuperado de su cache (no se vuelve a normalizar)
+        texto_normalizado = obtener_texto_normalizado(path_pdf=path_pdf, raw_text=raw_text)
+        identificadores_invalidos = validar_cuil_cuit_en_texto(texto_normalizado)
+    
+    return resultado, identificadores_invalidos
+
+
 async def _extraer_texto_de_fuente(
     text_file: Optional[UploadFile],
     raw_text: Optional[str]
@@ -215,20 +224,12 @@ async def _extraer_texto_de_fuente(
         # Validar archivo con todas las capas de seguridad
         content = await validar_archivo_completo(text_file, extension)
         
-        # Extraer texto según el tipo de archivo
-        texto_a_analizar = content.decode('utf-8')
-        
-        # Si es JSON, extraer todo el contenido como texto
+        # Extraer texto según el tipo de archivo: si es JSON, todo el contenido
+        # como texto (ver _json_a_texto). Recorren el archivo entero: en un hilo
         if extension == 'json':
-            try:
-                data = json.loads(texto_a_analizar)
-                # Convertir el JSON completo a string para análisis
-                texto_a_analizar = json.dumps(data, ensure_ascii=False, indent=2)
-            except json.JSONDecodeError:
-                raise HTTPException(
-                    status_code=400,
-                    detail="El archivo JSON no es válido"
-                )
+            texto_a_analizar = await asyncio.to_thread(_json_a_texto, content)
+        else:
+            texto_a_analizar = await asyncio.to_thread(content.decode, 'utf-8')
         
         return texto_a_analizar, text_file.filename
     
@@ -237,6 +238,38 @@ async def _extraer_texto_de_fuente(
         return raw_text.strip(), "texto_directo"
 
 
+def _json_a_texto(content: bytes) -> str:
+    """
+    Convierte un archivo JSON a texto para el análisis.
+    
+    No alcanza con pasar el archivo tal cual: la re-serialización decodifica los
+    escapes (\\u00e9 -> é) que el NER no reconocería dentro de un nombre. Se hace
+    con orjson (en C, directo sobre los bytes), que produce el mismo texto que
+    json.dumps(ensure_ascii=False, indent=2) salvo el exponente de floats en
+    notación científica (1e16 en vez de 1e+16). Si hay enteros largos (ver
+    _PATRON_ENTERO_LARGO) o orjson rechaza algo que json acepta (NaN), se usa json.
+    
+    Raises:
+        HTTPException: Si el JSON no es válido
+    """
+    if not _PATRON_ENTERO_LARGO.search(content):
+        try:
+            data = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+        else:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    
+    try:
+        data = json.loads(content.decode('utf-8'))
+    except json.JSONDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail="El archivo JSON no es válido"
+        )
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
 def _construir_respuesta(
     fuente: str,
     entities: List[str],
@@ -266,10 +299,8 @@ def _construir_respuesta(
         response['identificadores_invalidos'] = identificadores_invalidos
     
     # Resumen: contar solo listas de entidades
-    resumen = {}
-    for tipo, items in resultado.items():
-        if isinstance(items, list):
-            resumen[tipo] = len(items)
-    response['resumen'] = resumen
+    response['resumen'] = {
+        tipo: len(items) for tipo, items in resultado.items() if isinstance(items, list)
+    }
     
     return response
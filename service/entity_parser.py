@@ -3,7 +3,14 @@ Módulo para parsear y normalizar la entrada de entidades desde diferentes forma
 Soporta múltiples formatos de entrada desde Postman (form-data, JSON, CSV).
 """
 import json
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Los clientes repiten casi siempre las mismas entradas (p. ej. ["nombre", "dni"]):
+# se memoiza el resultado. Solo se cachean entradas de texto cortas, para que un
+# valor arbitrario enviado por el cliente no quede retenido en memoria
+_MAX_ENTRADAS_CACHEADAS = 256
+_MAX_LARGO_CACHEABLE = 256
 
 
 def parse_entities_input(entities_input: Optional[List[str]]) -> List[str]:
@@ -24,12 +31,34 @@ def parse_entities_input(entities_input: Optional[List[str]]) -> List[str]:
         >>> parse_entities_input(["dni", "nombre"])
         ['dni', 'nombre']
     """
+    if isinstance(entities_input, str):
+        clave, es_str = (entities_input,), True
+    elif isinstance(entities_input, list) and all(isinstance(e, str) for e in entities_input):
+        clave, es_str = tuple(entities_input), False
+    else:
+        return _parse_entities(entities_input)
+    
+    if sum(map(len, clave)) > _MAX_LARGO_CACHEABLE:
+        return _parse_entities(entities_input)
+    # Copia: quien llama puede modificar la lista sin alterar el cache
+    return list(_parse_entities_cacheado(clave, es_str))
+
+
+@lru_cache(maxsize=_MAX_ENTRADAS_CACHEADAS)
+def _parse_entities_cacheado(clave: Tuple[str, ...], es_str: bool) -> Tuple[str, ...]:
+    """parse_entities_input() memoizado por la entrada convertida a tupla."""
+    return tuple(_parse_entities(clave[0] if es_str else list(clave)))
+
+
+def _parse_entities(entities_input) -> List[str]:
+    """Implementación de parse_entities_input() (sin cache)."""
     if entities_input is None:
         return []
     
-    # Si ya es lista con varios elementos normales
+    # Si ya es lista con varios elementos normales (cada elemento se recorta una sola vez)
     if isinstance(entities_input, list) and len(entities_input) > 1:
-        return [e.strip().lower() for e in entities_input if isinstance(e, str) and e.strip()]
+        recortados = (e.strip() for e in entities_input if isinstance(e, str))
+        return [e.lower() for e in recortados if e]
 
     # Si es lista con un único elemento, o un string único
     single = None
@@ -48,15 +77,14 @@ def parse_entities_input(entities_input: Optional[List[str]]) -> List[str]:
         try:
             parsed = json.loads(raw)
             if isinstance(parsed, list):
-                return [str(x).strip().lower() for x in parsed if str(x).strip()]
+                return [e.lower() for e in map(str.strip, map(str, parsed)) if e]
         except Exception:
             # Si falla, seguir intentando otros formatos
             pass
 
     # Si viene separado por comas
     if "," in raw:
-        parts = [p.strip().strip('"').strip("'") for p in raw.split(",") if p.strip()]
-        return [p.lower() for p in parts]
+        return [p.strip('"').strip("'").lower() for p in map(str.strip, raw.split(",")) if p]
 
     # Valor único
     return [raw.lower()] if raw else []
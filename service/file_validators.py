@@ -6,10 +6,31 @@ Utiliza la librería 'filetype' para detectar el tipo real del archivo.
 """
 import os
 import json
+import codecs
+import asyncio
+import hashlib
+import threading
+import orjson
 import filetype
+from collections import OrderedDict
+from typing import Optional
 from fastapi import UploadFile, HTTPException
 
 
+# Bytes de cabecera que mira la detección del tipo real (capa 3): los mismos que
+# usa filetype internamente (8 KB), así que la detección no cambia
+_BYTES_CABECERA = 8192
+
+# Tamaño de los bloques con los que _is_valid_text valida UTF-8
+_TAMANO_BLOQUE_UTF8 = 1 << 16
+
+# MIME detectado por filetype (o None) según el hash de la cabecera. filetype solo
+# mira la cabecera, así que el resultado depende únicamente de ella: un archivo
+# que se vuelve a subir (reintentos, pruebas) no recorre otra vez sus detectores
+_MAX_CABECERAS_CACHEADAS = 1024
+_cache_mime_por_cabecera: "OrderedDict[bytes, Optional[str]]" = OrderedDict()
+_lock_cache_mime = threading.Lock()
+
 # MIME types permitidos para cada tipo de archivo
 ALLOWED_MIME_TYPES = {
     'pdf': {
@@ -29,19 +50,74 @@ ALLOWED_MIME_TYPES = {
     }
 }
 
+# Extensiones permitidas (de ALLOWED_MIME_TYPES), calculadas una sola vez: en orden
+# para el mensaje de error y como frozenset para la búsqueda
+_EXTENSIONES_PERMITIDAS = tuple(
+    ext for file_type in ALLOWED_MIME_TYPES.values() for ext in file_type['extensions']
+)
+_CONJUNTO_EXTENSIONES_PERMITIDAS = frozenset(_EXTENSIONES_PERMITIDAS)
+
 
 def _is_valid_text(content: bytes) -> bool:
     """
     Verifica si el contenido es texto plano válido (UTF-8).
     
+    Solo interesa si decodifica, no el texto: en lugar de crear un str del tamaño
+    del archivo se decodifica por bloques (con un decodificador incremental, que
+    tolera un carácter partido entre bloques) y se descarta cada resultado. Un
+    contenido ASCII es UTF-8 válido sin decodificar nada.
+    
     Args:
         content: Contenido del archivo en bytes
         
     Returns:
         True si es texto válido, False en caso contrario
     """
+    if content.isascii():
+        return True
+    
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    vista = memoryview(content)
+    try:
+        for inicio in range(0, len(vista), _TAMANO_BLOQUE_UTF8):
+            decodificador.decode(vista[inicio:inicio + _TAMANO_BLOQUE_UTF8])
+        decodificador.decode(b'', final=True)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _detectar_mime_cabecera(cabecera: bytes) -> Optional[str]:
+    """
+    filetype.guess(cabecera).mime (None si no reconoce el tipo), cacheado por el
+    hash de la cabecera (ver _cache_mime_por_cabecera).
+    """
+    clave = hashlib.blake2b(cabecera, digest_size=16).digest()
+    with _lock_cache_mime:
+        if clave in _cache_mime_por_cabecera:
+            _cache_mime_por_cabecera.move_to_end(clave)
+            return _cache_mime_por_cabecera[clave]
+    
+    kind = filetype.guess(cabecera)
+    mime = kind.mime if kind is not None else None
+    
+    with _lock_cache_mime:
+        _cache_mime_por_cabecera[clave] = mime
+        while len(_cache_mime_por_cabecera) > _MAX_CABECERAS_CACHEADAS:
+            _cache_mime_por_cabecera.popitem(last=False)
+    return mime
+
+
+def _es_cabecera_de_texto(cabecera: bytes) -> bool:
+    """
+    Verifica si la cabecera del archivo es el comienzo de un texto UTF-8 válido.
+    
+    El decodificador incremental (final=False) acepta un carácter multibyte
+    cortado al final de la cabecera. La validez del archivo completo la
+    verifican las capas 4 (TXT) y 5 (JSON).
+    """
     try:
-        content.decode('utf-8')
+        codecs.getincrementaldecoder('utf-8')().decode(cabecera, final=False)
         return True
     except UnicodeDecodeError:
         return False
@@ -62,15 +138,10 @@ def validar_extension(filename: str) -> str:
     """
     ext = os.path.splitext(filename)[1].lower()
     
-    # Obtener todas las extensiones permitidas
-    allowed_extensions = []
-    for file_type in ALLOWED_MIME_TYPES.values():
-        allowed_extensions.extend(file_type['extensions'])
-    
-    if ext not in allowed_extensions:
+    if ext not in _CONJUNTO_EXTENSIONES_PERMITIDAS:
         raise HTTPException(
             status_code=400,
-            detail=f"Extensión '{ext}' no permitida. Solo se aceptan: {', '.join(allowed_extensions)}"
+            detail=f"Extensión '{ext}' no permitida. Solo se aceptan: {', '.join(_EXTENSIONES_PERMITIDAS)}"
         )
     
     return ext
@@ -126,13 +197,23 @@ def validar_mime_real(content: bytes, filename: str, expected_type: str) -> str:
             detail=f"Tipo de archivo '{expected_type}' no configurado en el sistema"
         )
     
+    # El tipo se detecta por la cabecera: no hace falta recorrer (ni decodificar)
+    # el archivo entero
+    cabecera = content[:_BYTES_CABECERA]
+    
+    # Un PDF se reconoce por su firma: es la misma comprobación que hace filetype,
+    # sin recorrer el resto de sus detectores. Si no la tiene, filetype informa
+    # qué tipo de archivo es en realidad
+    if expected_type == 'pdf' and cabecera.startswith(ALLOWED_MIME_TYPES['pdf']['magic_bytes']):
+        return 'application/pdf'
+    
     try:
         # Detectar tipo real del archivo con filetype
-        kind = filetype.guess(content)
+        detected_mime = _detectar_mime_cabecera(cabecera)
         
-        if kind is None:
+        if detected_mime is None:
             # Si filetype no puede detectar, asumir texto plano si es decodificable
-            if expected_type in ['json', 'txt'] and _is_valid_text(content):
+            if expected_type in ['json', 'txt'] and _es_cabecera_de_texto(cabecera):
                 detected_mime = 'text/plain'
             else:
                 raise HTTPException(
@@ -140,8 +221,6 @@ def validar_mime_real(content: bytes, filename: str, expected_type: str) -> str:
                     detail=f"No se pudo detectar el tipo del archivo '{filename}'. "
                            f"Posible archivo corrupto o no reconocido."
                 )
-        else:
-            detected_mime = kind.mime
     except HTTPException:
         raise
     except Exception as e:
@@ -229,6 +308,15 @@ def _validar_contenido_json(content: bytes, filename: str) -> None:
     Raises:
         HTTPException: Si el contenido no es JSON válido
     """
+    # orjson parsea directo sobre los bytes (valida UTF-8 en el mismo paso). Solo
+    # si lo rechaza se repite con json, que decide igual que antes (acepta NaN y
+    # surrogates sueltos, que orjson no) y da el mensaje de error habitual
+    try:
+        orjson.loads(content)
+        return
+    except orjson.JSONDecodeError:
+        pass
+    
     try:
         # Intentar parsear como JSON
         json.loads(content.decode('utf-8'))
@@ -292,14 +380,26 @@ async def validar_archivo_completo(
             detail=f"El archivo '{file.filename}' está vacío"
         )
     
+    # Capas 3 a 5: recorren el contenido (para TXT/JSON, decodificarlo y parsearlo
+    # entero), así que se corren en un hilo para no bloquear el event loop
+    await asyncio.to_thread(_validar_contenido, content, file.filename, expected_type)
+    
+    return content
+
+
+def _validar_contenido(content: bytes, filename: str, expected_type: str) -> None:
+    """
+    Capas 3 a 5 de validar_archivo_completo (sincrónicas, sobre el contenido ya leído).
+    
+    Raises:
+        HTTPException: Si alguna validación falla
+    """
     # Capa 3: Validar MIME real mediante análisis de contenido (filetype)
-    validar_mime_real(content, file.filename, expected_type)
+    validar_mime_real(content, filename, expected_type)
     
     # Capa 4: Validar magic bytes
-    validar_magic_bytes(content, file.filename, expected_type)
+    validar_magic_bytes(content, filename, expected_type)
     
     # Capa 5: Validar contenido (específico para JSON)
     if expected_type == 'json':
-        _validar_contenido_json(content, file.filename)
-    
-    return content
+        _validar_contenido_json(content, filename)
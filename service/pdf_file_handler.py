@@ -2,31 +2,31 @@
 Módulo de Servicio para el manejo y validación de archivos PDF y datos.
 Contiene funciones para:
 - Validar archivos PDF
-- Guardar archivos temporales
+- Leer los archivos subidos en memoria (sin archivos temporales)
 - Detectar si un PDF está escaneado
 - Procesar la lógica completa de comparación y extracción
 """
 import os
-import tempfile
-import fitz  # PyMuPDF
-from typing import Tuple, Optional, Dict, Any
+import asyncio
+from typing import Tuple, Optional, Dict, Any, Union
 from fastapi import UploadFile, HTTPException
 
 from funcs.comparar_json_pdf import comparar_valores_json_pdf
+from funcs.extraer_datos_json import cargar_valores_desde_bytes
 from funcs.detectar_personas_pdf import detectar_personas_dni_matricula
 from funcs.detectar_identificadores_huerfanos import extraer_identificadores_huerfanos
-from funcs.normalizacion.normalizar_y_extraer_texto_pdf import normalizacion_avanzada_pdf
+from funcs.normalizacion.normalizar_y_extraer_texto_pdf import extraer_paginas_pdf, normalizacion_avanzada_pdf
 from service.file_validators import validar_archivo_completo
 
 
-def detectar_pdf_escaneado(path_pdf: str, umbral_texto: int = 100) -> bool:
+def detectar_pdf_escaneado(path_pdf: Union[str, bytes], umbral_texto: int = 100) -> bool:
     """
     Detecta si un PDF está compuesto principalmente por imágenes escaneadas (sin texto embebido).
     - Abre el PDF con PyMuPDF y cuenta la cantidad de caracteres de texto embebido.
     - Si la cantidad total es menor al umbral, se considera escaneado.
     
     Args:
-        path_pdf: Ruta al archivo PDF
+        path_pdf: Ruta al archivo PDF o su contenido en bytes
         umbral_texto: Número mínimo de caracteres para considerar que tiene texto embebido
         
     Returns:
@@ -36,13 +36,14 @@ def detectar_pdf_escaneado(path_pdf: str, umbral_texto: int = 100) -> bool:
         HTTPException: Si no se puede analizar el PDF o si está escaneado
     """
     try:
-        with fitz.open(path_pdf) as doc:
-            total_chars = sum(len(page.get_text("text") or "") for page in doc)
+        # Mismo texto (cacheado) que usan después la comparación y la detección de personas
+        total_chars = sum(map(len, extraer_paginas_pdf(path_pdf)))
 
         if total_chars < umbral_texto:
+            nombre_pdf = f" '{os.path.basename(path_pdf)}'" if isinstance(path_pdf, str) else ""
             raise HTTPException(
                 status_code=400,
-                detail=f"El PDF '{os.path.basename(path_pdf)}' parece estar ESCANEADO (sin texto embebido). "
+                detail=f"El PDF{nombre_pdf} parece estar ESCANEADO (sin texto embebido). "
                        f"No se puede procesar este tipo de documentos. Por favor, proporcione un PDF con texto extraíble."
             )
         
@@ -57,68 +58,46 @@ def detectar_pdf_escaneado(path_pdf: str, umbral_texto: int = 100) -> bool:
         )
 
 
-async def guardar_archivos_temporales(
+async def leer_archivos_subidos(
     pdf_file_main: Optional[UploadFile] = None,
     data_file: Optional[UploadFile] = None,
     txt_file_main: Optional[UploadFile] = None
-) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+) -> Tuple[Optional[bytes], Optional[bytes], Optional[bytes]]:
     """
-    Guarda los archivos subidos en ubicaciones temporales después de validarlos.
+    Valida y lee los archivos subidos, sin escribirlos a disco.
     Aplica validación completa en múltiples capas (extensión, MIME cliente, MIME real, magic bytes).
     
+    La validación ya lee cada archivo completo, así que se devuelve ese contenido: PyMuPDF
+    abre el PDF directamente desde sus bytes (ver abrir_pdf), y el TXT principal y el
+    archivo de datos se decodifican/cargan desde sus bytes al procesar (fuera del event loop).
+    
     Args:
         pdf_file_main: Archivo PDF principal (opcional, mutuamente excluyente con txt_file_main)
         data_file: Archivo de datos opcional (.json o .txt)
         txt_file_main: Archivo TXT principal (opcional, mutuamente excluyente con pdf_file_main)
         
     Returns:
-        Tupla con (ruta_pdf_temporal_o_None, ruta_data_temporal_o_None, ruta_txt_temporal_o_None)
+        Tupla con (contenido_pdf_o_None, contenido_data_o_None, contenido_txt_o_None)
         
     Raises:
-        HTTPException: Si hay errores al guardar los archivos o las validaciones fallan
+        HTTPException: Si las validaciones fallan o hay errores al leer los archivos
     """
-    tmp_data_name = None
-    tmp_pdf_name = None
-    tmp_txt_name = None
+    pdf_content = None
+    data_content = None
+    txt_content = None
     
     try:
-        # Guardar PDF si se proporcionó
+        # Validar y leer PDF con todas las capas de seguridad (queda en memoria).
+        # No se copia a disco por bloques (shutil.copyfileobj): el PDF se procesa
+        # desde estos mismos bytes, así que hay una sola copia en RAM y ninguna escritura.
         if pdf_file_main is not None:
-            tmp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-            try:
-                # Validar y leer PDF con todas las capas de seguridad
-                pdf_content = await validar_archivo_completo(pdf_file_main, 'pdf')
-                
-                # Guardar PDF
-                tmp_pdf.write(pdf_content)
-                tmp_pdf.close()
-                tmp_pdf_name = tmp_pdf.name
-            except Exception as e:
-                try:
-                    os.unlink(tmp_pdf.name)
-                except:
-                    pass
-                raise
+            pdf_content = await validar_archivo_completo(pdf_file_main, 'pdf')
 
-        # Guardar TXT si se proporcionó
+        # Validar y leer TXT con todas las capas de seguridad (queda en memoria)
         if txt_file_main is not None:
-            tmp_txt = tempfile.NamedTemporaryFile(delete=False, suffix=".txt")
-            try:
-                # Validar y leer TXT con todas las capas de seguridad
-                txt_content = await validar_archivo_completo(txt_file_main, 'txt')
-                
-                # Guardar TXT
-                tmp_txt.write(txt_content)
-                tmp_txt.close()
-                tmp_txt_name = tmp_txt.name
-            except Exception as e:
-                try:
-                    os.unlink(tmp_txt.name)
-                except:
-                    pass
-                raise
+            txt_content = await validar_archivo_completo(txt_file_main, 'txt')
 
-        # Si se proporcionó data_file, validar y guardarlo
+        # Si se proporcionó data_file, validarlo y leerlo
         if data_file is not None:
             ext_data = os.path.splitext(data_file.filename)[1].lower()
             
@@ -135,92 +114,79 @@ async def guardar_archivos_temporales(
             
             # Validar y leer archivo de datos con todas las capas de seguridad
             data_content = await validar_archivo_completo(data_file, expected_type)
-
-            tmp_data = tempfile.NamedTemporaryFile(delete=False, suffix=ext_data)
-            try:
-                tmp_data.write(data_content)
-                tmp_data.close()
-                tmp_data_name = tmp_data.name
-            except Exception as e:
-                # Limpiar archivo temporal si falla
-                try:
-                    os.unlink(tmp_data.name)
-                except:
-                    pass
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Error al guardar el archivo de datos: {str(e)}"
-                )
         
-        return tmp_pdf_name, tmp_data_name, tmp_txt_name
+        return pdf_content, data_content, txt_content
         
     except HTTPException:
-        # Limpiar archivos temporales si hay error
-        if tmp_pdf_name:
-            try:
-                os.unlink(tmp_pdf_name)
-            except:
-                pass
-        if tmp_txt_name:
-            try:
-                os.unlink(tmp_txt_name)
-            except:
-                pass
-        if tmp_data_name:
-            try:
-                os.unlink(tmp_data_name)
-            except:
-                pass
         raise
     except Exception as e:
-        # Limpiar archivos temporales si hay error inesperado
-        if tmp_pdf_name:
-            try:
-                os.unlink(tmp_pdf_name)
-            except:
-                pass
-        if tmp_txt_name:
-            try:
-                os.unlink(tmp_txt_name)
-            except:
-                pass
-        if tmp_data_name:
-            try:
-                os.unlink(tmp_data_name)
-            except:
-                pass
         raise HTTPException(
             status_code=500,
-            detail=f"Error al guardar archivos: {str(e)}"
+            detail=f"Error al leer archivos: {str(e)}"
         )
 
 
-def limpiar_archivos_temporales(tmp_pdf_path: Optional[str] = None, tmp_data_path: Optional[str] = None, tmp_txt_path: Optional[str] = None) -> None:
+def _decodificar_txt(contenido: bytes) -> str:
     """
-    Elimina los archivos temporales creados.
-    
-    Args:
-        tmp_pdf_path: Ruta al archivo PDF temporal (opcional)
-        tmp_data_path: Ruta al archivo de datos temporal (opcional)
-        tmp_txt_path: Ruta al archivo TXT temporal (opcional)
+    Decodifica un TXT subido igual que open(..., 'r', encoding='utf-8'): los saltos
+    de línea \r\n y \r quedan como \n.
     """
-    if tmp_data_path:
-        try:
-            os.unlink(tmp_data_path)
-        except:
-            pass
+    return contenido.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _procesar_archivos_subidos(
+    pdf_content: Optional[bytes],
+    data_content: Optional[bytes],
+    txt_content: Optional[bytes]
+) -> Dict[str, Any]:
+    """
+    Parte sincrónica de procesar_pdf_y_comparar (pasos 2 a 5), sobre los archivos
+    ya validados y leídos en memoria. Se ejecuta fuera del event loop, incluida la
+    decodificación del TXT (recorre el archivo entero).
+    """
+    # El TXT ya pasó la validación de UTF-8 (capa 4)
+    txt_texto = _decodificar_txt(txt_content) if txt_content is not None else None
+    
+    # 2. Si es PDF, verificar que no esté escaneado
+    if pdf_content:
+        detectar_pdf_escaneado(pdf_content)
+    
+    # 3. Ejecutar comparación solo si se cargó data_file (sus datos se cargan una sola vez, desde memoria)
+    if data_content:
+        datos = cargar_valores_desde_bytes(data_content)
+        # Usar el origen apropiado (PDF o TXT)
+        if pdf_content:
+            result = comparar_valores_json_pdf(datos, pdf_content)
+        else:
+            result = comparar_valores_json_pdf(datos, texto_fuente=txt_texto)
+        result.setdefault("comparison_performed", True)
+    else:
+        result = {
+            "comparison_performed": False,
+            "comparison_result": None
+        }
+    
+    # 4. Detectar personas con DNI o matrícula (siempre se ejecuta). El texto se
+    # normaliza una sola vez: lo usan la detección de personas y la de huérfanos
+    if pdf_content:
+        texto_normalizado = normalizacion_avanzada_pdf(path_pdf=pdf_content)
+    else:
+        texto_normalizado = normalizacion_avanzada_pdf(raw_text=txt_texto)
+    personas_detectadas = detectar_personas_dni_matricula(texto_normalizado=texto_normalizado)
     
-    if tmp_pdf_path:
-        try:
-            os.unlink(tmp_pdf_path)
-        except:
-            pass
+    result["personas_identificadas_pdf"] = personas_detectadas
     
-    if tmp_txt_path:
-        try:
-            os.unlink(tmp_txt_path)
-        except:
-            pass
+    # 5. Detectar identificadores huérfanos e inválidos (nueva funcionalidad)
+    identificadores_extra = extraer_identificadores_huerfanos(
+        texto=texto_normalizado,
+        personas_identificadas=personas_detectadas
+    )
+    
+    # Agregar identificadores huérfanos e inválidos al resultado
+    result["identificadores_huerfanos"] = identificadores_extra["identificadores_huerfanos"]
+    result["identificadores_invalidos"] = identificadores_extra["identificadores_invalidos"]
+    
+    return result
 
 
 async def procesar_pdf_y_comparar(
@@ -233,12 +199,11 @@ async def procesar_pdf_y_comparar(
     
     Flujo de procesamiento:
     1. Valida presencia de PDF o TXT (mutuamente excluyentes)
-    2. Guarda archivos temporales (con validación completa)
+    2. Valida y lee los archivos en memoria (sin archivos temporales)
     3. Si es PDF: Verifica que no esté escaneado
     4. Detecta personas con DNI/matrícula en el PDF o TXT
     5. Detecta identificadores huérfanos (sin persona) e inválidos (CUIL/CUIT con dígito verificador incorrecto)
     6. Si se proporcionó data_file, compara los datos
-    7. Limpia archivos temporales
     
     Args:
         pdf_file_main: Archivo PDF principal a procesar (opcional, mutuamente excluyente con txt_file_main)
@@ -256,57 +221,11 @@ async def procesar_pdf_y_comparar(
     Raises:
         HTTPException: Si hay errores en el procesamiento
     """
-    tmp_pdf_path = None
-    tmp_data_path = None
-    tmp_txt_path = None
+    # 1. Validar y leer archivos (el PDF, el TXT y los datos quedan en memoria)
+    pdf_content, data_content, txt_content = await leer_archivos_subidos(pdf_file_main, data_file, txt_file_main)
     
-    try:
-        # 1. Guardar archivos temporales (incluye validación completa)
-        tmp_pdf_path, tmp_data_path, tmp_txt_path = await guardar_archivos_temporales(pdf_file_main, data_file, txt_file_main)
-        
-        # 2. Si es PDF, verificar que no esté escaneado
-        if tmp_pdf_path:
-            detectar_pdf_escaneado(tmp_pdf_path)
-        
-        # 3. Ejecutar comparación solo si se cargó data_file
-        if tmp_data_path:
-            # Usar el archivo de origen apropiado (PDF o TXT)
-            source_file = tmp_pdf_path if tmp_pdf_path else tmp_txt_path
-            result = comparar_valores_json_pdf(tmp_data_path, source_file)
-            result.setdefault("comparison_performed", True)
-        else:
-            result = {
-                "comparison_performed": False,
-                "comparison_result": None
-            }
-        
-        # 4. Detectar personas con DNI o matrícula (siempre se ejecuta)
-        if tmp_pdf_path:
-            personas_detectadas = detectar_personas_dni_matricula(path_pdf=tmp_pdf_path)
-            # Obtener texto normalizado para búsqueda de huérfanos
-            texto_normalizado = normalizacion_avanzada_pdf(path_pdf=tmp_pdf_path)
-        else:
-            # Leer el contenido del archivo TXT
-            with open(tmp_txt_path, 'r', encoding='utf-8') as f:
-                txt_content = f.read()
-            personas_detectadas = detectar_personas_dni_matricula(raw_text=txt_content)
-            # Obtener texto normalizado para búsqueda de huérfanos
-            texto_normalizado = normalizacion_avanzada_pdf(raw_text=txt_content)
-        
-        result["personas_identificadas_pdf"] = personas_detectadas
-        
-        # 5. Detectar identificadores huérfanos e inválidos (nueva funcionalidad)
-        identificadores_extra = extraer_identificadores_huerfanos(
-            texto=texto_normalizado,
-            personas_identificadas=personas_detectadas
-        )
-        
-        # Agregar identificadores huérfanos e inválidos al resultado
-        result["identificadores_huerfanos"] = identificadores_extra["identificadores_huerfanos"]
-        result["identificadores_invalidos"] = identificadores_extra["identificadores_invalidos"]
-        
-        return result
-        
-    finally:
-        # 6. Limpiar archivos temporales
-        limpiar_archivos_temporales(tmp_pdf_path, tmp_data_path, tmp_txt_path)
+    # 2 - 5. Extracción, detección y comparación: trabajo de CPU sincrónico (PyMuPDF,
+    # regex, spaCy), se corre en un hilo para no bloquear el event loop mientras dura
+    return await asyncio.to_thread(
+        _procesar_archivos_subidos, pdf_content, data_content, txt_content
+    )